@@ -0,0 +1 @@
+python -m transcendence_effect_placer.batch_export %*
\ No newline at end of file
@@ -0,0 +1 @@
+python -m transcendence_effect_placer.bench.suite %*
\ No newline at end of file
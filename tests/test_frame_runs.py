@@ -0,0 +1,72 @@
+import random
+import unittest
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.frame_runs import FrameRuns
+from transcendence_effect_placer.data.points import PILCoord, PointThuster
+
+class AssignTest(unittest.TestCase):
+    def test_matches_a_plain_list(self):
+        rng = random.Random(0)
+        runs = FrameRuns(40)
+        frames = [0] * 40
+        for _ in range(500):
+            start = rng.randrange(-5, 45)
+            stop = rng.randrange(-5, 45)
+            value = rng.choice((-1, 0, 1))
+            runs.assign(start, stop, value)
+            for frame in range(max(start, 0), min(stop, 40)):
+                frames[frame] = value
+            self.assertEqual(list(runs), frames)
+            #neighbouring runs are always merged
+            values = [value for value, _, _ in runs.runs()]
+            self.assertTrue(all(a != b for a, b in zip(values, values[1:])))
+
+    def test_saved_runs_round_trip(self):
+        runs = FrameRuns.from_frames([0, 0, 1, 1, 1, -1, 0])
+        self.assertEqual(runs.to_runs(), [[0, 2], [1, 3], [-1, 1], [0, 1]])
+        self.assertEqual(FrameRuns.from_runs(runs.to_runs()), runs)
+
+class ResizeTest(unittest.TestCase):
+    def test_runs_keep_their_facings_when_growing(self):
+        runs = FrameRuns(40)
+        runs.assign(10, 20, -1)
+        self.assertEqual(runs.resized(360).ranges(-1), [(90, 180)])
+
+    def test_runs_keep_their_facings_when_shrinking(self):
+        runs = FrameRuns(360)
+        runs.assign(90, 180, 1)
+        runs.assign(270, 360, -1)
+        resized = runs.resized(40)
+        self.assertEqual(len(resized), 40)
+        self.assertEqual(resized.ranges(1), [(10, 20)])
+        self.assertEqual(resized.ranges(-1), [(30, 40)])
+
+    def test_every_frame_keeps_the_value_at_its_facing(self):
+        rng = random.Random(1)
+        runs = FrameRuns.from_frames([rng.choice((-1, 0, 1)) for _ in range(20)])
+        resized = runs.resized(60)
+        for frame in range(60):
+            self.assertEqual(resized[frame], runs[frame // 3])
+
+    def test_same_length_is_an_independent_copy(self):
+        runs = FrameRuns(20)
+        resized = runs.resized(20)
+        resized.assign(0, 5, 1)
+        self.assertEqual(runs.ranges(1), [])
+
+    def test_empty(self):
+        self.assertEqual(list(FrameRuns().resized(8)), [0] * 8)
+
+class ThrusterRemapTest(unittest.TestCase):
+    def test_under_over_follows_the_rotation_frames(self):
+        cfg = SpriteConfig(0, 0, 64, 64, 0, 20, 5, real=True)
+        thruster = PointThuster(PILCoord(32, 48), "0", cfg, 0)
+        thruster.under_over.assign(5, 10, -1)
+        cfg.rot_frames = 40
+        self.assertEqual(len(thruster.under_over), 40)
+        self.assertEqual(thruster.under_over.ranges(-1), [(10, 20)])
+        self.assertEqual(thruster.get_send_to_back(), "10-19")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from transcendence_effect_placer.bench.synthetic import make_sprite_config, make_sprite_sheet
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.grid_detect import detect_sprite_grid
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+
+def _grid(cfg: SpriteConfig) -> tuple[int, ...]:
+    return (cfg.x, cfg.y, cfg.w, cfg.h, cfg.rot_cols, cfg.rot_frames, cfg.anim_frames)
+
+def _detect(cfg: SpriteConfig) -> tuple[int, ...]:
+    detected = detect_sprite_grid(SpriteSheet.from_image(make_sprite_sheet(cfg)))
+    assert detected is not None
+    return _grid(detected)
+
+class PitchTest(unittest.TestCase):
+    def test_columns_that_repeat_every_half_turn(self):
+        #every 6th column looks the same, so the repetition found first spans about 5 frames
+        for size in (64, 100, 128, 160, 200):
+            cfg = make_sprite_config(size, 120, 12)
+            self.assertEqual(_detect(cfg), _grid(cfg))
+        cfg = make_sprite_config(256, 72, 12)
+        self.assertEqual(_detect(cfg), _grid(cfg))
+
+    def test_a_few_rows(self):
+        for rot_frames, rot_cols in ((12, 4), (24, 12), (40, 20)):
+            cfg = make_sprite_config(256, rot_frames, rot_cols)
+            self.assertEqual(_detect(cfg), _grid(cfg))
+
+    def test_a_single_frame(self):
+        cfg = make_sprite_config(128, 1, 1)
+        self.assertEqual(_detect(cfg), _grid(cfg))
+
+    def test_narrow_hull_is_not_split_into_frames(self):
+        #three frames that all show the same narrow hull, which fits in half a frame
+        cfg = make_sprite_config(128, 1, 1, 2)
+        x, y, w, h, rot_cols, rot_frames, anim_frames = _detect(cfg)
+        self.assertEqual((x, y, w, h), (0, 0, 128, 128))
+        #the hull alone cant tell animation frames from more rotation columns
+        self.assertEqual(rot_frames * (anim_frames + 1), 3)
+
+    def test_offset_grid(self):
+        cfg = SpriteConfig(10, 6, 100, 100, 0, 120, 12, 0.2, True)
+        self.assertEqual(_detect(cfg), _grid(cfg))
+
+class FramesTest(unittest.TestCase):
+    def test_empty_columns_after_each_animation_frame(self):
+        cfg = make_sprite_config(128, 20, 6, 1)
+        self.assertEqual(_detect(cfg), _grid(cfg))
+
+    def test_frames_shorter_than_the_downsampling_step(self):
+        cfg = make_sprite_config(64, 360, 1)
+        self.assertEqual(_detect(cfg), _grid(cfg))
+
+if __name__ == "__main__":
+    unittest.main()
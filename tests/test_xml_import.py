@@ -0,0 +1,54 @@
+import io
+import unittest
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.xml_import import READ_CHUNK_BYTES, iter_ship_classes
+
+CFG = SpriteConfig(0, 0, 128, 128, 0, 20, 5, real=True)
+
+class _TricklingFile(io.BytesIO):
+    '''
+    Hands out at most a few bytes per read, so entity references are split across reads
+    '''
+    def read(self, size: int = -1) -> bytes:
+        return super().read(3)
+
+def _module(slot_ids: list[str], padding: int = 0) -> bytes:
+    head = b'<?xml version="1.0"?>\n<!DOCTYPE TranscendenceModule [<!ENTITY unidDeclared "0xA0010001">]>\n<TranscendenceModule>'
+    slots = "".join(f'<DeviceSlot id="{slot_id}" posAngle="90" posRadius="20" posZ="0"/>' for slot_id in slot_ids)
+    return head + b" " * padding + f'<ShipClass unid="&unidDeclared;" class="Test">{slots}</ShipClass></TranscendenceModule>'.encode()
+
+class EntitySplitTest(unittest.TestCase):
+    def _labels(self, data: bytes) -> list[str]:
+        ships = list(iter_ship_classes(io.BytesIO(data), CFG))
+        self.assertEqual(len(ships), 1)
+        return [pt.label for pt in ships[0].points]
+
+    def test_entities_split_across_read_chunks(self):
+        reference = '&unidUndeclared;'
+        base = _module([reference])
+        #where the reference starts when there is no padding, then move it across the end of the first chunk
+        offset = base.index(reference.encode())
+        for split in range(1, len(reference)):
+            padding = READ_CHUNK_BYTES - split - offset
+            data = _module([reference], padding)
+            self.assertEqual(data.index(reference.encode()) + split, READ_CHUNK_BYTES)
+            #undeclared entities come out as their literal text
+            self.assertEqual(self._labels(data), [reference])
+
+    def test_declared_entity_split_across_read_chunks(self):
+        reference = '&unidDeclared;'
+        offset = _module([reference]).index(f'<DeviceSlot id="{reference}"'.encode()) + len('<DeviceSlot id="')
+        for split in range(1, len(reference)):
+            data = _module([reference], READ_CHUNK_BYTES - split - offset)
+            self.assertEqual(data.index(f'<DeviceSlot id="{reference}"'.encode()) + len('<DeviceSlot id="') + split, READ_CHUNK_BYTES)
+            #declared entities are still expanded, rather than escaped as if they were undeclared
+            self.assertEqual(self._labels(data), ["0xA0010001"])
+
+    def test_entities_split_across_every_read(self):
+        data = _module(["&unidUndeclared;", "&unidDeclared;", "a&amp;b"])
+        ships = list(iter_ship_classes(_TricklingFile(data), CFG))
+        self.assertEqual([pt.label for pt in ships[0].points], ["&unidUndeclared;", "0xA0010001", "a&b"])
+
+if __name__ == "__main__":
+    unittest.main()
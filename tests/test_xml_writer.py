@@ -0,0 +1,66 @@
+import io
+import unittest
+import xml.etree.ElementTree as ET
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.export import build_export_xml
+from transcendence_effect_placer.data.points import PILCoord, PointDevice, PointDock, PointThuster
+from transcendence_effect_placer.data.xml_import import iter_ship_classes
+from transcendence_effect_placer.data.xml_writer import Entity, escape_attr, format_element
+
+CFG = SpriteConfig(0, 0, 128, 128, 0, 20, 5, real=True)
+
+def _ship_xml(export: str) -> bytes:
+    return f'<ShipClass unid="&unidTest;" class="Test">\n{export}</ShipClass>'.encode()
+
+class EscapeTest(unittest.TestCase):
+    def test_markup_characters_are_escaped(self):
+        self.assertEqual(escape_attr('a&b<c>"d'), 'a&amp;b&lt;c&gt;&quot;d')
+
+    def test_whitespace_survives_attribute_normalisation(self):
+        self.assertEqual(escape_attr("a\tb\nc\rd"), "a&#9;b&#10;c&#13;d")
+
+    def test_entities_are_written_as_references(self):
+        self.assertEqual(escape_attr(Entity("efMainThrusterLarge")), "&efMainThrusterLarge;")
+
+    def test_escaped_element_parses_back(self):
+        label = 'gun "A" & <B>\tside'
+        elem = ET.fromstring(format_element("DeviceSlot", [("id", label), ("posAngle", 10)]))
+        self.assertEqual(elem.get("id"), label)
+
+class RoundTripTest(unittest.TestCase):
+    def _points(self):
+        device = PointDevice(PILCoord(40, 50), 'gun "A" & <B>', CFG, 0, direction=30, arc=90)
+        device.set_mirror_x()
+        thruster = PointThuster(PILCoord(64, 100), "1", CFG, 0)
+        thruster.set_z(-4)
+        thruster.set_mirror_x()
+        thruster.under_over.assign(0, 5, -1)
+        dock = PointDock(PILCoord(20, 64), "2", CFG, 0)
+        dock.set_mirror_y()
+        return [device, thruster, dock]
+
+    def test_sections_are_closed_with_their_own_tags(self):
+        export = build_export_xml(self._points())
+        #the entities the export refers to are declared by the game
+        doctype = b'<!DOCTYPE ShipClass [<!ENTITY unidTest "1"><!ENTITY efMainThrusterLarge "2">]>'
+        root = ET.fromstring(doctype + _ship_xml(export))
+        self.assertEqual([section.tag for section in root], ["DockingPorts", "DeviceSlots", "Effects"])
+        for tag in ("DockingPorts", "DeviceSlots", "Effects"):
+            self.assertEqual(export.count(f"<{tag}>"), 1)
+            self.assertEqual(export.count(f"</{tag}>"), 1)
+
+    def test_export_import_export_is_stable(self):
+        points = self._points()
+        export = build_export_xml(points)
+        ships = list(iter_ship_classes(io.BytesIO(_ship_xml(export)), CFG))
+        self.assertEqual(len(ships), 1)
+        imported = ships[0].points
+        #the mirrors written for each point are folded back into it
+        self.assertEqual(len(imported), len(points))
+        self.assertEqual(build_export_xml(imported), export)
+        device = next(pt for pt in imported if isinstance(pt, PointDevice))
+        self.assertEqual(device.label, 'gun "A" & <B>')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+'''
+Exports the XML of saved projects without opening any windows, so placement data can be regenerated in batch
+
+run with: python -m transcendence_effect_placer.batch_export ship1.json ship2.json --out xml/
+'''
+
+from __future__ import annotations
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.export import write_export_xml
+from transcendence_effect_placer.data.project import load_project, load_sprite_config
+
+def output_path(project_path: str, out_dir: str|None) -> str:
+    stem = os.path.splitext(os.path.basename(project_path))[0]
+    return os.path.join(out_dir if out_dir is not None else os.path.dirname(project_path), f"{stem}.xml")
+
+def export_project(project_path: str, out_path: str, sprite_cfg: SpriteConfig|None = None) -> int:
+    '''
+    :return: number of points exported
+    '''
+    project = load_project(project_path, sprite_cfg)
+    with open(out_path, 'w') as f:
+        write_export_xml(project.points, f)
+    return len(project.points)
+
+def _export_job(job: tuple[str, str, SpriteConfig|None]) -> tuple[str, int|None, str|None]:
+    project_path, out_path, sprite_cfg = job
+    try:
+        return (project_path, export_project(project_path, out_path, sprite_cfg), None)
+    except Exception as e:
+        return (project_path, None, f"{type(e).__name__}: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the XML of saved projects without opening any windows")
+    parser.add_argument("projects", nargs="+", help="project files to export")
+    parser.add_argument("--out", metavar="DIR", help="directory the XML files are written to, defaults to next to each project")
+    parser.add_argument("--sprite-config", metavar="PATH", help="use the sprite config from this file instead of the one saved in each project")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="number of projects exported in parallel")
+    args = parser.parse_args()
+
+    sprite_cfg = load_sprite_config(args.sprite_config) if args.sprite_config else None
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    jobs = [(path, output_path(path, args.out), sprite_cfg) for path in args.projects]
+
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            results = list(pool.map(_export_job, jobs))
+    else:
+        results = [_export_job(job) for job in jobs]
+
+    failed = 0
+    for (project_path, count, error), (_, out_path, _) in zip(results, jobs):
+        if error is None:
+            print(f"{project_path}: {count} points -> {out_path}")
+        else:
+            failed += 1
+            print(f"{project_path}: failed, {error}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
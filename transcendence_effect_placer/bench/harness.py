@@ -0,0 +1,74 @@
+'''
+Timing and baseline comparison for the benchmark suite
+'''
+
+from __future__ import annotations
+import json
+import platform
+import statistics
+from dataclasses import dataclass, field, asdict
+from time import perf_counter
+from typing import Callable
+
+BASELINE_VERSION = 1
+
+@dataclass
+class BenchResult:
+    name: str
+    best_s: float
+    median_s: float
+    repeat: int
+    params: dict = field(default_factory=dict)
+
+@dataclass
+class Regression:
+    name: str
+    baseline_s: float
+    current_s: float
+
+    def ratio(self) -> float:
+        return self.current_s / self.baseline_s
+
+def time_call(name: str, fn: Callable[[], object], repeat: int = 5, setup: Callable[[], object]|None = None, params: dict|None = None) -> BenchResult:
+    '''
+    Runs fn repeat times (running setup before each, untimed) and keeps the best and median times
+    '''
+    times: list[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    return BenchResult(name, min(times), statistics.median(times), repeat, params or {})
+
+def save_baseline(path: str, results: list[BenchResult]):
+    data = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": [asdict(r) for r in results],
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def load_baseline(path: str) -> dict[str, BenchResult]:
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get("version") != BASELINE_VERSION:
+        raise ValueError(f"unsupported baseline version: {data.get('version')}")
+    return {r["name"]: BenchResult(**r) for r in data["results"]}
+
+def find_regressions(results: list[BenchResult], baseline: dict[str, BenchResult], threshold: float = 0.25) -> list[Regression]:
+    '''
+    A result regresses if its best time is more than threshold (as a fraction) slower than the baseline
+    Results are only compared when they were run with the same parameters
+    '''
+    ret: list[Regression] = []
+    for res in results:
+        base = baseline.get(res.name)
+        if base is None or base.params != res.params or base.best_s <= 0:
+            continue
+        if res.best_s > base.best_s * (1 + threshold):
+            ret.append(Regression(res.name, base.best_s, res.best_s))
+    return ret
@@ -0,0 +1,142 @@
+'''
+Compares the closed form Point.nudge_to against hill climbing nudges
+
+hill_climb is the original nudge, which takes fixed 1 pixel/1 degree steps and stops as soon as none of them help,
+so on large sprites (where 1 degree is many pixels) it stalls far from the target, its error is reported next to its time
+hill_climb_adaptive is a fair baseline that halves its steps when stuck and only stops once it lands on the target
+(or its steps are too small to matter)
+
+run with: python -m transcendence_effect_placer.bench.nudge_solver
+'''
+
+from __future__ import annotations
+import argparse
+import math
+import random
+from time import perf_counter
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.points import PointGeneric, SpriteCoord, PXMLCoord
+
+SPRITE_SIZES = [256, 1024, 4096]
+SOLVERS = ["hill_climb", "hill_climb_adaptive", "closed_form"]
+#smallest steps the adaptive hill climb takes before giving up
+MIN_RADIUS_STEP = 1e-3
+MIN_ANGLE_STEP = 1e-6
+
+def _make_points(cfg: SpriteConfig, count: int, rng: random.Random) -> list[tuple[PointGeneric, SpriteCoord]]:
+    '''
+    Creates points at a random z, each paired with a random target to nudge towards
+    The starting guess is the same approximate one used when clicking to add a point,
+    which ignores z and so lands further from the target the taller the ship is
+    '''
+    ret: list[tuple[PointGeneric, SpriteCoord]] = []
+    for i in range(count):
+        target = SpriteCoord(rng.randint(-cfg.w // 2, cfg.w // 2), rng.randint(-cfg.h // 2, cfg.h // 2))
+        point = PointGeneric(SpriteCoord(target.x, target.y), str(i), cfg)
+        point.set_z(rng.randint(-cfg.h // 4, cfg.h // 4))
+        ret.append((point, target))
+    return ret
+
+def _error(point: PointGeneric, target: SpriteCoord) -> float:
+    x = point.sprite_coord.x - target.x
+    y = point.sprite_coord.y - target.y
+    return (x ** 2 + y ** 2) ** 0.5
+
+def _hill_climb(point: PointGeneric, target: SpriteCoord):
+    '''
+    The original Point.nudge_to, which walks 1 pixel/1 degree at a time and stops as soon as no step gets closer
+    '''
+    d1 = math.radians(1)
+    def dist2(s: SpriteCoord) -> int:
+        return (target.x - s.x) ** 2 + (target.y - s.y) ** 2
+    while True:
+        cur = point.polar_coord
+        best_distance = dist2(point.sprite_coord)
+        best: PXMLCoord|None = None
+        for test in (PXMLCoord(cur.a, cur.r - 1, cur.z), PXMLCoord(cur.a, cur.r + 1, cur.z), PXMLCoord(cur.a + d1, cur.r, cur.z), PXMLCoord(cur.a - d1, cur.r, cur.z)):
+            test_distance = dist2(test.to_gscene(point._cfg).to_sprite())
+            if test_distance < best_distance:
+                best_distance = test_distance
+                best = test
+        if best is None:
+            return
+        point.update_from_polar(best)
+
+def _hill_climb_adaptive(point: PointGeneric, target: SpriteCoord):
+    '''
+    Hill climbs in radius and angle, doubling a step while it keeps helping and halving it when it does not
+    Converges when the point rounds to the target, or both steps are below MIN_RADIUS_STEP/MIN_ANGLE_STEP
+    '''
+    #climbs on the unrounded position, since rounding to whole pixels leaves flat spots small steps cannot get off
+    goal = target.to_gscene()
+    def dist2(p: PXMLCoord) -> float:
+        g = p.to_gscene(point._cfg)
+        return (g.x - goal.x) ** 2 + (g.y - goal.y) ** 2
+    def landed(p: PXMLCoord) -> bool:
+        s = p.to_gscene(point._cfg).to_sprite()
+        return s.x == target.x and s.y == target.y
+    cur = PXMLCoord(point.polar_coord.a, point.polar_coord.r, point.polar_coord.z)
+    cur_d = dist2(cur)
+    r_step = 1.0
+    a_step = 1 / max(cur.r, 1.0)
+    while not landed(cur) and (r_step >= MIN_RADIUS_STEP or a_step >= MIN_ANGLE_STEP):
+        best: tuple[float, PXMLCoord, bool]|None = None
+        for r, a, radial in ((cur.r - r_step, cur.a, True), (cur.r + r_step, cur.a, True), (cur.r, cur.a + a_step, False), (cur.r, cur.a - a_step, False)):
+            test = PXMLCoord(a, max(r, 0.0), cur.z)
+            d = dist2(test)
+            if d < cur_d and (best is None or d < best[0]):
+                best = (d, test, radial)
+        if best is None:
+            r_step /= 2
+            a_step /= 2
+            continue
+        cur_d, cur, radial = best
+        if radial:
+            r_step *= 2
+        else:
+            a_step *= 2
+    point.update_from_polar(cur)
+
+def run(sizes: list[int], count: int, seed: int = 0) -> list[dict]:
+    results: list[dict] = []
+    for size in sizes:
+        cfg = SpriteConfig(0, 0, size, size, 0, 360, 20, 0.2, True)
+        for name in SOLVERS:
+            pairs = _make_points(cfg, count, random.Random(seed))
+            start = perf_counter()
+            for point, target in pairs:
+                if name == "hill_climb":
+                    _hill_climb(point, target)
+                elif name == "hill_climb_adaptive":
+                    _hill_climb_adaptive(point, target)
+                else:
+                    point.nudge_to(target)
+            elapsed = perf_counter() - start
+            errors = [_error(point, target) for point, target in pairs]
+            results.append({
+                "size": size,
+                "solver": name,
+                "points": count,
+                "ms_per_point": elapsed * 1000 / count,
+                "max_error_px": max(errors),
+                "mean_error_px": sum(errors) / count,
+                "converged": sum(error == 0 for error in errors),
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the closed form nudge solver against the hill climb")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SPRITE_SIZES, help="sprite frame sizes (pixels) to test")
+    parser.add_argument("--count", type=int, default=50, help="number of points to nudge per size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    #times are only comparable between solvers that converged, hill_climb stops early on large sprites
+    print(f"{'size':>6} {'solver':>20} {'ms/point':>10} {'max err':>8} {'mean err':>9} {'converged':>10}")
+    for res in run(args.sizes, args.count, args.seed):
+        converged = f"{res['converged']}/{res['points']}"
+        print(f"{res['size']:>6} {res['solver']:>20} {res['ms_per_point']:>10.3f} {res['max_error_px']:>8.2f} {res['mean_error_px']:>9.2f} {converged:>10}")
+
+if __name__ == "__main__":
+    main()
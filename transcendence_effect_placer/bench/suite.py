@@ -0,0 +1,221 @@
+'''
+Headless benchmarks for projection, nudging, rendering and export
+
+run with: python -m transcendence_effect_placer.bench.suite
+'''
+
+from __future__ import annotations
+import argparse
+import itertools
+import math
+import sys
+import PIL.Image
+from PIL.ImageDraw import ImageDraw
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.export import build_export_xml
+from transcendence_effect_placer.data.frame_cache import FrameCache
+from transcendence_effect_placer.data.math import convert_polar_to_projection, convert_projection_to_polar_approx_ingest, convert_projection_to_polar_inverse, convert_projection_to_polar_original
+from transcendence_effect_placer.data.points import Point, PointThuster, PILCoord, PXMLCoord, SpriteCoord
+from transcendence_effect_placer.data.point_index import PointIndex
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+from transcendence_effect_placer.data.silhouette import HullValidator
+from transcendence_effect_placer.data.layering import compute_under_over
+from transcendence_effect_placer.bench.harness import BenchResult, time_call, save_baseline, load_baseline, find_regressions
+from transcendence_effect_placer.bench.synthetic import make_sprite_config, make_sprite_sheet, make_points
+
+def run_suite(cfg: SpriteConfig, points: list[Point], repeat: int = 5) -> list[BenchResult]:
+    params = {
+        "size": cfg.w,
+        "points": len(points),
+        "rot_frames": cfg.rot_frames,
+        "anim_frames": cfg.anim_frames,
+    }
+    facings = cfg.facing_table()
+    directions = [facings.direction(rot) for rot in range(cfg.rot_frames)]
+    results: list[BenchResult] = []
+
+    def projection():
+        for pt in points:
+            p = pt.polar_coord
+            for d in directions:
+                convert_polar_to_projection(cfg, PXMLCoord(p.a + math.radians(d), p.r, p.z))
+    results.append(time_call("convert_polar_to_projection", projection, repeat, params=params))
+
+    scene_coords = [pt.scene_coord for pt in points]
+    for name, fn in [
+        ("convert_projection_to_polar_approx_ingest", convert_projection_to_polar_approx_ingest),
+        ("convert_projection_to_polar_inverse", convert_projection_to_polar_inverse),
+        ("convert_projection_to_polar_original", convert_projection_to_polar_original),
+    ]:
+        def inverse(fn=fn):
+            for coord in scene_coords:
+                for rot in range(cfg.rot_frames):
+                    fn(cfg, coord, rot)
+        results.append(time_call(name, inverse, repeat, params=params))
+
+    targets = [SpriteCoord(-pt.sprite_coord.x, pt.sprite_coord.y) for pt in points]
+    def nudge():
+        for pt, target in zip(points, targets):
+            for rot in range(0, cfg.rot_frames, 10):
+                pt.nudge_to(target, rot)
+    originals = [PXMLCoord(pt.polar_coord.a, pt.polar_coord.r, pt.polar_coord.z) for pt in points]
+    results.append(time_call("Point.nudge_to", nudge, repeat, params=params))
+    for pt, original in zip(points, originals):
+        pt.update_from_polar(PXMLCoord(original.a, original.r, original.z))
+
+    canvas = PIL.Image.new("RGBA", (cfg.w, cfg.h), (0, 0, 0, 0))
+    def render():
+        draw = ImageDraw(canvas, mode="RGBA")
+        for d in directions:
+            for pt in points:
+                pt.render_to_image(draw, d)
+    results.append(time_call("Point.render_to_image", render, repeat, params=params))
+
+    sheet = make_sprite_sheet(cfg)
+    #scrub forwards then back, as dragging the rotation slider does
+    scrub = list(range(cfg.rot_frames)) + list(reversed(range(cfg.rot_frames)))
+    def display_frames():
+        for rot in scrub:
+            frame = sheet.crop(facings.frame_box(rot, 0)).convert("RGBA")
+            draw = ImageDraw(frame, mode="RGBA")
+            for pt in points:
+                pt.render_to_image(draw, facings.direction(rot))
+    results.append(time_call("display_frames", display_frames, repeat, params=params))
+
+    pixels = SpriteSheet.from_image(sheet)
+    def display_frames_views():
+        for rot in scrub:
+            frame = pixels.frame_image(cfg, rot, 0)
+            draw = ImageDraw(frame, mode="RGBA")
+            for pt in points:
+                pt.render_to_image(draw, facings.direction(rot))
+    #frames sliced out of the decoded sheet, rather than cropped with PIL
+    results.append(time_call("display_frames_views", display_frames_views, repeat, params=params))
+
+    cache = FrameCache()
+    def load_frame(rot: int):
+        return cache.get_or_load((rot, 0), lambda: pixels.frame_image(cfg, rot, 0))
+    def warm_cache():
+        for rot in range(cfg.rot_frames):
+            load_frame(rot)
+    def display_frames_cached():
+        for rot in scrub:
+            frame = load_frame(rot).copy()
+            draw = ImageDraw(frame, mode="RGBA")
+            for pt in points:
+                pt.render_to_image(draw, facings.direction(rot))
+    #measures scrubbing over frames that have already been shown (or prefetched) once
+    results.append(time_call("display_frames_cached", display_frames_cached, repeat, setup=warm_cache, params=params))
+    #just getting the frames, which the points drawn over them swamp in the benchmarks above
+    def fetch_frames_crop():
+        for rot in scrub:
+            sheet.crop(facings.frame_box(rot, 0)).convert("RGBA")
+    def fetch_frames_views():
+        for rot in scrub:
+            pixels.frame_image(cfg, rot, 0)
+    def fetch_frames_cached():
+        for rot in scrub:
+            load_frame(rot)
+    results.append(time_call("fetch_frames_crop", fetch_frames_crop, repeat, params=params))
+    results.append(time_call("fetch_frames_views", fetch_frames_views, repeat, params=params))
+    results.append(time_call("fetch_frames_cached", fetch_frames_cached, repeat, setup=warm_cache, params=params))
+
+    results.append(time_call("SpriteSheet.alpha", lambda: pixels.alpha(cfg), repeat, params=params))
+
+    def check_hull():
+        #a new validator every time, so nothing is reused between runs
+        HullValidator(pixels, cfg).check(points)
+    results.append(time_call("HullValidator.check", check_hull, repeat, params=params))
+    def layering():
+        #computed without being set, so the layering the later benchmarks export is left alone
+        for pt in points:
+            if isinstance(pt, PointThuster):
+                compute_under_over(pt, pixels, cfg)
+    results.append(time_call("compute_under_over", layering, repeat, params=params))
+
+    def edit_one_point_shapes():
+        #the shapes the sprite canvas moves its items to, which are also only worked out again for the edited point
+        edited = points[0]
+        for z in range(-10, 10):
+            edited.set_z(z)
+            for pt in points:
+                pt.overlay_shapes(0)
+    results.append(time_call("edit_one_point_shapes", edit_one_point_shapes, repeat, params=params))
+
+    #dragging only works out the dragged point's shapes again, which the sprite canvas moves its items to
+    #each call is one motion event
+    dragged = points[0]
+    drag_path = itertools.cycle([PILCoord(cfg.w // 4 + step, cfg.h // 3 + step // 2) for step in range(cfg.w // 2)])
+    def drag_motion():
+        dragged.move_marker_to(next(drag_path), 0)
+        dragged.overlay_shapes(0)
+    results.append(time_call("drag_point_motion", drag_motion, repeat, params=params))
+
+    index = PointIndex()
+    index.update(points, 0)
+    marker_coords = [coord for pt in points for _, coord in pt.marker_coords(0)]
+    def find_points():
+        #clicking on every marker, once the index is up to date
+        for coord in marker_coords:
+            index.find(coord.x, coord.y)
+    results.append(time_call("PointIndex.find", find_points, repeat, params=params))
+    def index_one_edited():
+        points[0]._touch()
+        index.update(points, 0)
+    results.append(time_call("PointIndex.update_one_edited", index_one_edited, repeat, params=params))
+
+    thrusters = [pt for pt in points if isinstance(pt, PointThuster)]
+    def range_str():
+        for pt in thrusters:
+            pt.accumulate_range_str(-1)
+            pt.accumulate_range_str(1)
+    results.append(time_call("PointThuster.accumulate_range_str", range_str, repeat, params=params))
+
+    def export_edited():
+        #every point changed since the last export, so nothing is reused
+        for pt in points:
+            pt._touch()
+        build_export_xml(points)
+    results.append(time_call("build_export_xml", export_edited, repeat, params=params))
+    def export_one_edited():
+        points[0]._touch()
+        build_export_xml(points)
+    results.append(time_call("build_export_xml_one_edited", export_one_edited, repeat, params=params))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks for projection, nudging, rendering and export")
+    parser.add_argument("--size", type=int, default=256, help="frame width and height of the synthetic sprite")
+    parser.add_argument("--points", type=int, default=30, help="number of synthetic points")
+    parser.add_argument("--rot-frames", type=int, default=360)
+    parser.add_argument("--rot-cols", type=int, default=20)
+    parser.add_argument("--anim-frames", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results to a baseline JSON file")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="fraction slower than the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    cfg = make_sprite_config(args.size, args.rot_frames, args.rot_cols, args.anim_frames)
+    points = make_points(cfg, args.points, args.seed)
+    results = run_suite(cfg, points, args.repeat)
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    regressions = {r.name: r for r in find_regressions(results, baseline, args.threshold)}
+
+    print(f"{'benchmark':<45} {'best ms':>10} {'median ms':>10} {'vs base':>8}")
+    for res in results:
+        base = baseline.get(res.name)
+        ratio = f"{res.best_s / base.best_s:>7.2f}x" if base and base.params == res.params and base.best_s > 0 else ""
+        flag = "  REGRESSION" if res.name in regressions else ""
+        print(f"{res.name:<45} {res.best_s * 1000:>10.2f} {res.median_s * 1000:>10.2f} {ratio:>8}{flag}")
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+'''
+Synthetic sprite sheets and point sets, so benchmarks do not depend on real ship art
+'''
+
+from __future__ import annotations
+import math
+import random
+import PIL.Image
+from PIL.Image import Image
+from PIL.ImageDraw import ImageDraw
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.points import Point, PointDevice, PointDock, PointThuster, SpriteCoord
+
+def make_sprite_config(size: int = 256, rot_frames: int = 360, rot_cols: int = 20, anim_frames: int = 0) -> SpriteConfig:
+    return SpriteConfig(0, 0, size, size, anim_frames, rot_frames, rot_cols, 0.2, True)
+
+def sheet_size(cfg: SpriteConfig) -> tuple[int, int]:
+    '''
+    :return: width and height of a sheet that exactly fits every frame of cfg
+    '''
+    w = cfg.x + (cfg.anim_frames + 1) * cfg.rot_cols * cfg.w
+    h = cfg.y + cfg.rot_col_size() * cfg.h
+    return (w, h)
+
+def make_sprite_sheet(cfg: SpriteConfig) -> Image:
+    '''
+    Draws an opaque hull (a rotated ellipse, squashed by the camera tilt) into every frame of a transparent sheet
+    '''
+    sheet = PIL.Image.new("RGBA", sheet_size(cfg), (0, 0, 0, 0))
+    draw = ImageDraw(sheet)
+    facings = cfg.facing_table()
+    half_len = cfg.h * 0.45
+    half_wid = cfg.w * 0.2
+    squash = 0.9
+    steps = 32
+    for rot in range(cfg.rot_frames):
+        a = math.radians(facings.direction(rot))
+        hull = []
+        for i in range(steps):
+            t = 2 * math.pi * i / steps
+            x = math.cos(t) * half_wid
+            y = math.sin(t) * half_len
+            rx = x * math.cos(a) - y * math.sin(a)
+            ry = (x * math.sin(a) + y * math.cos(a)) * squash
+            hull.append((rx, ry))
+        for anim in range(cfg.anim_frames + 1):
+            left, upper, _, _ = facings.frame_box(rot, anim)
+            cx = left + cfg.w / 2
+            cy = upper + cfg.h / 2
+            shade = 96 + (anim * 16) % 128
+            draw.polygon([(cx + x, cy + y) for x, y in hull], fill=(shade, shade, shade, 255))
+    return sheet
+
+def make_points(cfg: SpriteConfig, count: int, seed: int = 0) -> list[Point]:
+    '''
+    Creates a mix of devices, thrusters and docking ports spread over the hull, with mirrors and layering set
+    '''
+    rng = random.Random(seed)
+    points: list[Point] = []
+    for i in range(count):
+        coord = SpriteCoord(rng.randint(-cfg.w // 5, cfg.w // 5), rng.randint(-cfg.h * 2 // 5, cfg.h * 2 // 5))
+        kind = i % 3
+        point: Point
+        if kind == 0:
+            point = PointDevice(coord, f"slot{i}", cfg, direction=rng.randint(-179, 180), arc=rng.choice([-1, 30, 90, 180]))
+            point.set_mirror_x(True)
+            point.set_mirror_z(rng.random() < 0.5)
+        elif kind == 1:
+            point = PointThuster(coord, f"thruster{i}", cfg, direction=rng.randint(150, 210))
+            point.set_mirror_x(True)
+            #hide the thruster behind the hull for a random arc of facings
+            start = rng.randrange(cfg.rot_frames)
+            for f in range(start, start + cfg.rot_frames // 3):
+                point.send_to_back(f % cfg.rot_frames)
+            for f in range(0, cfg.rot_frames, 7):
+                point.bring_to_front(f)
+        else:
+            point = PointDock(coord, f"dock{i}", cfg)
+            point.set_mirror_x(True)
+            point.set_mirror_y(True)
+        if point.uses_z_input:
+            point.set_z(rng.randint(-cfg.h // 8, cfg.h // 8))
+        points.append(point)
+    return points
@@ -0,0 +1,175 @@
+'''
+Level gated tracing with a channel per subsystem
+
+Call sites guard on the channel's level flags, so a disabled channel costs a single attribute check:
+    if _TRACE.debug:
+        _TRACE.log(DEBUG, "event", key=value)
+
+Configuration comes from the environment when the program starts:
+TEP_TRACE: channel levels, eg "math=debug,ui=info", or just "debug" to set every channel
+TEP_TRACE_FILE: path of a JSONL file that log and timing records are appended to
+
+Functions decorated with TraceChannel.timed are only wrapped when TEP_TRACE_FILE is set,
+otherwise the decorator returns the function untouched
+'''
+
+from __future__ import annotations
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+from time import perf_counter, time
+from typing import Any, Callable, TextIO, TypeVar
+
+ERROR = 40
+WARN = 30
+INFO = 20
+DEBUG = 10
+
+LEVEL_NAMES: dict[str, int] = {
+    "error": ERROR,
+    "warn": WARN,
+    "info": INFO,
+    "debug": DEBUG,
+}
+
+DEFAULT_LEVEL = WARN
+
+ENV_TRACE = "TEP_TRACE"
+ENV_TRACE_FILE = "TEP_TRACE_FILE"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+class _JSONLSink:
+    def __init__(self, path: str):
+        self.path = path
+        self._file: TextIO = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+_sink: _JSONLSink|None = None
+_channels: dict[str, TraceChannel] = {}
+_default_level: int = DEFAULT_LEVEL
+_channel_levels: dict[str, int] = {}
+
+class TraceChannel:
+    def __init__(self, name: str, level: int = DEFAULT_LEVEL):
+        self.name = name
+        self.timing: bool = False
+        self.set_level(level)
+        self.set_timing(_sink is not None)
+
+    def set_level(self, level: int):
+        self.level = level
+        self.error = level <= ERROR
+        self.warn = level <= WARN
+        self.info = level <= INFO
+        self.debug = level <= DEBUG
+
+    def set_timing(self, enabled: bool = True):
+        '''
+        Timing records are only written while a JSONL file is open
+        '''
+        self.timing = enabled and _sink is not None
+
+    def log(self, level: int, event: str, **fields: Any):
+        if level < self.level:
+            return
+        level_name = _level_name(level)
+        text = ' '.join(f"{k}={v}" for k, v in fields.items())
+        print(f"[{self.name}:{level_name}] {event} {text}".rstrip(), file=sys.stderr)
+        if _sink is not None:
+            _sink.write({"t": time(), "channel": self.name, "level": level_name, "event": event, **fields})
+
+    def record(self, event: str, start: float, **fields: Any):
+        '''
+        Writes a timing record for something that started at start (from time.perf_counter)
+        '''
+        ms = (perf_counter() - start) * 1000
+        if _sink is not None:
+            _sink.write({"t": time(), "channel": self.name, "event": event, "ms": ms, **fields})
+
+    def timed(self, event: str|None = None) -> Callable[[F], F]:
+        def decorator(fn: F) -> F:
+            if _sink is None:
+                return fn
+            name = event or fn.__name__
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.timing:
+                    return fn(*args, **kwargs)
+                start = perf_counter()
+                res = fn(*args, **kwargs)
+                self.record(name, start)
+                return res
+            return wrapper # type: ignore
+        return decorator
+
+def _level_name(level: int) -> str:
+    for name, value in LEVEL_NAMES.items():
+        if value == level:
+            return name
+    return str(level)
+
+def get_channel(name: str) -> TraceChannel:
+    channel = _channels.get(name)
+    if channel is None:
+        channel = TraceChannel(name, _channel_levels.get(name, _default_level))
+        _channels[name] = channel
+    return channel
+
+def configure(spec: str):
+    '''
+    Sets channel levels from a spec like "math=debug,ui=info"
+    A level without a channel name applies to every channel
+    '''
+    global _default_level
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, level_name = part.rpartition('=')
+        level = LEVEL_NAMES.get(level_name.strip().lower())
+        if level is None:
+            raise ValueError(f"unknown trace level: {level_name}")
+        if name:
+            _channel_levels[name.strip()] = level
+            if name.strip() in _channels:
+                _channels[name.strip()].set_level(level)
+        else:
+            _default_level = level
+            for channel_name, channel in _channels.items():
+                if channel_name not in _channel_levels:
+                    channel.set_level(level)
+
+def open_trace_file(path: str):
+    global _sink
+    close_trace_file()
+    _sink = _JSONLSink(path)
+    for channel in _channels.values():
+        channel.set_timing(True)
+
+def close_trace_file():
+    global _sink
+    if _sink is None:
+        return
+    for channel in _channels.values():
+        channel.set_timing(False)
+    _sink.close()
+    _sink = None
+
+if os.environ.get(ENV_TRACE):
+    configure(os.environ[ENV_TRACE])
+if os.environ.get(ENV_TRACE_FILE):
+    open_trace_file(os.environ[ENV_TRACE_FILE])
+atexit.register(close_trace_file)
@@ -0,0 +1,11 @@
+from __future__ import annotations
+import os
+
+APP_DIR_NAME = "transcendence_effect_placer"
+
+def user_cache_dir(*parts: str) -> str:
+    '''
+    :return: a directory under the user's local application data (or ~/.cache), for files the program keeps between sessions
+    '''
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_DIR_NAME, *parts)
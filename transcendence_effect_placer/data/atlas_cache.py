@@ -0,0 +1,189 @@
+'''
+Decoded frames of a sprite sheet, kept on disk so a sheet that was opened before does not have to be decompressed again
+
+An atlas is one raw RGBA array of every frame, indexed by [anim, rotation, y, x, channel], the same
+way as FacingTable.frame_origins, saved as a .npy file and memory mapped when it is loaded
+Atlases are keyed by the content hash of the sheet and the grid parameters of the SpriteConfig
+
+TEP_ATLAS_CACHE: directory the atlases are kept in, or "off" to disable the cache
+'''
+
+from __future__ import annotations
+import hashlib
+import math
+import os
+import tempfile
+import threading
+import numpy as np
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO, WARN
+from transcendence_effect_placer.common.paths import user_cache_dir
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+
+ENV_ATLAS_CACHE = "TEP_ATLAS_CACHE"
+
+DEFAULT_ATLAS_CACHE_BYTES = 4 * 2 ** 30
+
+ATLAS_VERSION = 1
+
+HASH_CHUNK_BYTES = 2 ** 20
+
+_TRACE = get_channel("frames")
+
+def default_cache_dir() -> str|None:
+    '''
+    :return: directory atlases are kept in, or None if the cache is disabled
+    '''
+    configured = os.environ.get(ENV_ATLAS_CACHE)
+    if configured:
+        return None if configured.lower() == "off" else configured
+    return user_cache_dir("atlas")
+
+def hash_file(path: str, cancel: threading.Event|None = None) -> str|None:
+    '''
+    :return: the content hash of a file, or None if cancel was set before it was finished
+    '''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            if cancel is not None and cancel.is_set():
+                return None
+            chunk = f.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def atlas_key(content_hash: str, cfg: SpriteConfig) -> str:
+    '''
+    Only the parameters that decide which pixels go in which frame are part of the key
+    '''
+    grid = (ATLAS_VERSION, cfg.x, cfg.y, cfg.w, cfg.h, cfg.anim_frames, cfg.rot_frames, cfg.rot_cols)
+    return hashlib.sha1(f"{content_hash}:{grid}".encode()).hexdigest()
+
+def atlas_shape(cfg: SpriteConfig) -> tuple[int, int, int, int, int]:
+    return (cfg.anim_frames + 1, cfg.rot_frames, cfg.h, cfg.w, 4)
+
+def atlas_bytes(cfg: SpriteConfig) -> int:
+    return math.prod(atlas_shape(cfg))
+
+def build_atlas(sheet: SpriteSheet, cfg: SpriteConfig, out: np.ndarray|None = None) -> np.ndarray:
+    '''
+    Copies every frame of a sheet into an atlas
+    Parts of frames that lie outside of the sheet are left transparent, like Image.crop does
+    :param out: array of atlas_shape(cfg) to copy the frames into (such as a memory map of the file it is stored in),
+    so the frames are only copied once
+    '''
+    if out is None:
+        out = np.empty(atlas_shape(cfg), dtype=np.uint8)
+    for anim in range(cfg.anim_frames + 1):
+        for rot in range(cfg.rot_frames):
+            out[anim, rot] = sheet.frame(cfg, rot, anim)
+    return out
+
+class AtlasCache:
+    '''
+    Directory of atlases, trimmed back to byte_budget by dropping the least recently used ones
+    '''
+    def __init__(self, directory: str, byte_budget: int = DEFAULT_ATLAS_CACHE_BYTES):
+        self.directory = directory
+        self.byte_budget = byte_budget
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def load(self, key: str, cfg: SpriteConfig) -> np.ndarray|None:
+        '''
+        :return: a read only memory map of the atlas, or None if it is not cached
+        '''
+        path = self.path_for(key)
+        try:
+            atlas = np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            _TRACE.log(WARN, "unreadable atlas", path=path, error=e)
+            self._remove(path)
+            return None
+        if atlas.shape != atlas_shape(cfg) or atlas.dtype != np.uint8:
+            _TRACE.log(WARN, "atlas does not match its key", path=path, shape=atlas.shape)
+            del atlas
+            self._remove(path)
+            return None
+        #mark it as recently used, so pruning keeps it around
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if _TRACE.info:
+            _TRACE.log(INFO, "atlas mapped", path=path, shape=atlas.shape)
+        return atlas
+
+    def store(self, key: str, sheet: SpriteSheet, cfg: SpriteConfig):
+        '''
+        Writes the atlas of a sheet, building it straight into a memory map of a temporary file
+        so it is never held in memory, and a partly written atlas is never loaded
+        Atlases bigger than the whole byte_budget are not written, since pruning would only delete them again
+        '''
+        nbytes = atlas_bytes(cfg)
+        if nbytes > self.byte_budget:
+            if _TRACE.info:
+                _TRACE.log(INFO, "atlas over cache budget", bytes=nbytes, budget=self.byte_budget)
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        os.close(fd)
+        try:
+            atlas = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=atlas_shape(cfg))
+            build_atlas(sheet, cfg, atlas)
+            atlas.flush()
+            del atlas
+            os.replace(tmp_path, self.path_for(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        if _TRACE.info:
+            _TRACE.log(INFO, "atlas stored", path=self.path_for(key), bytes=nbytes)
+        self.prune(keep=self.path_for(key))
+
+    def prune(self, keep: str|None = None):
+        '''
+        Drops the least recently used atlases until the cache fits in byte_budget
+        :param keep: path of an atlas that is never dropped, such as the one that was just stored
+        '''
+        entries: list[tuple[float, int, str]] = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.byte_budget:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def default_atlas_cache() -> AtlasCache|None:
+    directory = default_cache_dir()
+    if directory is None:
+        return None
+    return AtlasCache(directory)
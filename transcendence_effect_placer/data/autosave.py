@@ -0,0 +1,210 @@
+'''
+Append only autosave journal of a project, one JSON record per line
+
+The journal starts with a snapshot of the whole project, every sync after that only appends what changed:
+{"op": "snapshot", "project": {...}, "ids": [...]}
+{"op": "put", "id": 3, "point": {...}}      a point was added or edited
+{"op": "remove", "id": 3}
+{"op": "order", "ids": [...]}              points were added, removed or reordered
+{"op": "config", "sprite_config": {...}, "sprite_path": "..."}
+
+Points are found to have changed through Point.revision, so a sync costs a loop over the points
+Once enough records pile up the journal is compacted back into a single snapshot
+'''
+
+from __future__ import annotations
+import json
+import os
+import time
+from typing import Any, TextIO
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO, WARN
+from transcendence_effect_placer.common.paths import user_cache_dir
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.points import Point
+from transcendence_effect_placer.data.project import Project, ProjectError, load_project, point_to_dict, point_from_dict, project_to_dict, project_from_dict, sprite_config_to_dict, sprite_config_from_dict
+
+AUTOSAVE_SUFFIX = ".autosave.jsonl"
+
+DEFAULT_COMPACT_AFTER = 1000
+
+_TRACE = get_channel("project")
+
+def autosave_path(project_path: str|None) -> str:
+    '''
+    :return: the journal kept next to a project, or a new journal in the user cache for a project that was never saved
+    '''
+    if project_path is None:
+        return user_cache_dir("autosave", f"untitled-{time.strftime('%Y%m%d-%H%M%S')}{AUTOSAVE_SUFFIX}")
+    return f"{project_path}{AUTOSAVE_SUFFIX}"
+
+class AutosaveJournal:
+    def __init__(self, path: str, compact_after: int = DEFAULT_COMPACT_AFTER):
+        self.path = path
+        self.compact_after = compact_after
+        self._file: TextIO|None = None
+        self._records: int = 0
+        self._next_id: int = 0
+        #id and revision of every point as of the last record written
+        self._saved: dict[Point, tuple[int, int]] = {}
+        self._order: list[int] = []
+        self._config: dict[str, Any]|None = None
+
+    def start(self, project: Project):
+        '''
+        Replaces the journal with a snapshot of a project
+        '''
+        self.close()
+        self._saved = {}
+        self._next_id = 0
+        ids = [self._track(pt) for pt in project.points]
+        self._order = ids
+        self._config = self._config_record(project.sprite_cfg, project.sprite_path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"op": "snapshot", "project": project_to_dict(project), "ids": ids}, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._records = 1
+
+    def sync(self, points: list[Point], sprite_cfg: SpriteConfig, sprite_path: str|None) -> int:
+        '''
+        Appends a record for everything that changed since the last sync
+        :return: number of records written
+        '''
+        if self._file is None:
+            self.start(Project(sprite_cfg, points, sprite_path))
+            return 1
+        if self._records >= self.compact_after:
+            self.start(Project(sprite_cfg, points, sprite_path))
+            if _TRACE.info:
+                _TRACE.log(INFO, "autosave compacted", path=self.path, points=len(points))
+            return 1
+
+        records: list[dict[str, Any]] = []
+        config = self._config_record(sprite_cfg, sprite_path)
+        if config != self._config:
+            records.append({"op": "config", **config})
+            self._config = config
+
+        order: list[int] = []
+        seen: set[Point] = set()
+        for pt in points:
+            seen.add(pt)
+            saved = self._saved.get(pt)
+            if saved is None:
+                point_id = self._track(pt)
+                records.append({"op": "put", "id": point_id, "point": point_to_dict(pt)})
+            else:
+                point_id, revision = saved
+                if revision != pt.revision:
+                    self._saved[pt] = (point_id, pt.revision)
+                    records.append({"op": "put", "id": point_id, "point": point_to_dict(pt)})
+            order.append(point_id)
+        for pt in [pt for pt in self._saved if pt not in seen]:
+            point_id, _ = self._saved.pop(pt)
+            records.append({"op": "remove", "id": point_id})
+        if order != self._order:
+            records.append({"op": "order", "ids": order})
+            self._order = order
+
+        if records:
+            self._file.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records))
+            self._file.flush()
+            self._records += len(records)
+        return len(records)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        '''
+        Removes the journal, once what it holds has been saved properly
+        '''
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _track(self, pt: Point) -> int:
+        point_id = self._next_id
+        self._next_id += 1
+        self._saved[pt] = (point_id, pt.revision)
+        return point_id
+
+    @staticmethod
+    def _config_record(sprite_cfg: SpriteConfig, sprite_path: str|None) -> dict[str, Any]:
+        return {"sprite_config": sprite_config_to_dict(sprite_cfg), "sprite_path": sprite_path}
+
+def replay_journal(path: str) -> Project:
+    '''
+    Rebuilds a project from its journal
+    A record cut off by a crash at the end of the journal is ignored
+    '''
+    project: Project|None = None
+    points: dict[int, Point] = {}
+    order: list[int] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    for n, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if n == len(lines) - 1:
+                _TRACE.log(WARN, "ignoring truncated autosave record", path=path)
+                break
+            raise ProjectError(f"{path} is corrupt at line {n + 1}")
+        op = record.get("op")
+        if op == "snapshot":
+            project = project_from_dict(record["project"])
+            order = list(record["ids"])
+            points = dict(zip(order, project.points))
+        elif project is None:
+            raise ProjectError(f"{path} does not start with a snapshot")
+        elif op == "put":
+            points[record["id"]] = point_from_dict(record["point"], project.sprite_cfg)
+        elif op == "remove":
+            points.pop(record["id"], None)
+        elif op == "order":
+            order = list(record["ids"])
+        elif op == "config":
+            cfg = sprite_config_from_dict(record["sprite_config"])
+            #points share the config object, so update it in place
+            for name, value in vars(cfg).items():
+                if not name.startswith('_'):
+                    setattr(project.sprite_cfg, name, value)
+            project.sprite_path = record.get("sprite_path")
+        else:
+            raise ProjectError(f"{path} has an unknown record at line {n + 1}: {op}")
+    if project is None:
+        raise ProjectError(f"{path} is empty")
+    project.points = [points[point_id] for point_id in order if point_id in points]
+    return project
+
+def load_project_or_autosave(project_path: str) -> Project:
+    '''
+    Loads a project, or its journal instead if that holds edits made after the project was last saved
+    A journal can also be opened directly, to recover a project that was never saved
+    '''
+    if project_path.endswith(AUTOSAVE_SUFFIX):
+        return replay_journal(project_path)
+    journal_path = autosave_path(project_path)
+    try:
+        newer = os.path.getmtime(journal_path) > os.path.getmtime(project_path)
+    except OSError:
+        newer = False
+    if newer:
+        try:
+            project = replay_journal(journal_path)
+            if _TRACE.info:
+                _TRACE.log(INFO, "recovered project from autosave", path=journal_path)
+            return project
+        except (OSError, ProjectError, KeyError) as e:
+            _TRACE.log(WARN, "could not recover autosave", path=journal_path, error=e)
+    return load_project(project_path)
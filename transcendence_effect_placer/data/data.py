@@ -1,6 +1,7 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import math
+import numpy as np
 
 @dataclass
 class SpriteConfig:
@@ -13,6 +14,7 @@ class SpriteConfig:
     rot_cols: int = 20
     viewport_ratio: float = 0.2
     real: bool = False
+    _facing_table: FacingTable|None = field(default=None, init=False, repr=False, compare=False)
 
     def rot_col_size(self) -> int:
         return math.floor((self.rot_frames - 1) / self.rot_cols) + 1
@@ -36,6 +38,77 @@ class SpriteConfig:
         y = self.y + rot_y
         return ICoord(x, y)
 
+    def facing_table(self) -> FacingTable:
+        '''
+        Returns the lookup table for this configuration, rebuilding it only if the configuration changed
+        '''
+        table = self._facing_table
+        if table is None or table.key != FacingTable.key_for(self):
+            table = FacingTable(self)
+            self._facing_table = table
+        return table
+
+class FacingTable:
+    '''
+    Values that only depend on the SpriteConfig, precomputed so that redraws do not recompute them
+
+    directions: the facing (whole degrees) each rotation frame is displayed at
+    offsets: the exact facing (degrees) of each rotation frame
+    frame_origins: upper left corner of every frame, indexed by [anim, rotation] -> (x, y)
+    '''
+    def __init__(self, cfg: SpriteConfig):
+        self.key = FacingTable.key_for(cfg)
+        self.w = cfg.w
+        self.h = cfg.h
+        self.rot_frames = cfg.rot_frames
+        self.anim_frames = cfg.anim_frames
+
+        rotations = np.arange(cfg.rot_frames)
+        self.offsets: np.ndarray = rotations * (360 / cfg.rot_frames)
+        self.directions: np.ndarray = np.round(self.offsets).astype(np.int64)
+        self._directions: tuple[int, ...] = tuple(int(d) for d in self.directions)
+        self._offsets: tuple[float, ...] = tuple(float(o) for o in self.offsets)
+
+        degrees = np.radians(np.arange(360))
+        self._trig: tuple[tuple[float, float], ...] = tuple(zip(np.sin(degrees).tolist(), np.cos(degrees).tolist()))
+
+        col_size = cfg.rot_col_size()
+        anims = np.arange(cfg.anim_frames + 1)
+        rot_x = (rotations // col_size) * cfg.w
+        rot_y = (rotations % col_size) * cfg.h
+        anim_x = anims * cfg.w * cfg.rot_cols
+        origins = np.empty((cfg.anim_frames + 1, cfg.rot_frames, 2), dtype=np.int64)
+        origins[:, :, 0] = cfg.x + anim_x[:, np.newaxis] + rot_x[np.newaxis, :]
+        origins[:, :, 1] = cfg.y + rot_y[np.newaxis, :]
+        self.frame_origins: np.ndarray = origins
+
+    @staticmethod
+    def key_for(cfg: SpriteConfig) -> tuple:
+        return (cfg.x, cfg.y, cfg.w, cfg.h, cfg.anim_frames, cfg.rot_frames, cfg.rot_cols, cfg.viewport_size())
+
+    def direction(self, rotation: int) -> int:
+        return self._directions[rotation]
+
+    def offset(self, rotation: int) -> float:
+        return self._offsets[rotation]
+
+    def direction_trig(self, direction: int|float) -> tuple[float, float]:
+        '''
+        :return: sin and cos of a facing in degrees
+        '''
+        d = direction % 360
+        if d == int(d):
+            return self._trig[int(d)]
+        r = math.radians(d)
+        return (math.sin(r), math.cos(r))
+
+    def frame_box(self, rotation: int = 0, anim: int = 0) -> tuple[int, int, int, int]:
+        '''
+        :return: crop rectangle (left, upper, right, lower) of a frame
+        '''
+        x, y = self.frame_origins[anim, rotation].tolist()
+        return (x, y, x + self.w, y + self.h)
+
 @dataclass
 class CCoord:
     x: float = 0.0
@@ -0,0 +1,37 @@
+from __future__ import annotations
+import io
+from typing import TextIO
+
+from transcendence_effect_placer.data.points import Point, PointType, PT_DEVICE, PT_DOCK, PT_THRUSTER
+from transcendence_effect_placer.data.xml_writer import XMLWriter
+
+#section every exported point type is written under, in the order the sections appear
+EXPORT_SECTIONS: list[tuple[str, PointType]] = [
+    ("DockingPorts", PT_DOCK),
+    ("DeviceSlots", PT_DEVICE),
+    ("Effects", PT_THRUSTER),
+]
+
+def write_export_xml(points: list[Point], f: TextIO):
+    '''
+    Writes the XML that is pasted into a <ShipClass> from a list of points, one element at a time
+    Sections without any points are left out
+    Each point's elements are formatted once and reused until the point changes
+    '''
+    writer = XMLWriter(f)
+    for tag, point_type in EXPORT_SECTIONS:
+        section = [pt for pt in points if pt.point_type == point_type]
+        if not section:
+            continue
+        writer.start(tag)
+        for pt in section:
+            writer.formatted(pt.xml_lines())
+        writer.end(tag)
+
+def build_export_xml(points: list[Point]) -> str:
+    '''
+    Builds the XML that is pasted into a <ShipClass> from a list of points
+    '''
+    f = io.StringIO()
+    write_export_xml(points, f)
+    return f.getvalue()
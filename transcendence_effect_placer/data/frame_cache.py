@@ -0,0 +1,81 @@
+from __future__ import annotations
+from collections import OrderedDict
+import threading
+from typing import Callable
+from PIL.Image import Image
+
+DEFAULT_FRAME_CACHE_BYTES = 512 * 2 ** 20
+
+FrameKey = tuple[int, int] #(rotation frame, animation frame)
+
+def image_bytes(image: Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+class FrameCache:
+    '''
+    Least recently used cache of frame images made from a SpriteSheet, bounded by the bytes the frames hold
+
+    Frames handed out are shared, so callers must copy them before drawing on them
+    The cache is safe to share with a prefetching thread
+    '''
+    def __init__(self, byte_budget: int = DEFAULT_FRAME_CACHE_BYTES):
+        self._lock = threading.RLock()
+        self._frames: OrderedDict[FrameKey, Image] = OrderedDict()
+        self._bytes: int = 0
+        self.byte_budget = byte_budget
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __contains__(self, key: FrameKey) -> bool:
+        return key in self._frames
+
+    def used_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: FrameKey) -> Image|None:
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key: FrameKey, frame: Image):
+        with self._lock:
+            old = self._frames.pop(key, None)
+            if old is not None:
+                self._bytes -= image_bytes(old)
+            size = image_bytes(frame)
+            if size > self.byte_budget:
+                #never evict everything for a frame that could not be kept anyways
+                return
+            self._frames[key] = frame
+            self._bytes += size
+            self._evict()
+
+    def get_or_load(self, key: FrameKey, loader: Callable[[], Image]) -> Image:
+        frame = self.get(key)
+        if frame is None:
+            frame = loader()
+            self.put(key, frame)
+        return frame
+
+    def set_budget(self, byte_budget: int):
+        with self._lock:
+            self.byte_budget = byte_budget
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+    def _evict(self):
+        while self._bytes > self.byte_budget and self._frames:
+            _, frame = self._frames.popitem(last=False)
+            self._bytes -= image_bytes(frame)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import threading
+from typing import Callable
+from PIL.Image import Image
+
+from transcendence_effect_placer.common.diagnostics import get_channel, ERROR
+from transcendence_effect_placer.data.frame_cache import FrameCache, FrameKey
+
+DEFAULT_PREFETCH_AHEAD = 12
+DEFAULT_PREFETCH_BEHIND = 2
+
+_TRACE = get_channel("frames")
+
+class FramePrefetcher:
+    '''
+    Worker thread that prepares frames around the one being displayed and puts them in a FrameCache
+
+    Frames are prefetched in the direction the user is scrubbing, for whichever of the
+    rotation or animation frame changed last, so that the display only has to composite and blit
+    '''
+    def __init__(self, cache: FrameCache, loader: Callable[[FrameKey], Image], ahead: int = DEFAULT_PREFETCH_AHEAD, behind: int = DEFAULT_PREFETCH_BEHIND):
+        self._cache = cache
+        self._loader = loader
+        self.ahead = ahead
+        self.behind = behind
+        self._cond = threading.Condition()
+        self._generation: int = 0
+        self._pending: list[FrameKey] = []
+        self._last: FrameKey|None = None
+        self._rot_step: int = 1
+        self._anim_step: int = 1
+        self._running = False
+        self._thread: threading.Thread|None = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        '''
+        Drops pending work; frames still being loaded for the old sprite are discarded
+        Must be called before clearing the cache when the sprite or its parameters change
+        '''
+        with self._cond:
+            self._generation += 1
+            self._pending = []
+            self._last = None
+
+    def update(self, rot: int, anim: int, rot_frames: int, anim_frames: int):
+        '''
+        Tells the prefetcher which frame is being displayed
+        anim_frames is the number of additional animation frames, as in SpriteConfig
+        '''
+        with self._cond:
+            last = self._last
+            self._last = (rot, anim)
+            anim_moved = False
+            if last is not None:
+                rot_delta = _wrapped_delta(rot - last[0], rot_frames)
+                anim_delta = anim - last[1]
+                if rot_delta:
+                    self._rot_step = 1 if rot_delta > 0 else -1
+                elif anim_delta:
+                    self._anim_step = 1 if anim_delta > 0 else -1
+                    anim_moved = True
+            pending: list[FrameKey] = []
+            if anim_moved:
+                pending += self._anim_keys(rot, anim, anim_frames)
+                pending += self._rot_keys(rot, anim, rot_frames)
+            else:
+                pending += self._rot_keys(rot, anim, rot_frames)
+                pending += self._anim_keys(rot, anim, anim_frames)
+            self._pending = pending
+            self._cond.notify_all()
+
+    def _rot_keys(self, rot: int, anim: int, rot_frames: int) -> list[FrameKey]:
+        keys = [((rot + self._rot_step * i) % rot_frames, anim) for i in range(1, self.ahead + 1)]
+        keys += [((rot - self._rot_step * i) % rot_frames, anim) for i in range(1, self.behind + 1)]
+        return keys
+
+    def _anim_keys(self, rot: int, anim: int, anim_frames: int) -> list[FrameKey]:
+        count = anim_frames + 1
+        if count <= 1:
+            return []
+        keys = [(rot, (anim + self._anim_step * i) % count) for i in range(1, min(self.ahead, count - 1) + 1)]
+        return keys
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                key = self._pending.pop(0)
+                generation = self._generation
+            if key in self._cache:
+                continue
+            try:
+                frame = self._loader(key)
+            except Exception as e:
+                _TRACE.log(ERROR, "prefetch failed", key=key, error=e)
+                continue
+            with self._cond:
+                if generation == self._generation:
+                    self._cache.put(key, frame)
+
+def _wrapped_delta(delta: int, frames: int) -> int:
+    '''
+    Shortest signed distance between two rotation frames, since rotation wraps around
+    '''
+    if frames <= 0:
+        return delta
+    delta %= frames
+    if delta > frames // 2:
+        delta -= frames
+    return delta
@@ -0,0 +1,164 @@
+'''
+Per rotation frame values stored as runs of equal values, such as a thruster's under/over layering
+
+Runs are kept as two parallel sorted lists (the first frame of every run, and its value),
+so finding the run a frame is in is a bisect, and assigning a whole range of frames only touches the runs at its ends
+'''
+
+from __future__ import annotations
+from bisect import bisect_right
+from typing import Iterable, Iterator
+
+class FrameRuns:
+    def __init__(self, length: int = 0, value: int = 0):
+        self._length = length
+        #first frame of each run, always starting at 0, and the value of each run
+        #neighbouring runs never have the same value
+        self._starts: list[int] = [0] if length > 0 else []
+        self._values: list[int] = [value] if length > 0 else []
+
+    @classmethod
+    def from_frames(cls, values: Iterable[int]) -> FrameRuns:
+        runs = cls()
+        for value in values:
+            if runs._values and runs._values[-1] == value:
+                runs._length += 1
+            else:
+                runs._starts.append(runs._length)
+                runs._values.append(value)
+                runs._length += 1
+        return runs
+
+    @classmethod
+    def from_runs(cls, runs: Iterable[Iterable[int]]) -> FrameRuns:
+        '''
+        :param runs: [value, length] of every run, as saved by to_runs
+        '''
+        frame_runs = cls()
+        for value, length in runs:
+            if length <= 0:
+                continue
+            if frame_runs._values and frame_runs._values[-1] == value:
+                frame_runs._length += length
+                continue
+            frame_runs._starts.append(frame_runs._length)
+            frame_runs._values.append(value)
+            frame_runs._length += length
+        return frame_runs
+
+    def to_runs(self) -> list[list[int]]:
+        return [[value, stop - start] for value, start, stop in self.runs()]
+
+    def copy(self) -> FrameRuns:
+        copied = FrameRuns()
+        copied._length = self._length
+        copied._starts = list(self._starts)
+        copied._values = list(self._values)
+        return copied
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, frame: int) -> int:
+        if frame < 0:
+            frame += self._length
+        if not 0 <= frame < self._length:
+            raise IndexError(f"frame {frame} out of range for {self._length} frames")
+        return self._values[bisect_right(self._starts, frame) - 1]
+
+    def __setitem__(self, frame: int, value: int):
+        if frame < 0:
+            frame += self._length
+        if not 0 <= frame < self._length:
+            raise IndexError(f"frame {frame} out of range for {self._length} frames")
+        self.assign(frame, frame + 1, value)
+
+    def __iter__(self) -> Iterator[int]:
+        for value, start, stop in self.runs():
+            for _ in range(start, stop):
+                yield value
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FrameRuns):
+            return self._length == other._length and self._starts == other._starts and self._values == other._values
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"FrameRuns({self.to_runs()})"
+
+    def runs(self) -> Iterator[tuple[int, int, int]]:
+        '''
+        :return: value, first frame and end frame (exclusive) of every run
+        '''
+        for i, (start, value) in enumerate(zip(self._starts, self._values)):
+            stop = self._starts[i + 1] if i + 1 < len(self._starts) else self._length
+            yield (value, start, stop)
+
+    def assign(self, start: int, stop: int, value: int):
+        '''
+        Sets every frame from start up to (not including) stop, frames outside of the range are ignored
+        '''
+        start = max(start, 0)
+        stop = min(stop, self._length)
+        if start >= stop:
+            return
+        starts = self._starts
+        values = self._values
+        first = bisect_right(starts, start) - 1
+        last = bisect_right(starts, stop) - 1
+        #runs before start are kept, as is the part of the run containing stop that comes after it
+        lo = first if starts[first] == start else first + 1
+        new_starts = [start]
+        new_values = [value]
+        if stop < self._length:
+            hi = last + 1
+            new_starts.append(stop)
+            new_values.append(values[last])
+        else:
+            hi = len(starts)
+        starts[lo:hi] = new_starts
+        values[lo:hi] = new_values
+        #merge with neighbours that ended up with the same value
+        for i in range(min(lo + 2, len(starts) - 1), max(lo, 1) - 1, -1):
+            if values[i] == values[i - 1]:
+                del starts[i]
+                del values[i]
+
+    def resized(self, length: int) -> FrameRuns:
+        '''
+        Remaps the runs onto a different number of frames, keeping them at the same facings
+        eg frames 10-19 of 40 become frames 90-179 of 360
+        '''
+        if length == self._length:
+            return self.copy()
+        resized = FrameRuns(length)
+        if self._length == 0:
+            return resized
+        for value, start, stop in self.runs():
+            resized.assign(round(start * length / self._length), round(stop * length / self._length), value)
+        return resized
+
+    def ranges(self, value: int) -> list[tuple[int, int]]:
+        '''
+        :return: first frame and end frame (exclusive) of every run with a value
+        '''
+        return [(start, stop) for run_value, start, stop in self.runs() if run_value == value]
+
+    def format_ranges(self, value: int) -> str:
+        '''
+        Formats the frames with a value the way sendToBack and bringToFront list them, eg "0,3-5,7"
+        :return: "*" if every frame has the value, empty if none do
+        '''
+        if self._length > 0 and self._values == [value]:
+            return "*"
+        parts: list[str] = []
+        for start, stop in self.ranges(value):
+            if stop - start == 1:
+                parts.append(f"{start}")
+            elif stop - start == 2:
+                parts.append(f"{start},{start + 1}")
+            else:
+                parts.append(f"{start}-{stop - 1}")
+        return ','.join(parts)
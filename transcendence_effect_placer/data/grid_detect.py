@@ -0,0 +1,215 @@
+'''
+Works out the frame grid of a sprite sheet from where its pixels are, so the sprite settings can be filled in
+
+Frames are separated by (at least a line of) empty pixels, so summing the hull along each row and column
+gives profiles that repeat once per frame:
+1. the pitch of the profiles is found on a downsampled copy of the sheet, by autocorrelation
+2. it is refined at full resolution along each axis, by finding the pitch whose frame boundaries all land on empty pixels
+3. which frames hold anything gives the rotation columns and animation frames, since rotation frames fill
+   each column top to bottom, and each animation frame repeats the same columns to the right
+'''
+
+from __future__ import annotations
+import math
+import numpy as np
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.silhouette import hull_mask
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+
+#longest side of the downsampled copy used for the first pass
+COARSE_SIZE = 1024
+#smallest frame (pixels) that is looked for
+MIN_FRAME_SIZE = 8
+#how strong the repetition has to be (relative to a perfect one) to count as a grid
+MIN_PERIODICITY = 0.2
+#most rotation frames an animation frame can have, more than this means the columns hold several animation frames
+MAX_ROT_FRAMES = 360
+
+_TRACE = get_channel("frames")
+
+def _find_pitch(profile: np.ndarray, min_pitch: int) -> int|None:
+    '''
+    :return: the shortest period the profile repeats at, or None if it does not repeat
+    '''
+    n = len(profile)
+    centred = profile - profile.mean()
+    spectrum = np.fft.rfft(centred, 2 * n)
+    correlation = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    if correlation[0] <= 0:
+        return None
+    #normalize for the shrinking overlap at longer lags
+    correlation = correlation / correlation[0] * n / np.maximum(n - np.arange(n), 1)
+    #neighbouring lags always correlate, so only look past where the correlation first drops off
+    below = np.flatnonzero(correlation[:n // 2 + 1] < 0)
+    if not len(below):
+        return None
+    lags = np.arange(max(min_pitch, int(below[0]), 1), n // 2 + 1)
+    if len(lags) < 3:
+        return None
+    scores = correlation[lags]
+    peaks = np.flatnonzero((scores[1:-1] >= scores[:-2]) & (scores[1:-1] >= scores[2:])) + 1
+    if not len(peaks) or scores[peaks].max() < MIN_PERIODICITY:
+        return None
+    #multiples of the pitch repeat as well, so take the first peak that is nearly as good as the best
+    best = scores[peaks].max()
+    return int(lags[peaks[np.argmax(scores[peaks] >= best * 0.8)]])
+
+def _boundary_mass(profile: np.ndarray, pitch: int) -> np.ndarray:
+    '''
+    :return: for every phase, how much of the hull frame boundaries at that phase would cut through
+    '''
+    return np.bincount(np.arange(len(profile)) % pitch, weights=profile, minlength=pitch)
+
+def _emptiest_run(mass: np.ndarray) -> tuple[int, int]:
+    '''
+    :return: first phase and length of the longest run of phases with the least mass, which can wrap around
+    '''
+    pitch = len(mass)
+    empty = mass <= mass.min()
+    if empty.all():
+        return (0, pitch)
+    #unrolled, so a run that wraps around is in one piece
+    phases = np.flatnonzero(np.concatenate((empty, empty)))
+    runs = np.split(phases, np.flatnonzero(np.diff(phases) != 1) + 1)
+    run = max(runs, key=len)
+    return (int(run[0]) % pitch, min(len(run), pitch))
+
+def _fills_sheet(profile: np.ndarray, pitch: int, tolerance: float) -> bool:
+    '''
+    :return: whether a grid of this pitch starting at the start of the sheet ends at its far edge,
+    without its boundaries cutting through more than tolerance of the hull
+    '''
+    return len(profile) % pitch == 0 and float(profile[::pitch].sum()) <= tolerance
+
+def _refine_pitch(profile: np.ndarray, estimate: int, slack: int) -> int:
+    '''
+    Frame boundaries at the right pitch stay in the gaps between frames all the way across the sheet,
+    at any other pitch they drift into the frames, so the right pitch has the least hull on its boundaries
+    and the widest gap
+    With only a few frames across the sheet several pitches keep their boundaries empty, and frames showing
+    different facings can widen the gap of the wrong ones, so a pitch that fills the sheet exactly goes first
+    '''
+    candidates = range(max(MIN_FRAME_SIZE, estimate - slack - 1), min(len(profile), estimate + slack + 1) + 1)
+    if not len(candidates):
+        return estimate
+    def score(pitch: int) -> tuple[float, bool, int, int]:
+        mass = _boundary_mass(profile, pitch)
+        least = float(mass.min())
+        _, gap = _emptiest_run(mass)
+        return (least, not _fills_sheet(profile, pitch, least), -gap, abs(pitch - estimate))
+    return min(candidates, key=score)
+
+def _split_pitch(profile: np.ndarray, pitch: int, slack: int) -> int:
+    '''
+    Columns (or rows) of frames showing different facings can look alike every few frames,
+    so the pitch found may be a multiple of the real one, whose boundaries would be just as empty
+    With empty margins around the frames, pitches a little off that multiple can keep their few boundaries empty too,
+    so every split down to the smallest frame is tried, and the smallest one whose boundaries stay empty is taken
+    A narrow hull can also fit between the boundaries of a split, leaving every other frame (or every third...) empty,
+    so a split only counts if the frames holding anything are not spaced out like that
+    '''
+    tolerance = _boundary_mass(profile, pitch).min() + profile.sum() * 0.001
+    def splits(split: int) -> bool:
+        if _boundary_mass(profile, split).min() > tolerance:
+            return False
+        origin = _origin(profile, split)
+        occupied = np.flatnonzero(np.add.reduceat(profile[origin:], np.arange(0, len(profile) - origin, split)))
+        return len(occupied) > 1 and int(np.gcd.reduce(occupied - occupied[0])) == 1
+    for parts in range(pitch // MIN_FRAME_SIZE, 1, -1):
+        #the pitch is off by at most the slack, so a split of it is off by less
+        split_slack = slack // parts
+        estimate = round(pitch / parts)
+        candidates = range(max(MIN_FRAME_SIZE, estimate - split_slack - 1), estimate + split_slack + 2)
+        if any(splits(split) for split in candidates):
+            return _refine_pitch(profile, estimate, split_slack)
+    return pitch
+
+def _origin(profile: np.ndarray, pitch: int) -> int:
+    '''
+    :return: where the first frame starts, which is the start of the sheet if the grid fills it exactly,
+    and otherwise the middle of the empty gap between frames
+    '''
+    mass = _boundary_mass(profile, pitch)
+    if _fills_sheet(profile, pitch, float(mass.min())):
+        phase = 0
+    else:
+        start, length = _emptiest_run(mass)
+        phase = (start + length // 2) % pitch
+    first = int(np.argmax(profile > 0))
+    return max(0, phase + pitch * math.floor((first - phase) / pitch))
+
+def _cells(profile: np.ndarray, origin: int, pitch: int) -> int:
+    #a grid that fills the sheet keeps the empty frames at its end, which tell apart the animation frames
+    if origin == 0 and len(profile) % pitch == 0:
+        return len(profile) // pitch
+    last = len(profile) - 1 - int(np.argmax(profile[::-1] > 0))
+    return max(1, math.ceil((last + 1 - origin) / pitch))
+
+def _split_columns(occupied: np.ndarray) -> tuple[int, int, int]:
+    '''
+    :param occupied: which frames hold anything, indexed [row, column]
+    :return: rotation columns, rotation frames and animation frames
+    '''
+    rows, cols = occupied.shape
+    for rot_cols in range(cols, 0, -1):
+        if cols % rot_cols:
+            continue
+        counts = []
+        for anim in range(cols // rot_cols):
+            #rotation frames go down each column before moving to the next one
+            frames = occupied[:, anim * rot_cols:(anim + 1) * rot_cols].T.ravel()
+            count = int(np.argmin(frames)) if not frames.all() else len(frames)
+            if frames[count:].any():
+                break
+            counts.append(count)
+        else:
+            rot_frames = counts[0]
+            if all(count == rot_frames for count in counts) and 0 < rot_frames <= MAX_ROT_FRAMES and (rot_frames - 1) // rot_cols + 1 == rows:
+                return (rot_cols, rot_frames, cols // rot_cols - 1)
+    return (cols, int(occupied.sum()), 0)
+
+def detect_sprite_grid(sheet: SpriteSheet) -> SpriteConfig|None:
+    '''
+    :return: a config with the grid filled in (and the rest left at defaults), or None if no grid was found
+    '''
+    if sheet.is_atlas:
+        return None
+    pixels = sheet.pixels
+    height, width = pixels.shape[:2]
+    step = max(1, math.ceil(max(height, width) / COARSE_SIZE))
+    coarse_pixels = pixels[::step, ::step]
+    transparent = bool((coarse_pixels[..., 3] < 255).any())
+    coarse = hull_mask(coarse_pixels, transparent)
+    if not coarse.any():
+        return None
+
+    cfg = SpriteConfig()
+    grid: list[tuple[int, int, int]] = []
+    for axis in (1, 0):
+        coarse_profile = coarse.sum(axis=1 - axis)
+        #full resolution along this axis, while still skipping rows (or columns) across it
+        fine = hull_mask(pixels[::step, :] if axis == 1 else pixels[:, ::step], transparent)
+        profile = fine.sum(axis=1 - axis).astype(np.float64)
+        estimate = _find_pitch(coarse_profile, max(1, MIN_FRAME_SIZE // step))
+        if estimate is None:
+            #a single frame across this axis, or too few frames for the repetition to show
+            pitch = _split_pitch(profile, len(profile), step)
+        else:
+            pitch = _split_pitch(profile, _refine_pitch(profile, estimate * step, step), step)
+        origin = _origin(profile, pitch) if pitch < len(profile) else 0
+        grid.append((origin, pitch, _cells(profile, origin, pitch)))
+    (cfg.x, cfg.w, cols), (cfg.y, cfg.h, rows) = grid
+
+    #which frames hold anything, from the downsampled copy as long as it still samples every frame a few times
+    step_y = max(1, min(step, cfg.h // 4))
+    step_x = max(1, min(step, cfg.w // 4))
+    occupied = coarse if step_y == step_x == step else hull_mask(pixels[::step_y, ::step_x], transparent)
+    starts_y = np.minimum(-(-(cfg.y + np.arange(rows) * cfg.h) // step_y), occupied.shape[0] - 1)
+    starts_x = np.minimum(-(-(cfg.x + np.arange(cols) * cfg.w) // step_x), occupied.shape[1] - 1)
+    counts = np.add.reduceat(np.add.reduceat(occupied.astype(np.int64), starts_y, axis=0), starts_x, axis=1)
+    cfg.rot_cols, cfg.rot_frames, cfg.anim_frames = _split_columns(counts > 0)
+    if _TRACE.info:
+        _TRACE.log(INFO, "detected sprite grid", x=cfg.x, y=cfg.y, w=cfg.w, h=cfg.h, rot_cols=cfg.rot_cols, rot_frames=cfg.rot_frames, anim_frames=cfg.anim_frames)
+    return cfg
@@ -0,0 +1,98 @@
+'''
+Works out a thruster's sendToBack/bringToFront from the sprite itself, for every rotation frame at once
+
+Each thruster (and each of its mirrors) is projected into every rotation frame,
+then the hull silhouette is sampled at the nozzle and along the direction the flame points:
+- the flame runs across the hull: it would be drawn over the hull, so it is sent to back
+- the nozzle is on the hull but the flame points away from it: brought to front, so the hull does not cover it
+- otherwise the flame is clear of the hull and left for the game to decide
+
+A thruster exports one sendToBack/bringToFront for all of its mirrors, so a frame is sent to back
+if any mirror is hidden there, and otherwise brought to front if any mirror needs it
+'''
+
+from __future__ import annotations
+import numpy as np
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.frame_runs import FrameRuns
+from transcendence_effect_placer.data.points import Point, PointThuster
+from transcendence_effect_placer.data.silhouette import has_transparency, hull_at
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+
+#length of the flame that is sampled, relative to the frame width
+FLAME_LENGTH_RATIO = 0.06
+MIN_FLAME_LENGTH = 3
+#fraction of the flame that has to be over the hull for it to count as hidden
+FLAME_COVERAGE = 0.5
+#facings (degrees) that each decision is smoothed over, so a flame running along the edge of the hull does not flicker between layers
+SMOOTHING_DEGREES = 6
+
+_TRACE = get_channel("points")
+
+def _smooth(flags: np.ndarray, window: int) -> np.ndarray:
+    '''
+    Majority of each frame's neighbours, wrapping around since the first and last frames are neighbours too
+    '''
+    if window <= 1 or len(flags) <= window:
+        return flags
+    half = window // 2
+    padded = np.concatenate((flags[-half:], flags, flags[:half])).astype(np.int64)
+    counts = np.convolve(padded, np.ones(2 * half + 1, dtype=np.int64), mode="valid")
+    return counts * 2 > 2 * half + 1
+
+def compute_under_over(pt: PointThuster, sheet: SpriteSheet, cfg: SpriteConfig, anim: int = 0, transparent: bool|None = None) -> FrameRuns:
+    '''
+    :param transparent: whether the sheet has a transparent background, checked from the frame corners if not given
+    :return: the layering of a thruster for every rotation frame
+    '''
+    if transparent is None:
+        transparent = has_transparency(sheet, cfg, anim)
+    facings = cfg.facing_table()
+    directions = facings.directions
+    rotation = np.arange(cfg.rot_frames)
+    flame_length = max(MIN_FLAME_LENGTH, round(cfg.w * FLAME_LENGTH_RATIO))
+    steps = np.arange(1, flame_length + 1)
+
+    hidden = np.zeros(cfg.rot_frames, dtype=bool)
+    exposed = np.zeros(cfg.rot_frames, dtype=bool)
+    for mirror in pt._get_mirror_options():
+        coords = pt.get_projection_coords_at_directions(directions, mirror)
+        x = coords[:, 0]
+        y = coords[:, 1]
+        #same angle the flame marker is drawn at
+        thrust_angle = round(pt._mirror_angle_degrees((180 - pt.direction) % 360, mirror))
+        flame = np.radians((thrust_angle + directions + (-90 if mirror.x else 90)) % 360)
+        flame_x = np.rint(x[:, np.newaxis] + np.cos(flame)[:, np.newaxis] * steps).astype(np.int64)
+        flame_y = np.rint(y[:, np.newaxis] + np.sin(flame)[:, np.newaxis] * steps).astype(np.int64)
+
+        on_hull = hull_at(sheet, cfg, rotation, x, y, anim, transparent)
+        coverage = hull_at(sheet, cfg, rotation[:, np.newaxis], flame_x, flame_y, anim, transparent).mean(axis=1)
+        mirror_hidden = coverage >= FLAME_COVERAGE
+        hidden |= mirror_hidden
+        exposed |= on_hull & ~mirror_hidden
+
+    window = round(SMOOTHING_DEGREES * cfg.rot_frames / 360)
+    hidden = _smooth(hidden, window)
+    exposed = _smooth(exposed & ~hidden, window)
+    values = np.where(hidden, -1, np.where(exposed, 1, 0))
+    return FrameRuns.from_frames(values.tolist())
+
+def auto_layer_thrusters(points: list[Point], sheet: SpriteSheet, cfg: SpriteConfig, anim: int = 0) -> int:
+    '''
+    Replaces the layering of every thruster with the one worked out from the sprite
+    :return: number of thrusters whose layering changed
+    '''
+    transparent = has_transparency(sheet, cfg, anim)
+    changed = 0
+    for pt in points:
+        if not isinstance(pt, PointThuster):
+            continue
+        under_over = compute_under_over(pt, sheet, cfg, anim, transparent)
+        if under_over != pt.under_over:
+            pt.set_under_over(under_over)
+            changed += 1
+    if _TRACE.info:
+        _TRACE.log(INFO, "layering computed", thrusters=sum(isinstance(pt, PointThuster) for pt in points), transparent=transparent)
+    return changed
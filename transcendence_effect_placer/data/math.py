@@ -1,5 +1,8 @@
+from __future__ import annotations
 from transcendence_effect_placer.data.data import SpriteConfig, CCoord, ICoord, PCoord
 import math
+import numpy as np
+from transcendence_effect_placer.common.diagnostics import get_channel, DEBUG
 
 #derived from TranscendeceDev -> TSE -> C3DConversion.cpp
 
@@ -12,15 +15,22 @@ _MIN_DEN = 0.1
 EPSILON = 1e-10
 TRANSCENDENCE_POLAR_OFFSET = 90 #polar offset in degrees
 
+_TRACE = get_channel("math")
+
+@_TRACE.timed()
 def convert_polar_to_projection(sprite_cfg: SpriteConfig, coord: PCoord) -> ICoord:
-    scale = sprite_cfg.viewport_size()
+    return convert_polar_trig_to_projection(sprite_cfg, math.sin(coord.a), math.cos(coord.a), coord.r, coord.z)
 
-    r = coord.r
-    a = coord.a
+def convert_polar_trig_to_projection(sprite_cfg: SpriteConfig, sin_a: float, cos_a: float, r: float, pz: float) -> CCoord:
+    '''
+    Same as convert_polar_to_projection, but takes the sin and cos of the angle
+    so callers can get them from a FacingTable instead of recomputing them
+    '''
+    scale = sprite_cfg.viewport_size()
 
-    x = math.cos(a) * r / scale
-    y = math.sin(a) * r / scale
-    z = -coord.z / scale
+    x = cos_a * r / scale
+    y = sin_a * r / scale
+    z = -pz / scale
 
     #global coordinate conversion
 
@@ -35,11 +45,84 @@ def convert_polar_to_projection(sprite_cfg: SpriteConfig, coord: PCoord) -> ICoo
     d = scale * _D
     den = zg / d
 
-    return CCoord(xg / den, yg / den, coord.z) #z here would be coord.z, not zg or z, since we do this transform bidirectionally with user-supplied coord.z
+    return CCoord(xg / den, yg / den, pz) #z here would be coord.z, not zg or z, since we do this transform bidirectionally with user-supplied coord.z
+
+@_TRACE.timed()
+def convert_polar_to_projection_batch(sprite_cfg: SpriteConfig, a: np.ndarray, r: np.ndarray, z: np.ndarray, facings: np.ndarray|None = None) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Vectorized version of convert_polar_to_projection
+
+    a (radians), r and z are broadcast against each other as N points
+    If facings (degrees) are given, every facing is added to every angle and the results have shape (N, M)
+    Returns the projected x and y coordinates (the same values as the CCoord from the scalar version)
+    '''
+    scale = sprite_cfg.viewport_size()
+
+    a = np.asarray(a, dtype=np.float64)
+    r = np.asarray(r, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    a, r, z = np.broadcast_arrays(a, r, z)
+    if facings is not None:
+        facings = np.radians(np.asarray(facings, dtype=np.float64))
+        a = a[..., np.newaxis] + facings
+        r = r[..., np.newaxis]
+        z = z[..., np.newaxis]
+
+    x = np.cos(a) * r / scale
+    y = np.sin(a) * r / scale
+    z = -z / scale
+
+    #global coordinate conversion
+
+    xg = x
+    yg = y * _K2 - z * _K1
+    zg = y * _K1 + z * _K2
+
+    zg = np.maximum(_MIN_ZG, zg + 2.0)
+
+    #convert to projection coords
+
+    d = scale * _D
+    den = zg / d
+
+    return xg / den, yg / den
+
+def convert_polar_to_sprite_batch(sprite_cfg: SpriteConfig, a: np.ndarray, r: np.ndarray, z: np.ndarray, facings: np.ndarray|None = None) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Vectorized equivalent of PXMLCoord.to_gscene().to_sprite()
+    Returns integer sprite x and y coordinates
+    '''
+    x, y = convert_polar_to_projection_batch(sprite_cfg, a, r, z, facings)
+    return np.round(x).astype(np.int64), -np.round(y).astype(np.int64)
+
+def convert_polar_to_pil_batch(sprite_cfg: SpriteConfig, a: np.ndarray, r: np.ndarray, z: np.ndarray, facings: np.ndarray|None = None) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Vectorized equivalent of PXMLCoord.to_gscene().to_sprite().to_PIL()
+    Returns integer PIL x and y coordinates
+    '''
+    x, y = convert_polar_to_sprite_batch(sprite_cfg, a, r, z, facings)
+    return -x + sprite_cfg.w//2, y + sprite_cfg.h//2
+
+def rotation_frame_directions(sprite_cfg: SpriteConfig) -> np.ndarray:
+    '''
+    The facing (in whole degrees) that each rotation frame is displayed at
+    '''
+    return sprite_cfg.facing_table().directions
+
+def _rotation_offset(sprite_cfg: SpriteConfig, rotation_frame: int) -> float:
+    if isinstance(rotation_frame, int) and 0 <= rotation_frame < sprite_cfg.rot_frames:
+        return sprite_cfg.facing_table().offset(rotation_frame)
+    return rotation_frame * (360 / sprite_cfg.rot_frames)
+
+def _rotation_direction(sprite_cfg: SpriteConfig, rotation_frame: int) -> int:
+    if isinstance(rotation_frame, int) and 0 <= rotation_frame < sprite_cfg.rot_frames:
+        return sprite_cfg.facing_table().direction(rotation_frame)
+    return round(rotation_frame * (360 / sprite_cfg.rot_frames))
 
 def convert_projection_to_polar(sprite_cfg: SpriteConfig, coord: CCoord|ICoord, rotation_frame: int = 0) -> PCoord:
     return convert_projection_to_polar_approx_ingest(sprite_cfg, coord, rotation_frame)
 
+@_TRACE.timed()
 def convert_projection_to_polar_inverse(sprite_cfg: SpriteConfig, coord: CCoord|ICoord, rotation_frame: int = 0) -> PCoord:
     '''
     This version was an attempt to use algebra to reverse the values
@@ -59,7 +142,7 @@ def convert_projection_to_polar_inverse(sprite_cfg: SpriteConfig, coord: CCoord|
     
     r = (px ** 2 + py ** 2) ** 0.5
 
-    rotation_offset = rotation_frame * (360 / sprite_cfg.rot_frames)
+    rotation_offset = _rotation_offset(sprite_cfg, rotation_frame)
 
     #we need to undo xg/den=px and yg/den=px
     #to find xg, we need x, which needs the angle 
@@ -99,10 +182,12 @@ def convert_projection_to_polar_inverse(sprite_cfg: SpriteConfig, coord: CCoord|
     a += math.radians(rotation_offset)
     ad = round(math.degrees(a))
     
-    print("y", py, "\tz", pz, z, "\tx", px, "\tpolar", int(ad), round(r))
+    if _TRACE.debug:
+        _TRACE.log(DEBUG, "projection_to_polar_inverse", y=py, pz=pz, z=z, x=px, polar=int(ad), r=round(r))
 
     return PCoord(a, r, coord.z)
 
+@_TRACE.timed()
 def convert_projection_to_polar_original(sprite_cfg: SpriteConfig, coord: CCoord|ICoord, rotation_frame: int = 0) -> PCoord:
     '''
     This version was directly adapted from george's code
@@ -130,7 +215,7 @@ def convert_projection_to_polar_original(sprite_cfg: SpriteConfig, coord: CCoord
     ox = x * scale
     oy = y * scale
 
-    rotation_offset = rotation_frame * (360 / sprite_cfg.rot_frames)
+    rotation_offset = _rotation_offset(sprite_cfg, rotation_frame)
     '''
     if abs(py) < EPSILON:
         if px < 0:
@@ -144,11 +229,13 @@ def convert_projection_to_polar_original(sprite_cfg: SpriteConfig, coord: CCoord
     a = math.atan2(oy, ox) + math.radians(rotation_offset)
     r = (px*px + py*py) ** 0.5
 
-    print("y", py, y, yg, "\tz", pz, z, "\tx", px, x, "\tpolar", int(math.degrees(a)), round(r))
+    if _TRACE.debug:
+        _TRACE.log(DEBUG, "projection_to_polar_original", py=py, y=y, yg=yg, pz=pz, z=z, px=px, x=x, polar=int(math.degrees(a)), r=round(r))
 
     ad = round(math.degrees(a))
     return PCoord(a, r, coord.z) #we store the original z pos here to fix the case where pz is too high
 
+@_TRACE.timed()
 def convert_projection_to_polar_approx_ingest(sprite_cfg: SpriteConfig, coord: CCoord|ICoord, rotation_frame: int = 0) -> PCoord:
     '''
     This version is designed to have simple math that puts a point in approximately the right place
@@ -159,7 +246,7 @@ def convert_projection_to_polar_approx_ingest(sprite_cfg: SpriteConfig, coord: C
         coord = CCoord(float(coord.x), float(coord.y), 0)
     scale = sprite_cfg.viewport_size()
 
-    rotation_offset = rotation_frame * (360 / sprite_cfg.rot_frames)
+    rotation_offset = _rotation_offset(sprite_cfg, rotation_frame)
 
     px = coord.x
     py = coord.y
@@ -167,13 +254,48 @@ def convert_projection_to_polar_approx_ingest(sprite_cfg: SpriteConfig, coord: C
 
     a = math.atan2(py, px) + math.radians(rotation_offset)
     r = (px*px + py*py) ** 0.5
-    ad = round(math.degrees(a))
-
-    print("y", py, "\tz", pz, "\tx", px, "\tpolar", ad, round(r))
+    if _TRACE.debug:
+        _TRACE.log(DEBUG, "projection_to_polar_approx_ingest", y=py, z=pz, x=px, polar=round(math.degrees(a)), r=round(r))
 
     return PCoord(a, r, coord.z) #we store the original z pos here to fix the case where pz is too high
 
-    
+
+@_TRACE.timed()
+def convert_projection_to_polar_closed_form(sprite_cfg: SpriteConfig, coord: CCoord|ICoord, rotation_frame: int = 0) -> PCoord:
+    '''
+    This version solves convert_polar_to_projection exactly for a known z
+    For a fixed z the projection is a perspective divide that can be undone directly,
+    so the result lands on coord (to floating point precision) without any iteration
+    The returned angle has the facing of rotation_frame removed, as displayed by the viewer
+    '''
+    if isinstance(coord, ICoord):
+        coord = CCoord(float(coord.x), float(coord.y), 0)
+    scale = sprite_cfg.viewport_size()
+    d = scale * _D
+
+    px = coord.x
+    py = coord.y
+    z = -coord.z / scale
+
+    #undo py = (y*K2 - z*K1) * d / zg, where zg = y*K1 + z*K2 + 2
+    den = py * _K1 - d * _K2
+    if abs(den) < EPSILON:
+        den = -EPSILON
+    y = -(d * z * _K1 + py * z * _K2 + 2.0 * py) / den
+    zg = y * _K1 + z * _K2 + 2.0
+    if zg < _MIN_ZG:
+        #the forward projection clamped zg, so y is linear in py instead
+        zg = _MIN_ZG
+        y = (py * zg / d + z * _K1) / _K2
+    x = px * zg / d
+
+    rotation_offset = _rotation_direction(sprite_cfg, rotation_frame)
+
+    a = math.atan2(y, x) - math.radians(rotation_offset)
+    r = (x*x + y*y) ** 0.5 * scale
+
+    return PCoord(a, r, coord.z)
+
 def a_d(a) -> float:
     return math.degrees(a)
 
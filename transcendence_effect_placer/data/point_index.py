@@ -0,0 +1,95 @@
+'''
+Finds the point (or mirror of a point) under the mouse, without looking at every point
+
+Markers are binned into a uniform grid of cells by where they are drawn at the shown facing,
+so a click only looks at the few cells within reach of it, however many points the ship has
+'''
+
+from __future__ import annotations
+import math
+from typing import Sequence
+
+from transcendence_effect_placer.common.diagnostics import get_channel, DEBUG
+from transcendence_effect_placer.data.points import Point, MirrorOptions
+
+#how far (pixels) from a marker a click still picks it
+HIT_RADIUS = 6
+#size (pixels) of each grid cell, about the size of a marker and the area around it that can be clicked
+CELL_SIZE = 16
+
+_TRACE = get_channel("points")
+
+class PointIndex:
+    '''
+    Grid of where the markers of every point are drawn at one facing
+    Each point's markers are kept with the revision they were worked out at,
+    so bringing the index up to date after an edit only moves the edited points
+    '''
+    def __init__(self, cell_size: int = CELL_SIZE):
+        self._cell_size = cell_size
+        self._rotation_dir: int|None = None
+        #point -> revision its markers were binned at, and the cell and position of each of its markers
+        self._entries: dict[Point, tuple[int, list[tuple[tuple[int, int], MirrorOptions, int, int]]]] = {}
+        self._cells: dict[tuple[int, int], list[tuple[Point, MirrorOptions, int, int]]] = {}
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return (math.floor(x / self._cell_size), math.floor(y / self._cell_size))
+
+    def _insert(self, pt: Point, rotation_dir: int):
+        markers: list[tuple[tuple[int, int], MirrorOptions, int, int]] = []
+        for mirror, coord in pt.marker_coords(rotation_dir):
+            cell = self._cell(coord.x, coord.y)
+            self._cells.setdefault(cell, []).append((pt, mirror, coord.x, coord.y))
+            markers.append((cell, mirror, coord.x, coord.y))
+        self._entries[pt] = (pt.revision, markers)
+
+    def _remove(self, pt: Point):
+        entry = self._entries.pop(pt, None)
+        if entry is None:
+            return
+        for cell in {cell for cell, _, _, _ in entry[1]}:
+            remaining = [marker for marker in self._cells[cell] if marker[0] is not pt]
+            if remaining:
+                self._cells[cell] = remaining
+            else:
+                del self._cells[cell]
+
+    def update(self, points: Sequence[Point], rotation_dir: int):
+        '''
+        Brings the index up to date with the points as they are drawn at a facing
+        Only points that changed since the last update (or every point, if the facing changed) are binned again
+        '''
+        if rotation_dir != self._rotation_dir:
+            self._rotation_dir = rotation_dir
+            self._entries.clear()
+            self._cells.clear()
+        live = set(points)
+        for pt in [pt for pt in self._entries if pt not in live]:
+            self._remove(pt)
+        moved = 0
+        for pt in points:
+            entry = self._entries.get(pt)
+            if entry is not None and entry[0] == pt.revision:
+                continue
+            self._remove(pt)
+            self._insert(pt, rotation_dir)
+            moved += 1
+        if _TRACE.debug:
+            _TRACE.log(DEBUG, "point index updated", points=len(points), moved=moved, cells=len(self._cells))
+
+    def find(self, x: int, y: int, radius: float = HIT_RADIUS) -> tuple[Point, MirrorOptions]|None:
+        '''
+        :return: the point and mirror whose marker is nearest to x, y (PIL coordinates) within radius, or None if there are none
+        '''
+        x0, y0 = self._cell(x - radius, y - radius)
+        x1, y1 = self._cell(x + radius, y + radius)
+        best: tuple[Point, MirrorOptions]|None = None
+        best_distance = radius * radius
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for pt, mirror, mx, my in self._cells.get((cx, cy), ()):
+                    distance = (mx - x) ** 2 + (my - y) ** 2
+                    if distance <= best_distance:
+                        best = (pt, mirror)
+                        best_distance = distance
+        return best
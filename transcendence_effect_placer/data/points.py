@@ -1,11 +1,17 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 import math
+import numpy as np
 from PIL.ImageDraw import ImageDraw
 from dataclasses import dataclass
+from typing import Sequence
 
+from transcendence_effect_placer.common.diagnostics import get_channel
+from transcendence_effect_placer.data.xml_writer import Entity, XMLAttrs, XMLElement, format_element
 from transcendence_effect_placer.data.data import SpriteConfig, CCoord, ICoord, PCoord
-from transcendence_effect_placer.data.math import convert_polar_to_projection, convert_projection_to_polar, a_d, d180, d360, TRANSCENDENCE_POLAR_OFFSET
+from transcendence_effect_placer.data.frame_runs import FrameRuns
+from transcendence_effect_placer.data.shapes import Shape, ShapeRecorder
+from transcendence_effect_placer.data.math import convert_polar_to_projection, convert_polar_trig_to_projection, convert_projection_to_polar, convert_projection_to_polar_closed_form, convert_polar_to_projection_batch, convert_polar_to_pil_batch, a_d, d180, d360, TRANSCENDENCE_POLAR_OFFSET
 
 @dataclass
 class MirrorOptions:
@@ -15,6 +21,8 @@ class MirrorOptions:
 
 MIRROR_NULL = MirrorOptions()
 
+_TRACE = get_channel("points")
+
 class PointType(str): pass
 
 PT_DEVICE = PointType("Device")
@@ -76,6 +84,7 @@ class Point(ABC):
     uses_z_input = True
 
     def __init__(self, coord: PILCoord|SpriteCoord|None = None, label: str|None = None, sprite_cfg: SpriteConfig = DEFAULT_CFG, rot_frame: int = 0, clone_point: Point|None = None):
+        self._init_caches()
         #if cloning, ignore everything else
         if clone_point:
             self.label = clone_point.label
@@ -101,65 +110,86 @@ class Point(ABC):
             self.sprite_coord = self.scene_coord.to_sprite()
             self.mirror = MirrorOptions()
             if isinstance(coord, PILCoord):
-                #attempt to nudge the point closer to where the user clicked on the screen
-                self.nudge_to(sprite_coord)
+                #put the point's marker where the user clicked on the screen
+                self.move_marker_to(coord, rot_frame)
 
     def __str__(self):
         return f"{self.point_type}: ({self.sprite_coord.x},{self.sprite_coord.y}) z={self.scene_coord.z}"
 
+    def _init_caches(self):
+        self._mirror_trig: dict[tuple[float, bool, bool], tuple[float, float]] = {}
+        self.revision: int = 0
+        self._xml_lines: tuple[str, ...] = ()
+        self._xml_revision: int = -1
+        self._shapes: dict[tuple, list[Shape]] = {}
+        self._shapes_revision: int = -1
+
+    @classmethod
+    def from_state(cls, label: str, sprite_cfg: SpriteConfig, sprite_coord: SpriteCoord, scene_coord: GSceneCoord, polar_coord: PXMLCoord, mirror: MirrorOptions) -> Point:
+        '''
+        Recreates a point from coordinates that were saved, without running any of the projection math
+        Attributes specific to a point type are left for the caller to set
+        '''
+        pt = cls.__new__(cls)
+        pt._init_caches()
+        pt.label = label
+        pt._cfg = sprite_cfg
+        pt.sprite_coord = sprite_coord
+        pt.scene_coord = scene_coord
+        pt.polar_coord = polar_coord
+        pt.mirror = mirror
+        return pt
+
+    def __getstate__(self):
+        #caches are rebuilt on demand, so dont carry them into copies
+        state = self.__dict__.copy()
+        state['_mirror_trig'] = {}
+        state['_xml_lines'] = ()
+        state['_xml_revision'] = -1
+        state['_shapes'] = {}
+        state['_shapes_revision'] = -1
+        return state
+
+    def _touch(self):
+        '''
+        Marks everything cached from this point's state (such as its overlay shapes) as stale
+        Must be called by anything that changes the point
+        '''
+        self.revision += 1
+
     def _to_raw_coord(self, coord: ICoord) -> ICoord:
         return ICoord(coord.x, -coord.y)
     
     def _from_raw_coord(self, coord: ICoord) -> ICoord:
         return ICoord(coord.x, -coord.y)
     
-    def nudge_to(self, coord: SpriteCoord):
-        while True:
-            in_ = PXMLCoord(self.polar_coord.a, self.polar_coord.r - 1, self.polar_coord.z)
-            out_ = PXMLCoord(self.polar_coord.a, self.polar_coord.r + 1, self.polar_coord.z)
-            d1 = math.radians(1)
-            ccw_ = PXMLCoord(self.polar_coord.a + d1, self.polar_coord.r, self.polar_coord.z)
-            cw_ = PXMLCoord(self.polar_coord.a - d1, self.polar_coord.r, self.polar_coord.z)
-            in_s = in_.to_gscene(self._cfg).to_sprite()
-            out_s = out_.to_gscene(self._cfg).to_sprite()
-            ccw_s = ccw_.to_gscene(self._cfg).to_sprite()
-            cw_s = cw_.to_gscene(self._cfg).to_sprite()
-            cur_s = self.sprite_coord
-            def dist2(src_coord: SpriteCoord):
-                x = coord.x - src_coord.x
-                y = coord.y - src_coord.y
-                return x ** 2 + y ** 2
-            best_distance = dist2(cur_s)
-            best_point: PXMLCoord = self.polar_coord
-            best_s = cur_s
-            for pxml, spr_s in [(in_, in_s), (out_, out_s), (ccw_, ccw_s), (cw_, cw_s)]:
-                test_dist = dist2(spr_s)
-                if test_dist < best_distance:
-                    best_distance = test_dist
-                    best_point = pxml
-                    best_s = spr_s
-            # if we are done...
-            if best_point is self.polar_coord:
-                break
-            else:
-                #print(f"nudging from: {self.polar_coord} to: {best_point} at {best_s} - Target: {coord} which is {best_distance ** 0.5} away")
-                self.update_from_polar(best_point)
+    @_TRACE.timed()
+    def nudge_to(self, coord: SpriteCoord, rot_frame: int = 0):
+        '''
+        Moves the point (keeping its z) so that it projects onto coord at the given rotation frame
+        This places sprite_coord, not the marker (which is drawn from a different projection), use move_marker_to for clicks
+        '''
+        target = coord.to_gscene(self.polar_coord.z)
+        self.update_from_polar(convert_projection_to_polar_closed_form(self._cfg, target, rot_frame))
 
     def update_from_polar(self, coord: PXMLCoord|PCoord):
         self.polar_coord = coord if isinstance(coord, PXMLCoord) else PXMLCoord(coord.a, coord.r, coord.z)
         self.scene_coord = self.polar_coord.to_gscene(self._cfg)
         self.sprite_coord = self.scene_coord.to_sprite()
+        self._touch()
 
     def update_from_projection(self, coord: SpriteCoord, rot_frame: int = 0):
         self.sprite_coord = coord
         self.scene_coord = coord.to_gscene(self.scene_coord.z)
         self.polar_coord = self.scene_coord.to_polar_XML(self._cfg, rot_frame)
         self.scene_coord = self.polar_coord.to_gscene(self._cfg)
+        self._touch()
 
     def _update(self):
         self.scene_coord = self.sprite_coord.to_gscene(self.scene_coord.z)
         self.polar_coord = self.scene_coord.to_polar_XML(self._cfg, 0)
         self.scene_coord = self.polar_coord.to_gscene(self._cfg)
+        self._touch()
 
     def pil_coord(self, coord: ICoord) -> ICoord:
         return ICoord(-1*coord.x + round(self._cfg.w/2), coord.y + round(self._cfg.h/2))
@@ -167,14 +197,21 @@ class Point(ABC):
     def __str__(self) -> str:
         return str(self.point_type) + ' ' + self.label + ': ' + repr(self.sprite_coord)
     
+    def set_label(self, label: str):
+        self.label = label
+        self._touch()
+
     def set_mirror_x(self, mirror=True):
         self.mirror.x = mirror
+        self._touch()
     
     def set_mirror_y(self, mirror=True):
         self.mirror.y = mirror
+        self._touch()
 
     def set_mirror_z(self, mirror=True):
         self.mirror.z = mirror
+        self._touch()
 
     def set_z(self, z:int = 0):
         self.scene_coord.z = z
@@ -221,23 +258,89 @@ class Point(ABC):
         degrees %= 360
         return degrees
 
+    def _get_mirror_trig(self, mirror: MirrorOptions) -> tuple[float, float]:
+        '''
+        sin and cos of this point's display angle under a mirror, before the ship's facing is added
+        These only change when the polar coordinate does, so they are cached until then
+        '''
+        key = (self.polar_coord.a, bool(mirror.x), bool(mirror.y))
+        trig = self._mirror_trig.get(key)
+        if trig is None:
+            if len(self._mirror_trig) > 8:
+                self._mirror_trig.clear()
+            adj_dir_deg = math.degrees(self.polar_coord.a) + 180
+            adj_dir = math.radians(self._mirror_angle_degrees(adj_dir_deg, mirror))
+            trig = (math.sin(adj_dir), math.cos(adj_dir))
+            self._mirror_trig[key] = trig
+        return trig
+
     def get_projection_coord_at_direction(self, direction: int = 0, mirror: MirrorOptions = MIRROR_NULL) -> ICoord:
-        adj_dir_deg = math.degrees(self.polar_coord.a) + 180
-        adj_dir_deg = self._mirror_angle_degrees(adj_dir_deg, mirror) + direction % 360
-        adj_dir = math.radians(adj_dir_deg)
+        sin_m, cos_m = self._get_mirror_trig(mirror)
+        sin_d, cos_d = self._cfg.facing_table().direction_trig(direction)
+        #angle addition, so that no trig needs to be done per facing
+        sin_a = sin_m * cos_d + cos_m * sin_d
+        cos_a = cos_m * cos_d - sin_m * sin_d
         adj_rad = self.polar_coord.r
         adj_z = self.polar_coord.z * (-1 if mirror.z else 1)
-        adjusted_direction = PXMLCoord(adj_dir, adj_rad, adj_z)
-        return adjusted_direction.to_gscene(self._cfg).to_sprite().to_PIL(self._cfg)
-    
+        ccoord = convert_polar_trig_to_projection(self._cfg, sin_a, cos_a, adj_rad, adj_z)
+        return GSceneCoord(ccoord.x, ccoord.y, ccoord.z).to_sprite().to_PIL(self._cfg)
+
+    def get_projection_coords_at_directions(self, directions: Sequence[int]|np.ndarray, mirror: MirrorOptions = MIRROR_NULL) -> np.ndarray:
+        '''
+        Vectorized version of get_projection_coord_at_direction
+
+        :param directions: facings (in degrees) to project this point at
+        :return: PIL coordinates with shape (len(directions), 2)
+        '''
+        adj_dir_deg = math.degrees(self.polar_coord.a) + 180
+        adj_dir_deg = self._mirror_angle_degrees(adj_dir_deg, mirror)
+        adj_dirs = adj_dir_deg + np.asarray(directions) % 360
+        adj_z = self.polar_coord.z * (-1 if mirror.z else 1)
+        x, y = convert_polar_to_pil_batch(self._cfg, np.radians(adj_dirs), self.polar_coord.r, adj_z)
+        return np.stack((x, y), axis=-1)
+
     @abstractmethod
-    def to_xml(self) -> str:
+    def xml_elements(self) -> list[XMLElement]:
+        '''
+        :return: tag and attributes of every element this point exports, including its mirrors
+        '''
         pass
 
+    def xml_lines(self) -> tuple[str, ...]:
+        '''
+        Formatted elements of this point, which are kept until the point changes
+        so exporting again only formats the points that were edited since
+        '''
+        if self._xml_revision != self.revision:
+            self._xml_lines = tuple(format_element(tag, attrs) for tag, attrs in self.xml_elements())
+            self._xml_revision = self.revision
+        return self._xml_lines
+
+    def to_xml(self) -> str:
+        return '\n'.join(self.xml_lines())
+
     @abstractmethod
     def render_to_image(self, image: ImageDraw, rotation_dir: int):
         pass
 
+    def overlay_shapes(self, rotation_dir: int) -> list[Shape]:
+        '''
+        Shapes render_to_image draws at a facing, which are kept until the point changes
+
+        :param rotation_dir: facing of the ship in degrees
+        '''
+        if self._shapes_revision != self.revision:
+            self._shapes.clear()
+            self._shapes_revision = self.revision
+        key = (rotation_dir, self.mirror.x, self.mirror.y, self.mirror.z)
+        shapes = self._shapes.get(key)
+        if shapes is None:
+            recorder = ShapeRecorder()
+            self.render_to_image(recorder, rotation_dir) # type: ignore
+            shapes = recorder.shapes
+            self._shapes[key] = shapes
+        return shapes
+
     def _get_mirror_options(self) -> list[MirrorOptions]:
         ret: list[MirrorOptions] = [MIRROR_NULL] #always render self
         x = self.mirror.x and self.mirror_support.x
@@ -259,14 +362,33 @@ class Point(ABC):
             ret.append(MirrorOptions(1,1,1))
         return ret
 
+    def marker_coords(self, rotation_dir: int) -> list[tuple[MirrorOptions, ICoord]]:
+        '''
+        :return: PIL coordinates of the marker drawn for this point and each of its mirrors at a facing
+        '''
+        return [(mirror, self.get_projection_coord_at_direction(rotation_dir, mirror)) for mirror in self._get_mirror_options()]
+
+    def move_marker_to(self, coord: PILCoord, rot_frame: int = 0, mirror: MirrorOptions = MIRROR_NULL):
+        '''
+        Moves the point (keeping its z) so that the marker of one of its mirrors lands on coord at the given rotation frame
+        This solves for the marker as drawn by get_projection_coord_at_direction, so a dragged marker stays under the mouse
+        '''
+        z = self.polar_coord.z * (-1 if mirror.z else 1)
+        #undo to_sprite().to_PIL() of the projected marker
+        target = CCoord(self._cfg.w//2 - coord.x, self._cfg.h//2 - coord.y, z)
+        pcoord = convert_projection_to_polar_closed_form(self._cfg, target, rot_frame)
+        #markers are drawn half a turn from the point's angle, and mirroring the angle is its own inverse
+        a = math.radians(self._mirror_angle_degrees(math.degrees(pcoord.a), mirror) - 180)
+        self.update_from_polar(PXMLCoord(a, pcoord.r, self.polar_coord.z))
+
     def _render_point(self, image:ImageDraw, direction: int = 0, mirror: MirrorOptions = MIRROR_NULL) -> ICoord:
         coord = self.get_projection_coord_at_direction(direction, mirror)
         image.circle((coord.x, coord.y), 2, self.color)
         return coord
         
 class PointGeneric(Point):
-    def to_xml(self):
-        return ""
+    def xml_elements(self):
+        return []
     def render_to_image(self, image, rotation_dir):
         self._render_point(image, rotation_dir)
 
@@ -277,16 +399,25 @@ class PointDock(Point):
     uses_polar_inputs = False
     uses_z_input = False
     
-    def to_xml(self):
-        ret = f'<Port x="{self.sprite_coord.x}"\ty="{self.sprite_coord.y}"/>'
+    def xml_elements(self) -> list[XMLElement]:
+        x = self.sprite_coord.x
+        y = self.sprite_coord.y
+        ret: list[XMLElement] = [("Port", (("x", x), ("y", y)))]
         if self.mirror.x:
-            ret += f'\n<Port x="{self.sprite_coord.x * -1}"\ty="{self.sprite_coord.y}"/>'
+            ret.append(("Port", (("x", x * -1), ("y", y))))
         if self.mirror.y:
-            ret += f'\n<Port x="{self.sprite_coord.x}"\ty="{self.sprite_coord.y * -1}"/>'
+            ret.append(("Port", (("x", x), ("y", y * -1))))
         if self.mirror.x and self.mirror.y:
-            ret += f'\n<Port x="{self.sprite_coord.x * -1}"\ty="{self.sprite_coord.y * -1}"/>'
+            ret.append(("Port", (("x", x * -1), ("y", y * -1))))
         return ret
     
+    def marker_coords(self, rotation_dir: int) -> list[tuple[MirrorOptions, ICoord]]:
+        #docking ports dont rotate with the ship
+        return super().marker_coords(0)
+
+    def move_marker_to(self, coord: PILCoord, rot_frame: int = 0, mirror: MirrorOptions = MIRROR_NULL):
+        super().move_marker_to(coord, 0, mirror)
+
     def render_to_image(self, image, rotation_dir):
         '''
         Docstring for render_to_image
@@ -322,65 +453,75 @@ class PointThuster(Point):
             self.direction = clone_point.direction
         else:
             self.direction = direction
-        self.under_over = [0 for i in range(sprite_cfg.rot_frames)]
+        if isinstance(clone_point, PointThuster):
+            self.under_over = clone_point.under_over.copy()
+        else:
+            self.under_over = FrameRuns(self._cfg.rot_frames)
+
+    @property
+    def under_over(self) -> FrameRuns:
+        '''
+        -1 (sent to back), 0 or 1 (brought to front) for every rotation frame
+        Remapped onto the sprite's rotation frames whenever their number changes
+        '''
+        self._remap_rot_frames()
+        return self._under_over
+
+    @under_over.setter
+    def under_over(self, under_over: FrameRuns):
+        self._under_over = under_over
+
+    def _remap_rot_frames(self):
+        if len(self._under_over) != self._cfg.rot_frames:
+            self._under_over = self._under_over.resized(self._cfg.rot_frames)
+            self._touch()
 
     def set_direction(self, direction: int):
         self.direction = direction
+        self._touch()
 
-    def send_to_back(self, frame: int):
-        self.under_over[frame] = -1
-
-    def bring_to_front(self, frame: int):
-        self.under_over[frame] = 1
-
-    def accumulate_range_str(self, match: int):
-        range_str = ""
-        range_start = -1
-        for i in range(len(self.under_over)):
-            e = self.under_over[i]
-            # if we are not already in a range
-            if range_start < 0:
-                if e == match:
-                    range_start = i
-                    range_str += f",{i}"
-            if range_start >= 0:
-                if e != match:
-                    if range_start == i-1:
-                        pass
-                    elif range_start == i-2:
-                        range_str += f",{i-1}"
-                    else:
-                        range_str += f"-{i-1}"
-                    range_start = -1
-        range_str = range_str.strip(',')
-        return range_str
-
-    def get_send_to_back(self):
-        if all([e == -1 for e in self.under_over]):
-            return '\tsendToBack="*"'
-        range_str = self.accumulate_range_str(-1)
-        if not range_str:
-            return ""
-        else:
-            return f'\tsendToBack="{range_str}"'
-        
-    def get_bring_to_front(self):
-        if all([e == 1 for e in self.under_over]):
-            return '\tbringToFront="*"'
-        range_str = self.accumulate_range_str(1)
-        if not range_str:
-            return ""
-        else:
-            return f'\tbringToFront="{range_str}"'
+    def set_under_over(self, under_over: FrameRuns):
+        self.under_over = under_over
+        self._touch()
 
-    def to_xml(self):
-        mirrors = self._get_mirror_options()
-        ret = ""
-        for mirror in mirrors:
-            ret += self._fmt_xml(mirror)
-        return ret.strip()
-    
-    def _fmt_xml(self, mirror: MirrorOptions = MIRROR_NULL):
+    def send_to_back(self, start: int, stop: int|None = None):
+        '''
+        :param stop: end of a range of frames (exclusive), otherwise only the frame at start
+        '''
+        self.under_over.assign(start, start + 1 if stop is None else stop, -1)
+        self._touch()
+
+    def bring_to_front(self, start: int, stop: int|None = None):
+        '''
+        :param stop: end of a range of frames (exclusive), otherwise only the frame at start
+        '''
+        self.under_over.assign(start, start + 1 if stop is None else stop, 1)
+        self._touch()
+
+    def accumulate_range_str(self, match: int) -> str:
+        return self.under_over.format_ranges(match)
+
+    def get_send_to_back(self) -> str:
+        '''
+        :return: value of the sendToBack attribute, empty if there is none
+        '''
+        return self.under_over.format_ranges(-1)
+
+    def get_bring_to_front(self) -> str:
+        '''
+        :return: value of the bringToFront attribute, empty if there is none
+        '''
+        return self.under_over.format_ranges(1)
+
+    def xml_lines(self) -> tuple[str, ...]:
+        #remap before the cache is checked, so a change in rotation frames invalidates it
+        self._remap_rot_frames()
+        return super().xml_lines()
+
+    def xml_elements(self) -> list[XMLElement]:
+        return [self._fmt_xml(mirror) for mirror in self._get_mirror_options()]
+
+    def _fmt_xml(self, mirror: MirrorOptions = MIRROR_NULL) -> XMLElement:
         z = round(self.polar_coord.z)
         a = a_d(self.polar_coord.a)
         r = round(self.polar_coord.r)
@@ -389,8 +530,14 @@ class PointThuster(Point):
         direction = round(d180(self._mirror_angle_degrees(direction, mirror, False)))
         if mirror.z:
             z *= -1
-        xml = f'<Effect type="thrustMain"\t\tposAngle="{a}"\tposRadius="{r}"\tposZ="{z}"\trotation="{direction}"\teffect="&efMainThrusterLarge;"{self.get_send_to_back()}{self.get_bring_to_front()}/>\n'
-        return xml
+        attrs: list[tuple[str, object]] = [("type", "thrustMain"), ("posAngle", a), ("posRadius", r), ("posZ", z), ("rotation", direction), ("effect", Entity("efMainThrusterLarge"))]
+        send_to_back = self.get_send_to_back()
+        if send_to_back:
+            attrs.append(("sendToBack", send_to_back))
+        bring_to_front = self.get_bring_to_front()
+        if bring_to_front:
+            attrs.append(("bringToFront", bring_to_front))
+        return ("Effect", attrs)
     
     def _render_arc(self, image: ImageDraw, direction: int = 0, mirror: MirrorOptions = MIRROR_NULL):
         pos = self.get_projection_coord_at_direction(direction, mirror)
@@ -437,15 +584,19 @@ class PointDevice(Point):
 
     def set_direction(self, direction: int):
         self.direction = direction
+        self._touch()
 
     def set_arc(self, arc: int):
         self.arc = arc
+        self._touch()
 
     def set_arc_start(self, arc_start: int):
         self.arc_start = arc_start
+        self._touch()
 
     def set_arc_end(self, arc_end: int):
         self.arc_end = arc_end
+        self._touch()
 
     def get_arc_at_dir(self, dir: int) -> tuple[int, int, int]:
         '''
@@ -529,14 +680,10 @@ class PointDevice(Point):
         c+=1
         image.arc((pos.x-c, pos.y-c, pos.x+c, pos.y+c), (aim_dir-2) % 360, (aim_dir+2) % 360, fill=self.color)
 
-    def to_xml(self):
-        mirrors = self._get_mirror_options()
-        ret = ""
-        for mirror in mirrors:
-            ret += self._fmt_xml(mirror)
-        return ret
+    def xml_elements(self) -> list[XMLElement]:
+        return [self._fmt_xml(mirror) for mirror in self._get_mirror_options()]
     
-    def _fmt_xml(self, mirror: MirrorOptions = MIRROR_NULL):
+    def _fmt_xml(self, mirror: MirrorOptions = MIRROR_NULL) -> XMLElement:
         z = round(self.polar_coord.z)
         a = a_d(self.polar_coord.a)
         r = round(self.polar_coord.r)
@@ -548,12 +695,14 @@ class PointDevice(Point):
         mx = "_x" if mirror.x else ""
         my = "_y" if mirror.y else ""
         mz = "_z" if mirror.z else ""
-        return f'<DeviceSlot id="{self.label}{mx}{my}{mz}"\t\tposAngle="{a}"\tposRadius="{r}"\tposZ="{z}"\tfireAngle="{direction}"\t{self._fmt_xml_arc(mirror)}/>\n'
+        attrs: list[tuple[str, object]] = [("id", f"{self.label}{mx}{my}{mz}"), ("posAngle", a), ("posRadius", r), ("posZ", z), ("fireAngle", direction)]
+        attrs.extend(self._fmt_xml_arc(mirror))
+        return ("DeviceSlot", attrs)
 
-    def _fmt_xml_arc(self, mirror: MirrorOptions = MIRROR_NULL):
+    def _fmt_xml_arc(self, mirror: MirrorOptions = MIRROR_NULL) -> list[tuple[str, object]]:
         if self.arc > 0:
             a = round(d360(self.arc))
-            return f'fireArc="{a}"'
+            return [("fireArc", a)]
         elif self.arc_start > -1 and self.arc_end > -1:
             s = round(d180(self._mirror_angle_degrees(self.arc_start, mirror, False)))
             e = round(d180(self._mirror_angle_degrees(self.arc_end, mirror, False)))
@@ -561,11 +710,43 @@ class PointDevice(Point):
                 s_ = s
                 s = e
                 e = s_
-            return f'minFireArc="{s}"\tmaxFireArc="{e}"'
-        return ""
+            return [("minFireArc", s), ("maxFireArc", e)]
+        return []
     
     def render_to_image(self, image, rotation_dir):
         mirrors = self._get_mirror_options()
         for mirror in mirrors:
             self._render_point(image, rotation_dir, mirror)
             self._render_arc(image, rotation_dir, mirror)
+
+@_TRACE.timed()
+def reproject_points(points: Sequence[Point], sprite_cfg: SpriteConfig):
+    '''
+    Moves every point onto a new sprite configuration, keeping where each point is on the ship
+    Points keep their polar coordinates, and their scene and sprite coordinates are projected again all at once
+    Docking ports are placed in sprite coordinates instead, so they keep those and their polar coordinates are worked out again
+    '''
+    polar = [pt for pt in points if pt.uses_polar_inputs]
+    if polar:
+        a = np.fromiter((pt.polar_coord.a for pt in polar), dtype=np.float64, count=len(polar))
+        r = np.fromiter((pt.polar_coord.r for pt in polar), dtype=np.float64, count=len(polar))
+        z = np.fromiter((pt.polar_coord.z for pt in polar), dtype=np.float64, count=len(polar))
+        x, y = convert_polar_to_projection_batch(sprite_cfg, a, r, z)
+        for pt, px, py, pz in zip(polar, x.tolist(), y.tolist(), z.tolist()):
+            pt._cfg = sprite_cfg
+            pt.scene_coord = GSceneCoord(px, py, pz)
+            pt.sprite_coord = pt.scene_coord.to_sprite()
+            pt._touch()
+    for pt in points:
+        if pt.uses_polar_inputs:
+            continue
+        pt._cfg = sprite_cfg
+        target = pt.sprite_coord.to_gscene(pt.polar_coord.z)
+        pcoord = convert_projection_to_polar_closed_form(sprite_cfg, target, 0)
+        pt.polar_coord = PXMLCoord(pcoord.a, pcoord.r, pcoord.z)
+        pt.scene_coord = pt.polar_coord.to_gscene(sprite_cfg)
+        pt._touch()
+    for pt in points:
+        if isinstance(pt, PointThuster):
+            #keeps the layering at the same facings under the new number of rotation frames
+            pt._remap_rot_frames()
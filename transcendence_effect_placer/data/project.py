@@ -0,0 +1,147 @@
+'''
+Saved point projects: the sprite sheet, its SpriteConfig and every placed point, as JSON
+
+Coordinates are saved in all three systems rather than recomputed on load,
+since the projection math is not exactly reversible and the export must not drift between saves
+Per rotation frame values (thruster under_over) are saved as runs of [value, length], so they stay small
+and are remapped if the sprite config they are loaded with has a different number of rotation frames
+
+Version history:
+2: first released format (1 was never released)
+'''
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+import json
+import os
+from typing import Any
+
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.frame_runs import FrameRuns
+from transcendence_effect_placer.data.points import Point, PointGeneric, PointDevice, PointDock, PointThuster, PointType, MirrorOptions, PXMLCoord, GSceneCoord, SpriteCoord, PT_DEVICE, PT_DOCK, PT_GENERIC, PT_THRUSTER
+
+PROJECT_VERSION = 2
+
+POINT_CLASSES: dict[PointType, type[Point]] = {
+    PT_GENERIC: PointGeneric,
+    PT_DEVICE: PointDevice,
+    PT_DOCK: PointDock,
+    PT_THRUSTER: PointThuster,
+}
+
+SPRITE_CONFIG_FIELDS = ("x", "y", "w", "h", "anim_frames", "rot_frames", "rot_cols", "viewport_ratio")
+
+class ProjectError(ValueError): pass
+
+@dataclass
+class Project:
+    sprite_cfg: SpriteConfig
+    points: list[Point] = field(default_factory=list)
+    sprite_path: str|None = None
+
+def sprite_config_to_dict(cfg: SpriteConfig) -> dict[str, Any]:
+    return {name: getattr(cfg, name) for name in SPRITE_CONFIG_FIELDS}
+
+def sprite_config_from_dict(data: dict[str, Any]) -> SpriteConfig:
+    try:
+        cfg = SpriteConfig(**{name: data[name] for name in SPRITE_CONFIG_FIELDS})
+    except KeyError as e:
+        raise ProjectError(f"sprite config is missing {e}") from e
+    cfg.real = True
+    return cfg
+
+def point_to_dict(pt: Point) -> dict[str, Any]:
+    data: dict[str, Any] = {
+        "type": str(pt.point_type),
+        "label": pt.label,
+        "polar": [pt.polar_coord.a, pt.polar_coord.r, pt.polar_coord.z],
+        "scene": [pt.scene_coord.x, pt.scene_coord.y, pt.scene_coord.z],
+        "sprite": [pt.sprite_coord.x, pt.sprite_coord.y],
+        "mirror": [bool(pt.mirror.x), bool(pt.mirror.y), bool(pt.mirror.z)],
+    }
+    if isinstance(pt, PointThuster):
+        data["direction"] = pt.direction
+        data["under_over"] = pt.under_over.to_runs()
+    elif isinstance(pt, PointDevice):
+        data["direction"] = pt.direction
+        data["arc"] = pt.arc
+        data["arc_start"] = pt.arc_start
+        data["arc_end"] = pt.arc_end
+    return data
+
+def point_from_dict(data: dict[str, Any], cfg: SpriteConfig) -> Point:
+    '''
+    Rebuilds a point exactly as it was saved, without running any of the projection math
+    '''
+    point_cls = POINT_CLASSES.get(PointType(data.get("type", "")))
+    if point_cls is None:
+        raise ProjectError(f"unknown point type: {data.get('type')}")
+    try:
+        pt = point_cls.from_state(
+            str(data["label"]),
+            cfg,
+            SpriteCoord(*data["sprite"]),
+            GSceneCoord(*data["scene"]),
+            PXMLCoord(*data["polar"]),
+            MirrorOptions(*data.get("mirror", (False, False, False))),
+        )
+        if isinstance(pt, PointThuster):
+            pt.direction = data["direction"]
+            #saved with a different number of rotation frames, it is remapped when first used
+            pt.under_over = FrameRuns.from_runs(data.get("under_over", ())) if data.get("under_over") else FrameRuns(cfg.rot_frames)
+        elif isinstance(pt, PointDevice):
+            pt.direction = data["direction"]
+            pt.arc = data["arc"]
+            pt.arc_start = data["arc_start"]
+            pt.arc_end = data["arc_end"]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ProjectError(f"malformed point {data.get('label')}: {e}") from e
+    pt._touch()
+    return pt
+
+def project_to_dict(project: Project) -> dict[str, Any]:
+    return {
+        "version": PROJECT_VERSION,
+        "sprite_path": project.sprite_path,
+        "sprite_config": sprite_config_to_dict(project.sprite_cfg),
+        "points": [point_to_dict(pt) for pt in project.points],
+    }
+
+def project_from_dict(data: dict[str, Any], sprite_cfg: SpriteConfig|None = None) -> Project:
+    '''
+    :param sprite_cfg: used instead of the sprite config saved in the project
+    '''
+    version = data.get("version")
+    if version != PROJECT_VERSION:
+        raise ProjectError(f"unsupported project version: {version}")
+    if sprite_cfg is None:
+        if "sprite_config" not in data:
+            raise ProjectError("project has no sprite config")
+        sprite_cfg = sprite_config_from_dict(data["sprite_config"])
+    points = [point_from_dict(pt_data, sprite_cfg) for pt_data in data.get("points", ())]
+    return Project(sprite_cfg, points, data.get("sprite_path"))
+
+def save_project(path: str, project: Project):
+    '''
+    Writes through a temporary file, so a failed save never leaves a half written project behind
+    '''
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(project_to_dict(project), f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def load_project(path: str, sprite_cfg: SpriteConfig|None = None) -> Project:
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ProjectError(f"{path} is not a project file: {e}") from e
+    return project_from_dict(data, sprite_cfg)
+
+def load_sprite_config(path: str) -> SpriteConfig:
+    '''
+    Loads a sprite config on its own, either from a project or from a file holding just the config
+    '''
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return sprite_config_from_dict(data.get("sprite_config", data))
@@ -0,0 +1,34 @@
+'''
+Vector shapes of a point's markers, so they can be drawn by something other than PIL (such as a Tk canvas)
+
+ShapeRecorder takes the same drawing calls as PIL's ImageDraw (the ones the points use),
+so the points' render code records the shapes it draws without needing a second copy of it
+'''
+
+from __future__ import annotations
+from dataclasses import dataclass
+
+SHAPE_CIRCLE = "circle"
+SHAPE_ARC = "arc"
+
+@dataclass(frozen=True)
+class Shape:
+    kind: str
+    #left, top, right and bottom of the circle the shape is on, in PIL coordinates
+    bbox: tuple[float, float, float, float]
+    color: tuple[int, ...]
+    #for arcs, angles (degrees) clockwise from the right, same as ImageDraw.arc
+    start: float = 0
+    end: float = 0
+
+class ShapeRecorder:
+    def __init__(self):
+        self.shapes: list[Shape] = []
+
+    def circle(self, xy: tuple[float, float], radius: float, fill: tuple[int, ...]|None = None, outline: tuple[int, ...]|None = None, width: int = 1):
+        x, y = xy
+        self.shapes.append(Shape(SHAPE_CIRCLE, (x - radius, y - radius, x + radius, y + radius), fill or outline or (0, 0, 0, 255)))
+
+    def arc(self, xy: tuple[float, float, float, float], start: float, end: float, fill: tuple[int, ...]|None = None, width: int = 1):
+        x0, y0, x1, y1 = xy
+        self.shapes.append(Shape(SHAPE_ARC, (x0, y0, x1, y1), fill or (0, 0, 0, 255), start, end))
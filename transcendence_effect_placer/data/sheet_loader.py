@@ -0,0 +1,198 @@
+from __future__ import annotations
+import io
+import os
+import struct
+import threading
+import zlib
+from typing import BinaryIO
+import PIL.Image
+from PIL.Image import Image
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO, WARN
+from transcendence_effect_placer.data.atlas_cache import hash_file
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.grid_detect import detect_sprite_grid
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+
+_TRACE = get_channel("frames")
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+#samples per pixel of each PNG colour type
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+def _png_chunk(chunk_type: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+class LoadCancelled(Exception): pass
+
+class _ProgressReader:
+    '''
+    File wrapper that counts the bytes PIL reads while decoding, and aborts the decode once cancelled
+    '''
+    def __init__(self, f: BinaryIO, cancel: threading.Event):
+        self._f = f
+        self._cancel = cancel
+        self.bytes_read: int = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self._cancel.is_set():
+            raise LoadCancelled()
+        data = self._f.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._f.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+    def close(self):
+        self._f.close()
+
+class SheetLoader:
+    '''
+    Decodes a sprite sheet on a worker thread so that the UI stays responsive
+
+    size and mode are available as soon as the loader is created, since only the header is read up front
+    content_hash is worked out on its own thread while the sheet decodes, so a cached atlas can be looked up
+    as soon as hashed() is true, without waiting for (or holding up) the decode
+    sheet is set once the whole sheet has been decoded, and the decoded image is released straight after,
+    so that only one copy of the pixels is held
+    detected is the frame grid found in the sheet (see grid_detect), set along with sheet
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._hashed = threading.Event()
+        self._total = max(1, os.path.getsize(path))
+        self._reader = _ProgressReader(open(path, 'rb'), self._cancel)
+        try:
+            self._image = PIL.Image.open(self._reader) # type: ignore
+        except Exception:
+            self._reader.close()
+            raise
+        self.size: tuple[int, int] = self._image.size
+        self.mode: str = self._image.mode
+        self.sheet: SpriteSheet|None = None
+        self.error: Exception|None = None
+        self.content_hash: str|None = None
+        self.detected: SpriteConfig|None = None
+        self._thread: threading.Thread|None = None
+        self._hash_thread: threading.Thread|None = None
+
+    def start(self):
+        self._hash_thread = threading.Thread(target=self._hash, name="sheet-hash", daemon=True)
+        self._hash_thread.start()
+        self._thread = threading.Thread(target=self._run, name="sheet-loader", daemon=True)
+        self._thread.start()
+
+    def progress(self) -> float:
+        '''
+        :return: fraction of the file that has been decoded
+        '''
+        if self._done.is_set() and self.sheet is not None:
+            return 1.0
+        return min(1.0, self._reader.bytes_read / self._total)
+
+    def done(self) -> bool:
+        '''
+        True once the sheet has been decoded and hashed (or either failed or was cancelled)
+        '''
+        return self._done.is_set()
+
+    def hashed(self) -> bool:
+        return self._hashed.is_set()
+
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: float|None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _hash(self):
+        try:
+            self.content_hash = hash_file(self.path, self._cancel)
+        except Exception as e:
+            #the sheet can still be used, it just wont be cached
+            _TRACE.log(WARN, "could not hash sprite sheet", path=self.path, error=e)
+        finally:
+            self._hashed.set()
+
+    def _run(self):
+        try:
+            self._image.load()
+            sheet = SpriteSheet.from_image(self._image)
+            if _TRACE.info:
+                _TRACE.log(INFO, "sheet loaded", path=self.path, size=self.size)
+            try:
+                self.detected = detect_sprite_grid(sheet)
+            except Exception as e:
+                #only a convenience, the settings can still be entered by hand
+                _TRACE.log(WARN, "could not detect sprite grid", path=self.path, error=e)
+            self.sheet = sheet
+        except LoadCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self._image.close()
+            self._reader.close()
+            self._hashed.wait()
+            self._done.set()
+
+def decode_top_rows(path: str, rows: int) -> Image|None:
+    '''
+    Decodes only the top rows of a sprite sheet, which is much faster than decoding the whole sheet
+    when all that is needed is the first row of frames
+
+    Only the compressed data the top rows need is inflated, and it is handed to PIL as a PNG that is only that tall
+    This only works for non-interlaced PNGs, which are decoded from top to bottom
+    :return: an image of the top rows, or None if the sheet cant be partially decoded
+    '''
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(_PNG_SIGNATURE)) != _PNG_SIGNATURE:
+                return None
+            out = [_PNG_SIGNATURE]
+            needed = 0
+            #the start of the image data (zlib) stream, up to the end of the last row wanted
+            data: list[bytes] = []
+            inflate = zlib.decompressobj()
+            inflated = 0
+            while inflated < needed or not needed:
+                head = f.read(8)
+                if len(head) < 8:
+                    return None
+                length, chunk_type = struct.unpack(">I4s", head)
+                body = f.read(length)
+                crc = f.read(4)
+                if chunk_type == b"IHDR":
+                    width, height, depth, color_type, compression, filter_method, interlace = struct.unpack(">IIBBBBB", body)
+                    if interlace or color_type not in _PNG_CHANNELS:
+                        return None
+                    rows = max(1, min(rows, height))
+                    #every row is its pixels plus a filter byte
+                    needed = rows * ((width * _PNG_CHANNELS[color_type] * depth + 7) // 8 + 1)
+                    body = struct.pack(">IIBBBBB", width, rows, depth, color_type, compression, filter_method, interlace)
+                    out.append(_png_chunk(chunk_type, body))
+                elif chunk_type == b"IDAT":
+                    if not needed:
+                        return None
+                    inflated += len(inflate.decompress(body, needed - inflated))
+                    data.append(body[:len(body) - len(inflate.unconsumed_tail)])
+                elif chunk_type == b"IEND":
+                    return None
+                else:
+                    out.append(head + body + crc)
+        out.append(_png_chunk(b"IDAT", b"".join(data)))
+        out.append(_png_chunk(b"IEND", b""))
+        image = PIL.Image.open(io.BytesIO(b"".join(out)))
+        image.load()
+        return image
+    except Exception:
+        return None
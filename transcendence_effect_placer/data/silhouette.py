@@ -0,0 +1,193 @@
+'''
+Tests where points land on the ship's hull silhouette, in every rotation and animation frame at once
+
+This catches points whose z is wrong, which look fine on the facing they were placed on
+but "fall off" the ship as it rotates
+'''
+
+from __future__ import annotations
+from dataclasses import dataclass
+import math
+import numpy as np
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.frame_runs import FrameRuns
+from transcendence_effect_placer.data.points import Point, PointDock, PointGeneric, MirrorOptions
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+
+#alpha above which a pixel counts as part of the hull
+ALPHA_THRESHOLD = 128
+#for sheets without transparency, luminance above which a pixel counts as part of the hull
+LUMINANCE_THRESHOLD = 24
+#how far from the hull (pixels) a point that left it is searched for, further than this is reported as out of range
+MAX_SEARCH_RADIUS = 64
+#width (pixels) of each ring of the search, rings are searched nearest first until the hull is found
+SEARCH_RING_WIDTH = 4
+
+_TRACE = get_channel("points")
+
+def has_transparency(sheet: SpriteSheet, cfg: SpriteConfig, anim: int = 0) -> bool:
+    '''
+    Ships drawn on a black background instead of a transparent one have opaque frame corners
+    '''
+    rot = np.arange(cfg.rot_frames)[:, np.newaxis]
+    corners_x = np.array([0, cfg.w - 1, 0, cfg.w - 1])
+    corners_y = np.array([0, 0, cfg.h - 1, cfg.h - 1])
+    return bool((sheet.sample(cfg, rot, corners_x, corners_y, anim)[..., 3] < 255).any())
+
+def hull_mask(pixels: np.ndarray, transparent: bool) -> np.ndarray:
+    '''
+    :param pixels: rgba pixels, in the last axis
+    :param transparent: whether the sheet has a transparent background (see has_transparency), otherwise the hull is found by brightness
+    :return: whether each pixel is part of the hull
+    '''
+    if transparent:
+        return pixels[..., 3] > ALPHA_THRESHOLD
+    luminance = pixels[..., 0] * 0.299 + pixels[..., 1] * 0.587 + pixels[..., 2] * 0.114
+    return luminance > LUMINANCE_THRESHOLD
+
+def hull_at(sheet: SpriteSheet, cfg: SpriteConfig, rotation: np.ndarray, x: np.ndarray, y: np.ndarray, anim: int, transparent: bool) -> np.ndarray:
+    '''
+    :return: whether each pixel of a frame is part of the hull
+    '''
+    return hull_mask(sheet.sample(cfg, rotation, x, y, anim), transparent)
+
+def _search_rings() -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    '''
+    :return: x offsets, y offsets and distances of every pixel around a point, grouped into rings by distance
+    '''
+    r = MAX_SEARCH_RADIUS
+    oy, ox = np.mgrid[-r:r + 1, -r:r + 1]
+    ox = ox.ravel()
+    oy = oy.ravel()
+    distance = np.hypot(ox, oy)
+    rings = []
+    for inner in range(0, r, SEARCH_RING_WIDTH):
+        in_ring = (distance > inner) & (distance <= inner + SEARCH_RING_WIDTH)
+        rings.append((ox[in_ring], oy[in_ring], distance[in_ring]))
+    return rings
+
+_SEARCH_RINGS = _search_rings()
+
+def distance_to_hull(sheet: SpriteSheet, cfg: SpriteConfig, rotation: np.ndarray, x: np.ndarray, y: np.ndarray, anim: int, transparent: bool) -> np.ndarray:
+    '''
+    :return: distance (pixels) from each pixel to the nearest pixel of the hull in its frame,
+    0 on the hull and inf if the hull is further than MAX_SEARCH_RADIUS
+    '''
+    rotation, x, y = np.broadcast_arrays(rotation, x, y)
+    rotation = rotation.ravel()
+    x = x.ravel()
+    y = y.ravel()
+    distance = np.zeros(x.shape, dtype=np.float64)
+    #only the pixels that missed the hull are searched around, nearest ring first
+    remaining = np.flatnonzero(~hull_at(sheet, cfg, rotation, x, y, anim, transparent))
+    for ox, oy, ring_distance in _SEARCH_RINGS:
+        if not len(remaining):
+            break
+        hits = hull_at(sheet, cfg, rotation[remaining, np.newaxis], x[remaining, np.newaxis] + ox, y[remaining, np.newaxis] + oy, anim, transparent)
+        found = hits.any(axis=1)
+        distance[remaining[found]] = np.where(hits[found], ring_distance, np.inf).min(axis=1)
+        remaining = remaining[~found]
+    distance[remaining] = np.inf
+    return distance
+
+@dataclass
+class OffHull:
+    '''
+    Rotation frames at which one of a point's mirrors is off the hull, in any animation frame
+    '''
+    point: Point
+    mirror: MirrorOptions
+    rot_frames: int
+    frames: np.ndarray
+    #furthest distance from the hull at each of those frames, over every animation frame
+    distances: np.ndarray
+
+    def describe(self) -> str:
+        mirrors = "".join(axis for axis, on in (("x", self.mirror.x), ("y", self.mirror.y), ("z", self.mirror.z)) if on)
+        name = f"{self.point.label} (mirror {mirrors})" if mirrors else self.point.label
+        off = np.zeros(self.rot_frames, dtype=np.int64)
+        off[self.frames] = 1
+        facings = FrameRuns.from_frames(off.tolist()).format_ranges(1)
+        worst = float(self.distances.max())
+        how_far = f"more than {MAX_SEARCH_RADIUS} px" if math.isinf(worst) else f"up to {worst:.0f} px"
+        return f"{name}: off the hull at {len(self.frames)} facings ({facings}), {how_far}"
+
+class HullValidator:
+    '''
+    Checks points against the hull of a sprite sheet
+    Results are kept until a point changes, so checking every point again after an edit only checks the edited one
+    '''
+    def __init__(self, sheet: SpriteSheet, cfg: SpriteConfig):
+        self.sheet = sheet
+        self._cfg = cfg
+        self._cfg_key: tuple|None = None
+        self._transparent: dict[int, bool] = {}
+        self._results: dict[Point, tuple[int, list[OffHull]]] = {}
+
+    def matches(self, sheet: SpriteSheet, cfg: SpriteConfig) -> bool:
+        return self.sheet is sheet and self._cfg is cfg
+
+    def _check_config(self):
+        #the config is edited in place, so anything worked out from it is dropped when it changes
+        key = self._cfg.facing_table().key
+        if key != self._cfg_key:
+            self._cfg_key = key
+            self._transparent.clear()
+            self._results.clear()
+
+    def _is_transparent(self, anim: int) -> bool:
+        transparent = self._transparent.get(anim)
+        if transparent is None:
+            transparent = has_transparency(self.sheet, self._cfg, anim)
+            self._transparent[anim] = transparent
+        return transparent
+
+    def check_point(self, pt: Point) -> list[OffHull]:
+        self._check_config()
+        cached = self._results.get(pt)
+        if cached is not None and cached[0] == pt.revision:
+            return cached[1]
+        result = self._check_point(pt)
+        self._results[pt] = (pt.revision, result)
+        return result
+
+    def _check_point(self, pt: Point) -> list[OffHull]:
+        cfg = self._cfg
+        if isinstance(pt, PointGeneric):
+            return []
+        #docking ports do not rotate with the ship, so they are only checked on the facing they are placed on
+        rot_frames = 1 if isinstance(pt, PointDock) else cfg.rot_frames
+        directions = cfg.facing_table().directions[:rot_frames]
+        rotation = np.arange(rot_frames)
+        mirrors = pt._get_mirror_options()
+        coords = np.stack([pt.get_projection_coords_at_directions(directions, mirror) for mirror in mirrors])
+        x = coords[..., 0].astype(np.int64)
+        y = coords[..., 1].astype(np.int64)
+        #[mirror, rotation] distance from the hull, the furthest over every animation frame
+        worst = np.zeros(x.shape, dtype=np.float64)
+        for anim in range(cfg.anim_frames + 1):
+            distance = distance_to_hull(self.sheet, cfg, rotation[np.newaxis, :], x, y, anim, self._is_transparent(anim))
+            np.maximum(worst, distance.reshape(x.shape), out=worst)
+        result: list[OffHull] = []
+        for mirror, mirror_worst in zip(mirrors, worst):
+            frames = np.flatnonzero(mirror_worst > 0)
+            if len(frames):
+                result.append(OffHull(pt, mirror, cfg.rot_frames, frames, mirror_worst[frames]))
+        return result
+
+    def check(self, points: list[Point]) -> list[OffHull]:
+        '''
+        :return: every mirror of every point that leaves the hull at some facing
+        '''
+        self._check_config()
+        live = set(points)
+        for pt in [pt for pt in self._results if pt not in live]:
+            del self._results[pt]
+        result: list[OffHull] = []
+        for pt in points:
+            result.extend(self.check_point(pt))
+        if _TRACE.info:
+            _TRACE.log(INFO, "hull check", points=len(points), off_hull=len(result))
+        return result
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+import PIL.Image
+from PIL.Image import Image
+
+from transcendence_effect_placer.data.data import SpriteConfig
+
+class SpriteSheet:
+    '''
+    Decoded RGBA pixels of a sprite sheet, held as one array that frames are sliced out of without copying
+
+    pixels is either the whole sheet, indexed [y, x, rgba],
+    or an atlas of frames (see atlas_cache), indexed [anim, rotation, y, x, rgba]
+    Frames handed out are views into pixels, so they must not be written to
+    '''
+    def __init__(self, pixels: np.ndarray):
+        if pixels.dtype != np.uint8 or pixels.shape[-1] != 4 or pixels.ndim not in (3, 5):
+            raise ValueError(f"not an RGBA sheet or atlas: {pixels.shape} {pixels.dtype}")
+        self.pixels = pixels
+        self.is_atlas = pixels.ndim == 5
+
+    @staticmethod
+    def from_image(image: Image) -> SpriteSheet:
+        '''
+        Copies a decoded image into a sheet, the image can be closed afterwards
+        '''
+        rgba = image if image.mode == "RGBA" else image.convert("RGBA")
+        pixels = np.asarray(rgba)
+        if rgba is not image:
+            rgba.close()
+        return SpriteSheet(pixels)
+
+    @property
+    def nbytes(self) -> int:
+        return self.pixels.nbytes
+
+    def frame(self, cfg: SpriteConfig, rotation: int = 0, anim: int = 0) -> np.ndarray:
+        '''
+        :return: view of a frame, indexed [y, x, rgba]
+        Only frames that hang over the edge of the sheet are copied, padded with transparent pixels like Image.crop does
+        '''
+        if self.is_atlas:
+            return self.pixels[anim, rotation]
+        l, u, r, b = cfg.facing_table().frame_box(rotation, anim)
+        sheet_h, sheet_w = self.pixels.shape[:2]
+        if l >= 0 and u >= 0 and r <= sheet_w and b <= sheet_h:
+            return self.pixels[u:b, l:r]
+        frame = np.zeros((cfg.h, cfg.w, 4), dtype=np.uint8)
+        cl, cu, cr, cb = max(l, 0), max(u, 0), min(r, sheet_w), min(b, sheet_h)
+        if cl < cr and cu < cb:
+            frame[cu - u:cb - u, cl - l:cr - l] = self.pixels[cu:cb, cl:cr]
+        return frame
+
+    def frame_image(self, cfg: SpriteConfig, rotation: int = 0, anim: int = 0) -> Image:
+        '''
+        :return: a new image of a frame, that can be drawn on
+        '''
+        return PIL.Image.fromarray(np.ascontiguousarray(self.frame(cfg, rotation, anim)), "RGBA")
+
+    def frame_grid(self, cfg: SpriteConfig, anim: int = 0) -> np.ndarray|None:
+        '''
+        :return: view of every rotation frame of an animation frame, indexed [rot column, position in column, y, x, rgba],
+        or None if the grid hangs over the edge of the sheet
+        '''
+        if self.is_atlas:
+            return None
+        col_size = cfg.rot_col_size()
+        x, y = cfg.facing_table().frame_origins[anim, 0].tolist()
+        sheet_h, sheet_w = self.pixels.shape[:2]
+        if x < 0 or y < 0 or x + cfg.rot_cols * cfg.w > sheet_w or y + col_size * cfg.h > sheet_h:
+            return None
+        origin = self.pixels[y:, x:]
+        sy, sx, sc = origin.strides
+        return as_strided(origin, shape=(cfg.rot_cols, col_size, cfg.h, cfg.w, 4), strides=(cfg.w * sx, cfg.h * sy, sy, sx, sc), writeable=False)
+
+    def frames(self, cfg: SpriteConfig, anim: int = 0, channel: int|None = None) -> np.ndarray:
+        '''
+        :param channel: only return this channel, eg 3 for the alpha of every frame
+        :return: every rotation frame of an animation frame, indexed [rotation, y, x, rgba] (or [rotation, y, x] for a single channel)
+        This is a view for an atlas, otherwise the frames are gathered into a new array
+        '''
+        if self.is_atlas:
+            frames = self.pixels[anim]
+            return frames if channel is None else frames[..., channel]
+        grid = self.frame_grid(cfg, anim)
+        if grid is not None:
+            if channel is not None:
+                grid = grid[..., channel]
+            return grid.reshape((-1,) + grid.shape[2:])[:cfg.rot_frames]
+        frames = np.stack([self.frame(cfg, rot, anim) for rot in range(cfg.rot_frames)])
+        return frames if channel is None else frames[..., channel]
+
+    def alpha(self, cfg: SpriteConfig, anim: int = 0) -> np.ndarray:
+        '''
+        :return: alpha of every rotation frame of an animation frame, indexed [rotation, y, x]
+        '''
+        return self.frames(cfg, anim, 3)
+
+    def sample(self, cfg: SpriteConfig, rotation: np.ndarray, x: np.ndarray, y: np.ndarray, anim: int = 0) -> np.ndarray:
+        '''
+        Gathers single pixels from many frames at once, without slicing the frames out
+
+        :param rotation: rotation frame of each pixel, broadcast against x and y
+        :param x: PIL x coordinate of each pixel within its frame
+        :param y: PIL y coordinate of each pixel within its frame
+        :return: rgba of each pixel, with shape broadcast(rotation, x, y) + (4,)
+        pixels outside of their frame (or of the sheet) are transparent
+        '''
+        rotation, x, y = np.broadcast_arrays(np.asarray(rotation, dtype=np.int64), np.asarray(x, dtype=np.int64), np.asarray(y, dtype=np.int64))
+        inside = (x >= 0) & (x < cfg.w) & (y >= 0) & (y < cfg.h) & (rotation >= 0) & (rotation < cfg.rot_frames)
+        rotation, x, y = np.where(inside, rotation, 0), np.where(inside, x, 0), np.where(inside, y, 0)
+        if self.is_atlas:
+            samples = self.pixels[anim, rotation, y, x]
+        else:
+            origins = cfg.facing_table().frame_origins[anim]
+            sheet_x = origins[rotation, 0] + x
+            sheet_y = origins[rotation, 1] + y
+            sheet_h, sheet_w = self.pixels.shape[:2]
+            inside &= (sheet_x >= 0) & (sheet_x < sheet_w) & (sheet_y >= 0) & (sheet_y < sheet_h)
+            samples = self.pixels[np.where(inside, sheet_y, 0), np.where(inside, sheet_x, 0)]
+        samples[~inside] = 0
+        return samples
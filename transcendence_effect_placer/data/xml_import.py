@@ -0,0 +1,318 @@
+'''
+Streaming importer for the <DeviceSlot>, <Effect type="thrustMain"> and <Port> elements of <ShipClass> definitions
+
+Files are parsed with iterparse and every element is cleared once it has been read,
+so memory use only depends on the size of one ShipClass, not of the whole file
+
+Mod files refer to entities declared in other files (eg effect="&efMainThrusterLarge;"),
+which expat would reject, so those are escaped on the way in and come out as their literal text
+Entities declared in the file's own DOCTYPE are still expanded
+'''
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+import math
+import os
+import re
+from typing import BinaryIO, Iterator
+import xml.etree.ElementTree as ET
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO, WARN
+from transcendence_effect_placer.data.data import SpriteConfig
+from transcendence_effect_placer.data.frame_runs import FrameRuns
+from transcendence_effect_placer.data.math import d180, d360, TRANSCENDENCE_POLAR_OFFSET
+from transcendence_effect_placer.data.points import Point, PointDevice, PointDock, PointThuster, MirrorOptions, PXMLCoord, GSceneCoord, SpriteCoord, DEFAULT_CFG, MIRROR_NULL
+from transcendence_effect_placer.data.xml_writer import XMLElement
+
+READ_CHUNK_BYTES = 2 ** 16
+
+_TRACE = get_channel("project")
+
+_ENTITY_REF = re.compile(rb'&([^;&<>"\'\s]*);?')
+_ENTITY_DECL = re.compile(rb'<!ENTITY\s+([^\s%]+)')
+_XML_ENTITIES = {b"amp", b"lt", b"gt", b"quot", b"apos"}
+
+class _EntityEscapingReader:
+    '''
+    File wrapper for iterparse that turns references to undeclared entities into literal text
+    Entities declared in the file's own DOCTYPE are left for the parser to expand
+    '''
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._pending = b""
+        self._declared: set[bytes] = set(_XML_ENTITIES)
+        #end of the previous read, so a declaration split across reads is still seen
+        self._tail = b""
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._pending
+        self._pending = b""
+        while True:
+            chunk = self._f.read(size if size > 0 else READ_CHUNK_BYTES)
+            data += chunk
+            if not chunk:
+                break
+            #an entity reference may be split across reads, so hold back an unterminated one
+            amp = data.rfind(b'&')
+            if amp >= 0 and data.find(b';', amp) < 0:
+                self._pending = data[amp:]
+                data = data[:amp]
+            if data:
+                break
+            data, self._pending = self._pending, b""
+        self._declared.update(_ENTITY_DECL.findall(self._tail + data))
+        self._tail = (self._tail + data)[-256:]
+        return _ENTITY_REF.sub(self._escape, data)
+
+    def _escape(self, match: re.Match[bytes]) -> bytes:
+        name = match.group(1)
+        if match.group(0).endswith(b';') and (name in self._declared or name.startswith(b'#')):
+            return match.group(0)
+        return b'&amp;' + match.group(0)[1:]
+
+@dataclass
+class ImportedShip:
+    '''
+    Points of one <ShipClass>
+    index: position of the <ShipClass> among every <ShipClass> in its file
+    elements: point elements read, before any mirrors were folded
+    '''
+    unid: str|None = None
+    name: str|None = None
+    source: str|None = None
+    points: list[Point] = field(default_factory=list)
+    index: int = -1
+    elements: int = 0
+
+    def label(self) -> str:
+        return self.name or self.unid or "ShipClass"
+
+def parse_frame_ranges(value: str, rot_frames: int) -> list[tuple[int, int]]:
+    '''
+    Parses a sendToBack or bringToFront attribute, eg "0,3-5,7" or "*"
+    :return: first frame and end frame (exclusive) of every range it lists
+    '''
+    value = value.strip()
+    if value == "*":
+        return [(0, rot_frames)]
+    ranges: list[tuple[int, int]] = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start_s, _, end_s = part.partition('-')
+        start = int(start_s)
+        end = int(end_s) if end_s else start
+        ranges.append((start, end + 1))
+    return ranges
+
+def _int_attr(elem: ET.Element, name: str, default: int|None = None) -> int|None:
+    value = elem.get(name)
+    if value is None or not value.strip():
+        return default
+    return round(float(value))
+
+def _polar_point(point_cls: type[Point], label: str, cfg: SpriteConfig, elem: ET.Element) -> Point:
+    pos_angle = _int_attr(elem, "posAngle", 0)
+    #inverse of the conversion done by the Pos Angle control
+    a = math.radians(-d180(pos_angle + TRANSCENDENCE_POLAR_OFFSET))
+    r = _int_attr(elem, "posRadius", 0)
+    z = _int_attr(elem, "posZ", 0)
+    pt = point_cls.from_state(label, cfg, SpriteCoord(0, 0), GSceneCoord(0, 0, 0), PXMLCoord(a, r, z), MirrorOptions())
+    pt.update_from_polar(PXMLCoord(a, r, z))
+    return pt
+
+def device_from_element(elem: ET.Element, label: str, cfg: SpriteConfig) -> PointDevice:
+    pt = _polar_point(PointDevice, label, cfg, elem)
+    assert isinstance(pt, PointDevice)
+    pt.direction = d180(_int_attr(elem, "fireAngle", 0))
+    pt.arc = _int_attr(elem, "fireArc", -1)
+    min_arc = _int_attr(elem, "minFireArc")
+    max_arc = _int_attr(elem, "maxFireArc")
+    if min_arc is not None and max_arc is not None:
+        pt.arc_start = d360(min_arc)
+        pt.arc_end = d360(max_arc)
+    else:
+        pt.arc_start = -1
+        pt.arc_end = -1
+    return pt
+
+def thruster_from_element(elem: ET.Element, label: str, cfg: SpriteConfig) -> PointThuster:
+    pt = _polar_point(PointThuster, label, cfg, elem)
+    assert isinstance(pt, PointThuster)
+    pt.direction = d180(_int_attr(elem, "rotation", 180))
+    pt.under_over = FrameRuns(cfg.rot_frames)
+    for start, stop in parse_frame_ranges(elem.get("sendToBack", ""), cfg.rot_frames):
+        pt.under_over.assign(start, stop, -1)
+    for start, stop in parse_frame_ranges(elem.get("bringToFront", ""), cfg.rot_frames):
+        pt.under_over.assign(start, stop, 1)
+    return pt
+
+def dock_from_element(elem: ET.Element, label: str, cfg: SpriteConfig) -> PointDock:
+    if elem.get("x") is not None or elem.get("y") is not None:
+        pt = PointDock.from_state(label, cfg, SpriteCoord(0, 0), GSceneCoord(0, 0, 0), PXMLCoord(0, 0, 0), MirrorOptions())
+        pt.update_from_projection(SpriteCoord(_int_attr(elem, "x", 0), _int_attr(elem, "y", 0)))
+    else:
+        pt = _polar_point(PointDock, label, cfg, elem)
+    assert isinstance(pt, PointDock)
+    return pt
+
+def _fold_device_mirrors(points: list[Point]):
+    '''
+    Exported mirrors of a device slot have their id suffixed with _x, _y and _z,
+    turn those back into mirror flags on the original slot
+    '''
+    devices = {pt.label: pt for pt in points if isinstance(pt, PointDevice)}
+    folded: set[int] = set()
+    for i, pt in enumerate(points):
+        if not isinstance(pt, PointDevice):
+            continue
+        match = re.fullmatch(r'(.+?)((?:_x)?(?:_y)?(?:_z)?)', pt.label)
+        if match is None or not match.group(2):
+            continue
+        original = devices.get(match.group(1))
+        if original is None or original is pt:
+            continue
+        suffix = match.group(2)
+        if "_x" in suffix: original.set_mirror_x()
+        if "_y" in suffix: original.set_mirror_y()
+        if "_z" in suffix: original.set_mirror_z()
+        folded.add(i)
+    points[:] = [pt for i, pt in enumerate(points) if i not in folded]
+
+def _element_key(element: XMLElement) -> tuple:
+    tag, attrs = element
+    return (tag, tuple(attrs))
+
+def _fold_position_mirrors(points: list[Point]):
+    '''
+    Exported mirrors of thrusters and docking ports are plain copies at the mirrored position,
+    so later points that are exactly what a point's mirrors would export are turned back into mirror flags on it
+    A point only gets mirror flags if every copy they export was found
+    '''
+    folded: set[int] = set()
+    #what each point exports on its own, imported points are never mirrored yet
+    exported = [_element_key(pt.xml_elements()[0]) if isinstance(pt, (PointThuster, PointDock)) else None for pt in points]
+    for i, pt in enumerate(points):
+        if i in folded or exported[i] is None or pt.mirror != MIRROR_NULL:
+            continue
+        later: dict[tuple, list[int]] = {}
+        for j in range(i + 1, len(points)):
+            if j not in folded and type(points[j]) is type(pt):
+                later.setdefault(exported[j], []).append(j)
+        if not later:
+            continue
+        axes = []
+        for axis in ("x", "y", "z"):
+            if getattr(pt.mirror_support, axis):
+                pt.mirror = MirrorOptions(**{axis: True})
+                if _element_key(pt.xml_elements()[1]) in later:
+                    axes.append(axis)
+        pt.mirror = MirrorOptions(**{axis: True for axis in axes})
+        matches: list[int] = []
+        for element in pt.xml_elements()[1:]:
+            unused = [j for j in later.get(_element_key(element), ()) if j not in matches]
+            if not unused:
+                #some of the copies are missing, so these are separate points after all
+                pt.mirror = MirrorOptions()
+                matches = []
+                break
+            matches.append(unused[0])
+        pt._touch()
+        folded.update(matches)
+    points[:] = [pt for i, pt in enumerate(points) if i not in folded]
+
+def _fold_mirrors(points: list[Point]):
+    _fold_device_mirrors(points)
+    _fold_position_mirrors(points)
+
+def _is_point_element(elem: ET.Element) -> bool:
+    tag = elem.tag
+    return tag == "DeviceSlot" or (tag == "Device" and elem.get("posAngle") is not None) or (tag == "Effect" and elem.get("type") == "thrustMain") or tag == "Port"
+
+def point_from_element(elem: ET.Element, label: str, cfg: SpriteConfig) -> Point:
+    '''
+    :param label: used unless the element has its own id (only device slots do)
+    '''
+    if elem.tag == "Effect":
+        return thruster_from_element(elem, label, cfg)
+    if elem.tag == "Port":
+        return dock_from_element(elem, label, cfg)
+    return device_from_element(elem, elem.get("id") or label, cfg)
+
+def iter_ship_classes(source: str|BinaryIO, cfg: SpriteConfig = DEFAULT_CFG, fold_mirrors: bool = True, build_points: bool = True, index: int|None = None) -> Iterator[ImportedShip]:
+    '''
+    Yields the points of every <ShipClass> in a file, as each one is parsed
+    Ships without any points are skipped
+    :param build_points: if False, only count the point elements of each ship, which is much faster when just listing the ships
+    :param index: only read the ship at this ImportedShip.index, and stop reading the file once it has been parsed
+    '''
+    f = open(source, 'rb') if isinstance(source, str) else source
+    source_name = source if isinstance(source, str) else getattr(source, "name", None)
+    try:
+        ship: ImportedShip|None = None
+        ship_index = -1
+        next_label = 0
+        depth = 0
+        root: ET.Element|None = None
+        for event, elem in ET.iterparse(_EntityEscapingReader(f), events=("start", "end")): # type: ignore
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                if elem.tag == "ShipClass":
+                    ship_index += 1
+                    if index is None or ship_index == index:
+                        ship = ImportedShip(elem.get("unid"), elem.get("class") or elem.get("name"), source_name, index=ship_index)
+                    next_label = 0
+                continue
+
+            depth -= 1
+            if ship is not None:
+                tag = elem.tag
+                try:
+                    if tag == "ShipClass":
+                        if fold_mirrors:
+                            _fold_mirrors(ship.points)
+                        if ship.points or (ship.elements and not build_points):
+                            yield ship
+                        ship = None
+                        if index is not None:
+                            return
+                    elif _is_point_element(elem):
+                        ship.elements += 1
+                        if build_points:
+                            ship.points.append(point_from_element(elem, str(next_label), cfg))
+                        next_label += 1
+                except ValueError as e:
+                    _TRACE.log(WARN, "skipping malformed element", source=source_name, ship=ship.label(), tag=tag, error=e)
+            #everything needed has been read, so let go of the element (and anything before it at the top level)
+            elem.clear()
+            if depth == 1 and root is not None:
+                root.clear()
+    finally:
+        if isinstance(source, str):
+            f.close()
+
+def iter_directory(path: str, cfg: SpriteConfig = DEFAULT_CFG, fold_mirrors: bool = True) -> Iterator[ImportedShip]:
+    '''
+    Yields the ships of every .xml file under a directory
+    Files that fail to parse are reported and skipped
+    '''
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(".xml"):
+                continue
+            file_path = os.path.join(dirpath, filename)
+            try:
+                yield from iter_ship_classes(file_path, cfg, fold_mirrors)
+            except ET.ParseError as e:
+                _TRACE.log(WARN, "could not parse XML", source=file_path, error=e)
+
+def import_ships(path: str, cfg: SpriteConfig = DEFAULT_CFG) -> Iterator[ImportedShip]:
+    if os.path.isdir(path):
+        return iter_directory(path, cfg)
+    if _TRACE.info:
+        _TRACE.log(INFO, "importing XML", source=path)
+    return iter_ship_classes(path, cfg)
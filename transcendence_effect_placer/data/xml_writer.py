@@ -0,0 +1,84 @@
+'''
+Formatting of the XML that is pasted into a <ShipClass>, kept in one place so every element is laid out and escaped the same way
+
+Attributes are separated by tabs, with a double tab after the first attribute of longer elements,
+so the identifying attribute (id, type) stands apart from the coordinates
+'''
+
+from __future__ import annotations
+from typing import Iterable, TextIO
+
+XMLAttrs = Iterable[tuple[str, object]]
+XMLElement = tuple[str, XMLAttrs]
+
+INDENT = '\t'
+
+_ATTR_ESCAPES = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    '\t': '&#9;',
+    '\n': '&#10;',
+    '\r': '&#13;',
+})
+
+class Entity(str):
+    '''
+    Attribute value written as a reference to an entity declared by the game, eg Entity("efMainThrusterLarge") -> &efMainThrusterLarge;
+    '''
+
+def escape_attr(value: object) -> str:
+    if isinstance(value, Entity):
+        return f"&{value};"
+    return str(value).translate(_ATTR_ESCAPES)
+
+def format_attrs(attrs: XMLAttrs) -> str:
+    parts = [f'{name}="{escape_attr(value)}"' for name, value in attrs]
+    if len(parts) > 2:
+        return parts[0] + '\t\t' + '\t'.join(parts[1:])
+    return '\t'.join(parts)
+
+def format_element(tag: str, attrs: XMLAttrs = ()) -> str:
+    text = format_attrs(attrs)
+    return f"<{tag} {text}/>" if text else f"<{tag}/>"
+
+class XMLWriter:
+    '''
+    Writes elements to a file as they are produced, rather than building the document in memory
+    '''
+    def __init__(self, f: TextIO):
+        self._f = f
+        self._open: list[str] = []
+
+    def start(self, tag: str, attrs: XMLAttrs = ()):
+        text = format_attrs(attrs)
+        self._f.write(f"{INDENT * len(self._open)}<{tag}{' ' + text if text else ''}>\n")
+        self._open.append(tag)
+
+    def end(self, tag: str):
+        if not self._open or self._open[-1] != tag:
+            raise ValueError(f"closing <{tag}> but the open element is {self._open[-1] if self._open else None}")
+        self._open.pop()
+        self._f.write(f"{INDENT * len(self._open)}</{tag}>\n")
+
+    def element(self, tag: str, attrs: XMLAttrs = ()):
+        self._f.write(f"{INDENT * len(self._open)}{format_element(tag, attrs)}\n")
+
+    def elements(self, elements: Iterable[XMLElement]):
+        for tag, attrs in elements:
+            self.element(tag, attrs)
+
+    def formatted(self, lines: Iterable[str]):
+        '''
+        Writes elements that were already formatted with format_element
+        '''
+        indent = INDENT * len(self._open)
+        self._f.write(''.join(f"{indent}{line}\n" for line in lines))
+
+    def close(self):
+        '''
+        Closes every element that is still open
+        '''
+        while self._open:
+            self.end(self._open[-1])
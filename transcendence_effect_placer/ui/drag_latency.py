@@ -0,0 +1,73 @@
+'''
+Measures how long dragging a point takes to show up on screen
+
+Latency is counted from the first mouse motion that a render shows (motions that come in while a render is pending
+are folded into it) to the end of that render, so it includes the time spent waiting for the render scheduler
+'''
+
+from __future__ import annotations
+from time import perf_counter
+
+from transcendence_effect_placer.common.diagnostics import get_channel, INFO, WARN
+
+#one frame at 60 fps
+DRAG_LATENCY_BUDGET_MS = 16
+
+_TRACE = get_channel("ui")
+
+class DragLatency:
+    '''
+    moves: motion events that moved the dragged point
+    shown: renders that showed at least one of those moves
+    over_budget: renders that came more than budget_ms after the first move they showed
+    worst_ms: longest latency of the drag
+    '''
+    def __init__(self, budget_ms: float = DRAG_LATENCY_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.start()
+
+    def start(self):
+        self._pending_since: float|None = None
+        self.moves: int = 0
+        self.shown: int = 0
+        self.over_budget: int = 0
+        self.worst_ms: float = 0.0
+
+    def moved(self):
+        self.moves += 1
+        if self._pending_since is None:
+            self._pending_since = perf_counter()
+
+    def rendered(self):
+        '''
+        Call once a render has finished, renders that were not showing a move are ignored
+        '''
+        if self._pending_since is None:
+            return
+        start = self._pending_since
+        self._pending_since = None
+        ms = (perf_counter() - start) * 1000
+        self.shown += 1
+        self.worst_ms = max(self.worst_ms, ms)
+        over = ms > self.budget_ms
+        if over:
+            self.over_budget += 1
+        if _TRACE.timing:
+            _TRACE.record("drag_latency", start, over_budget=over)
+
+    def stats(self) -> dict[str, int|float]:
+        return {
+            "moves": self.moves,
+            "shown": self.shown,
+            "over_budget": self.over_budget,
+            "worst_ms": round(self.worst_ms, 2),
+        }
+
+    def finish(self, label: str):
+        '''
+        Reports the drag that just ended
+        '''
+        if self.over_budget and _TRACE.warn:
+            _TRACE.log(WARN, "drag over latency budget", label=label, budget_ms=self.budget_ms, **self.stats())
+        elif _TRACE.info:
+            _TRACE.log(INFO, "drag finished", label=label, **self.stats())
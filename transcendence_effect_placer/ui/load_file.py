@@ -16,4 +16,33 @@ class SpriteOpener:
         return new_path
 
     def get_path(self):
-        return self._path
\ No newline at end of file
+        return self._path
+
+class ProjectOpener:
+    def __init__(self, root: Tk):
+        self._root = root
+        self._path: str|None = None
+
+    def open_path(self):
+        new_path = filedialog.askopenfilename(filetypes=[("Project Files", ".json"), ("Autosaves", ".jsonl")])
+        if new_path:
+            self._path = new_path
+        return new_path
+
+    def get_path(self):
+        return self._path
+
+
+class XMLOpener:
+    def __init__(self, root: Tk):
+        self._root = root
+        self._path: str|None = None
+
+    def open_path(self):
+        new_path = filedialog.askopenfilename(filetypes=[("XML Files", ".xml")])
+        if new_path:
+            self._path = new_path
+        return new_path
+
+    def get_path(self):
+        return self._path
@@ -0,0 +1,43 @@
+from __future__ import annotations
+import tkinter as tk
+from tkinter import ttk
+from tkinter import LEFT, RIGHT, TOP, BOTTOM, X, Y, BOTH, Toplevel, Tk, Label, Button
+from typing import Callable
+
+class LoadProgressDialogue:
+    def __init__(self, root: Tk):
+        self._root = root
+        self._wnd: Toplevel|None = None
+        self._bar: ttk.Progressbar|None = None
+        self._label: Label|None = None
+
+    def is_open(self):
+        return not self._wnd is None
+
+    def open_dialogue(self, text: str, on_cancel: Callable[[], None]):
+        self.close()
+
+        self._wnd = Toplevel()
+        self._wnd.title("Loading")
+        self._wnd.transient(self._root)
+        self._wnd.protocol("WM_DELETE_WINDOW", on_cancel)
+
+        self._label = Label(self._wnd, text=text)
+        self._label.pack(side=TOP, fill=X, padx=8, pady=4)
+
+        self._bar = ttk.Progressbar(self._wnd, orient=tk.HORIZONTAL, length=300, mode="determinate", maximum=100)
+        self._bar.pack(side=TOP, fill=X, padx=8, pady=4)
+
+        cancel_button = Button(self._wnd, text="Cancel", command=on_cancel)
+        cancel_button.pack(side=TOP, pady=4)
+
+    def set_progress(self, fraction: float):
+        if self._bar is None: return
+        self._bar['value'] = round(fraction * 100)
+
+    def close(self):
+        if self._wnd is None: return
+        self._wnd.destroy()
+        self._wnd = None
+        self._bar = None
+        self._label = None
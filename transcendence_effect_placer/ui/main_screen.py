@@ -1,26 +1,45 @@
 from __future__ import annotations
 import tkinter as tk
-from tkinter import LEFT, RIGHT, TOP, BOTTOM, X, Y, VERTICAL, HORIZONTAL, BOTH, END, NORMAL, ACTIVE, DISABLED, Toplevel, Tk, Scale, Label, Event, StringVar, Entry, Frame, Listbox, Checkbutton, Radiobutton, Button, IntVar
-from PIL import ImageTk
+from tkinter import LEFT, RIGHT, TOP, BOTTOM, X, Y, VERTICAL, HORIZONTAL, BOTH, END, NORMAL, ACTIVE, DISABLED, Toplevel, Tk, Scale, Label, Event, StringVar, Entry, Frame, Listbox, Canvas, Checkbutton, Radiobutton, Button, IntVar
 import PIL
 from PIL.ImageFile import ImageFile
 from PIL.ImageDraw import ImageDraw
 from PIL.Image import Image
 import math
+import os
 import numpy as np
-from time import sleep
+import threading
+from time import sleep, perf_counter
 from typing import Callable, Literal
 from copy import deepcopy
 
 from transcendence_effect_placer.common.validation import validate_numeral, validate_numeral_non_negative, validate_null
 from transcendence_effect_placer.data.data import SpriteConfig, CCoord, ICoord, PCoord
-from transcendence_effect_placer.data.points import Point, PointGeneric, PointDevice, PointDock, PointThuster, PointType, PT_DEVICE, PT_DOCK, PT_GENERIC, PT_THRUSTER, SpriteCoord, PILCoord
+from transcendence_effect_placer.data.point_index import PointIndex
+from transcendence_effect_placer.data.points import Point, PointGeneric, PointDevice, PointDock, PointThuster, PointType, PT_DEVICE, PT_DOCK, PT_GENERIC, PT_THRUSTER, SpriteCoord, PILCoord, MirrorOptions, MIRROR_NULL, reproject_points
 from transcendence_effect_placer.data.math import a_d, d180, d360, TRANSCENDENCE_POLAR_OFFSET
-from transcendence_effect_placer.ui.load_file import SpriteOpener
+from transcendence_effect_placer.data.export import build_export_xml, write_export_xml
+from transcendence_effect_placer.data.project import Project, ProjectError, save_project
+from transcendence_effect_placer.data.xml_import import iter_ship_classes
+from transcendence_effect_placer.data.layering import auto_layer_thrusters
+from transcendence_effect_placer.data.silhouette import HullValidator
+from transcendence_effect_placer.data.autosave import AutosaveJournal, AUTOSAVE_SUFFIX, autosave_path, load_project_or_autosave
+from transcendence_effect_placer.data.sprite_sheet import SpriteSheet
+from transcendence_effect_placer.data.frame_cache import FrameCache, FrameKey, DEFAULT_FRAME_CACHE_BYTES
+from transcendence_effect_placer.data.frame_prefetch import FramePrefetcher
+from transcendence_effect_placer.data.sheet_loader import SheetLoader, decode_top_rows
+from transcendence_effect_placer.data.atlas_cache import AtlasCache, atlas_key, default_atlas_cache
+from transcendence_effect_placer.ui.load_file import SpriteOpener, ProjectOpener, XMLOpener
+from transcendence_effect_placer.ui.ship_chooser import ShipChooserDialogue
 from transcendence_effect_placer.ui.sprite_settings import SpriteSettingsDialogue
 from transcendence_effect_placer.ui.elements.slider_entry import SliderEntryUI
-from transcendence_effect_placer.ui.save_file import XMLSaver
+from transcendence_effect_placer.ui.save_file import XMLSaver, ProjectSaver
+from transcendence_effect_placer.ui.render_scheduler import RenderScheduler
+from transcendence_effect_placer.ui.drag_latency import DragLatency
+from transcendence_effect_placer.ui.sprite_canvas import SpriteCanvas
+from transcendence_effect_placer.ui.load_progress import LoadProgressDialogue
 from transcendence_effect_placer.common.lockable_ui import LockableUI
+from transcendence_effect_placer.common.diagnostics import get_channel, DEBUG, INFO, ERROR
 
 #set PIL max pixels
 Image.MAX_IMAGE_PIXELS = 2 ** 34 #this is 2**36, which is 64GB - should be plenty big for current transcendence ships
@@ -30,6 +49,13 @@ BLACK = "#000000"
 
 SV_WRITE = "write"
 
+LOAD_POLL_MS = 50
+#points listed under the point controls when they leave the hull, the rest are only counted
+HULL_WARNING_LINES = 6
+AUTOSAVE_INTERVAL_MS = 2000
+
+_TRACE = get_channel("ui")
+
 class SpriteMode(str): pass
 
 _MODE_SHIP = SpriteMode("Ship")
@@ -44,33 +70,67 @@ class MainMenuBar:
         menubar = tk.Menu(self._root)
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Load", command=self.viewer.load_image)
+        file_menu.add_command(label="Open Project", command=self.viewer.open_project)
         file_menu.add_command(label="Change Sprite Parameters", command=self.viewer.load_sprite_cfg)
+        file_menu.add_command(label="Save Project", command=self.viewer.save_project)
+        file_menu.add_command(label="Import XML", command=self.viewer.import_xml)
         file_menu.add_command(label="Export", command=self.viewer.export)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self._root.quit)
         menubar.add_cascade(label="File", menu=file_menu)
 
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Auto Layer Thrusters", command=self.viewer.auto_layer_thrusters)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+
         self._root.config(menu=menubar)
         
 class SpriteViewer (LockableUI):
-    def __init__(self, root: Tk):
+    def __init__(self, root: Tk, frame_cache_bytes: int = DEFAULT_FRAME_CACHE_BYTES):
         self._root = root
         self._image_path: str|None = None
-        self._image: ImageFile|None = None
-        self._sprite_image: ImageTk.PhotoImage|None = None
-        self._image_display: Label|None = None
+        self._sheet: SpriteSheet|None = None
+        self._sheet_loader: SheetLoader|None = None
+        self._first_frame: tuple[SheetLoader, SpriteSheet]|None = None
+        #the sheet shown before a load started, with its settings, points and project, to go back to if the load does not go through
+        self._previous_sheet: tuple[SpriteSheet, str, str|None, SpriteConfig, list[Point], int, str|None]|None = None
+        self._loaded_path: str|None = None
+        self._atlas_cache: AtlasCache|None = default_atlas_cache()
+        self._sheet_hash: str|None = None
+        #frame images made from the sheet, and the frames around the shown one made ahead of time
+        self._frame_cache = FrameCache(frame_cache_bytes)
+        self._image_lock = threading.Lock()
+        self._prefetcher = FramePrefetcher(self._frame_cache, self._load_frame)
+        self._prefetcher.start()
+        self._viewport: SpriteCanvas|None = None
         self._sprite_cfg = SpriteConfig()
         self._points: list[Point] = []
         self._wnd_image_loader = SpriteOpener(root)
         self._wnd_sprite_settings = SpriteSettingsDialogue(root)
+        self._wnd_load_progress = LoadProgressDialogue(root)
         self._mode: SpriteMode = _MODE_SHIP
         self._main_menu: MainMenuBar = MainMenuBar(root, self)
         self._selected_idx: int = -1
         self._point_controls_locked: bool = False
         self._xml_saver = XMLSaver(root)
+        self._project_saver = ProjectSaver(root)
+        self._project_opener = ProjectOpener(root)
+        self._xml_opener = XMLOpener(root)
+        self._wnd_ship_chooser = ShipChooserDialogue(root)
+        self._project_path: str|None = None
+        self._autosave = AutosaveJournal(autosave_path(None))
         self._next_point: int = 0
+        self._hull_validator: HullValidator|None = None
+        self._detected_cfg: SpriteConfig|None = None
+        self._point_index = PointIndex()
+        #point (and which of its mirrors) being dragged on the sprite
+        self._drag: tuple[Point, MirrorOptions]|None = None
+        self._drag_pos: tuple[int, int] = (0, 0)
+        self._drag_latency = DragLatency()
+        self._renderer = RenderScheduler(root, self.display_sprite)
         self._init_wnd()
         self.load_image()
+        self._root.after(AUTOSAVE_INTERVAL_MS, self._autosave_tick)
 
     def _init_wnd(self):
         self._root.title("Transcendence Effect Placer")
@@ -85,20 +145,22 @@ class SpriteViewer (LockableUI):
         self._init_display_frame()
 
     def _init_display_frame(self):
-        self._image_display = Label(self.display_frame)
-        self._image_display.pack()
+        self._viewport = SpriteCanvas(self.display_frame)
+        self._viewport.canvas.pack()
 
         slider_frame = Frame(self.display_frame)
         slider_frame.pack(fill=X)
 
         r = 0
-        self._ui_anim = SliderEntryUI(self._root, slider_frame, "Anim Frame", 0, 0, self.display_sprite, validate_numeral_non_negative)
+        self._ui_anim = SliderEntryUI(self._root, slider_frame, "Anim Frame", 0, 0, self.request_redraw, validate_numeral_non_negative)
         self._ui_anim.frame.grid(row=r, column=0, columnspan=4)
         r += 1
-        self._ui_rot = SliderEntryUI(self._root, slider_frame, "Rotation Frame", 0, 0, self.display_sprite, validate_numeral_non_negative)
+        self._ui_rot = SliderEntryUI(self._root, slider_frame, "Rotation Frame", 0, 0, self.request_redraw, validate_numeral_non_negative)
         self._ui_rot.frame.grid(row=r, column=0, columnspan=4)
 
-        self._image_display.bind("<Button-1>", self.add_point)
+        self._viewport.canvas.bind("<Button-1>", self.click_sprite)
+        self._viewport.canvas.bind("<B1-Motion>", self.drag_point)
+        self._viewport.canvas.bind("<ButtonRelease-1>", self.end_drag)
 
     def _init_control_frame(self):        
         def make_sv_callback_arc(sv: StringVar, entry: Entry, validation_fn: Callable[[str], bool] = validate_null):
@@ -185,8 +247,12 @@ class SpriteViewer (LockableUI):
         self.clone_button = Button(self.update_point_frame, text="Clone Point", command=self.clone_point, state=DISABLED)
         self.clone_button.grid(row=r, column=3)
 
+        #points that fall off the ship at some facing, kept up to date as points are edited
+        self.hull_warning_label = Label(self.control_frame, fg=RED, justify=LEFT, anchor="w", wraplength=int(self._root.winfo_screenwidth() * 0.2))
+        self.hull_warning_label.pack(fill=X)
+
     def load_sprite_cfg(self):
-        self._wnd_sprite_settings.open_dialogue(self._sprite_cfg)
+        self._wnd_sprite_settings.open_dialogue(self._sprite_cfg, self._detected_cfg)
 
         if self._wnd_sprite_settings._sprite_cfg.real:
             self._sprite_cfg = self._wnd_sprite_settings._sprite_cfg
@@ -210,68 +276,396 @@ class SpriteViewer (LockableUI):
                 self._root.quit()
                 quit()
 
-        self._image = PIL.Image.open(self._image_path)
-        self._sprite_cfg.w = int(self._image.size[0] / 20)
-        self._sprite_cfg.h = int(self._image.size[1] / 18)
+        #the sheet decodes in the background while the sprite settings are entered
+        size = self._start_sheet_load(self._image_path)
+        self._sprite_cfg.w = int(size[0] / 20)
+        self._sprite_cfg.h = int(size[1] / 18)
         self._sprite_cfg.real = False
 
-        path = self._image_path.replace("\\","/")
+        self._set_title(self._image_path)
+
+        #edits to a different ship dont belong in the journal of the project that was open
+        self._switch_autosave(None)
+
+        #points placed on the previous ship dont belong on this one
+        self._points = []
+        self._next_point = 0
+
+        self.load_sprite_cfg()
+
+        if self._sheet_loader is not None and not self._sheet_loader.done():
+            self._wnd_load_progress.open_dialogue(f"Loading {self._image_path}", self._cancel_sheet_load)
+            self._wnd_load_progress.set_progress(self._sheet_loader.progress())
+
+    def _set_title(self, image_path: str):
+        path = image_path.replace("\\","/")
         file = path.split("/")[-1]
         self._root.title(f"Transcendence Effect Placer: {file}")
 
-        self.load_sprite_cfg()
+    def _start_sheet_load(self, path: str) -> tuple[int, int]:
+        '''
+        Starts decoding a sprite sheet on a worker thread
+        :return: size of the sheet
+        '''
+        if self._sheet_loader is not None:
+            self._sheet_loader.cancel()
+        elif self._sheet is not None and self._loaded_path is not None:
+            self._previous_sheet = (self._sheet, self._loaded_path, self._sheet_hash, deepcopy(self._sprite_cfg), list(self._points), self._next_point, self._project_path)
+        loader = SheetLoader(path)
+        loader.start()
+        self._sheet_loader = loader
+        self._detected_cfg = None
+        self._first_frame = None
+        self._set_sheet(None)
+        self._sheet_hash = None
+        self._root.after(LOAD_POLL_MS, self._poll_sheet_loader)
+        return loader.size
+
+    def _start_first_frame_decode(self):
+        '''
+        Decodes just the rows holding the first frame, so it can be shown before the whole sheet is ready
+        '''
+        loader = self._sheet_loader
+        if loader is None:
+            return
+        rows = self._sprite_cfg.y + self._sprite_cfg.h
+        def decode():
+            image = decode_top_rows(loader.path, rows)
+            if image is not None:
+                self._first_frame = (loader, SpriteSheet.from_image(image))
+                image.close()
+        threading.Thread(target=decode, name="first-frame", daemon=True).start()
+
+    def _poll_sheet_loader(self):
+        loader = self._sheet_loader
+        if loader is None:
+            return
+        if loader.done():
+            self._finish_sheet_load(loader)
+            return
+        if self._sheet_hash is None and loader.hashed():
+            self._sheet_hash = loader.content_hash
+            #once the sprite parameters are known, a sheet that was opened before can be mapped instead of decoded
+            if self._sprite_cfg.real and not self._wnd_sprite_settings.is_open() and self._use_cached_atlas(loader):
+                self._wnd_load_progress.close()
+                self.request_redraw()
+                return
+        first_frame = self._first_frame
+        if first_frame is not None and first_frame[0] is loader and self._sheet is None:
+            self._set_sheet(first_frame[1])
+            self.request_redraw()
+        self._wnd_load_progress.set_progress(loader.progress())
+        self._root.after(LOAD_POLL_MS, self._poll_sheet_loader)
+
+    def _finish_sheet_load(self, loader: SheetLoader):
+        self._sheet_loader = None
+        self._first_frame = None
+        self._wnd_load_progress.close()
+        if loader.cancelled():
+            return
+        if loader.sheet is None:
+            _TRACE.log(ERROR, "failed to load sprite sheet", path=loader.path, error=loader.error)
+            self._restore_previous_sheet()
+            return
+        self._set_sheet(loader.sheet)
+        self._loaded_path = loader.path
+        self._sheet_hash = loader.content_hash
+        self._previous_sheet = None
+        self._detected_cfg = loader.detected
+        if loader.detected is not None and self._wnd_sprite_settings.is_open():
+            #the settings are still being entered, so fill in the grid found in the sheet
+            self._wnd_sprite_settings.fill_detected(loader.detected)
+        if self._sprite_cfg.real:
+            self._store_atlas()
+        self._update_frame_slider_states()
+        self.request_redraw()
+
+    def _use_cached_atlas(self, loader: SheetLoader) -> bool:
+        '''
+        Maps the cached atlas of a sheet that is still loading, and stops decoding it, if there is one
+        '''
+        if not self._map_cached_atlas():
+            return False
+        loader.cancel()
+        self._sheet_loader = None
+        self._first_frame = None
+        self._loaded_path = loader.path
+        self._previous_sheet = None
+        self._update_frame_slider_states()
+        return True
+
+    def _set_sheet(self, sheet: SpriteSheet|None):
+        '''
+        Switches the sheet frames are made from, dropping the frames cached (or being prefetched) from the old one
+        '''
+        with self._image_lock:
+            self._prefetcher.reset()
+            self._frame_cache.clear()
+            self._sheet = sheet
+
+    def _load_frame(self, key: FrameKey) -> Image:
+        '''
+        Makes the image of a frame, called from both the Tk thread and the prefetcher
+        '''
+        rot_frame, anim_frame = key
+        with self._image_lock:
+            sheet = self._sheet
+            cfg = self._sprite_cfg
+        if sheet is None:
+            raise ValueError("no sprite sheet is loaded")
+        return sheet.frame_image(cfg, rot_frame, anim_frame)
+
+    def _map_cached_atlas(self) -> bool:
+        '''
+        Switches to the cached atlas of the current sheet and sprite parameters, if there is one
+        '''
+        if self._atlas_cache is None or self._sheet_hash is None:
+            return False
+        atlas = self._atlas_cache.load(atlas_key(self._sheet_hash, self._sprite_cfg), self._sprite_cfg)
+        if atlas is None:
+            return False
+        self._set_sheet(SpriteSheet(atlas))
+        return True
+
+    def _store_atlas(self):
+        '''
+        Writes the frames of the decoded sheet to the atlas cache on a worker thread
+        '''
+        if self._atlas_cache is None or self._sheet_hash is None or self._sheet is None or self._sheet.is_atlas:
+            return
+        cache = self._atlas_cache
+        sheet = self._sheet
+        cfg = deepcopy(self._sprite_cfg)
+        key = atlas_key(self._sheet_hash, cfg)
+        if key in cache:
+            return
+        def store():
+            try:
+                cache.store(key, sheet, cfg)
+            except Exception as e:
+                _TRACE.log(ERROR, "failed to store atlas", error=e)
+        threading.Thread(target=store, name="atlas-store", daemon=True).start()
+
+    def _cancel_sheet_load(self):
+        loader = self._sheet_loader
+        if loader is None:
+            return
+        loader.cancel()
+        self._sheet_loader = None
+        self._first_frame = None
+        self._wnd_load_progress.close()
+        self._restore_previous_sheet()
+
+    def _restore_previous_sheet(self):
+        if self._previous_sheet is None:
+            #nothing to go back to, same as cancelling the first load
+            self._root.quit()
+            quit()
+        sheet, path, content_hash, cfg, points, next_point, project_path = self._previous_sheet
+        self._previous_sheet = None
+        if project_path != self._project_path:
+            self._switch_autosave(project_path)
+        self._points = points
+        self._next_point = next_point
+        self._sprite_cfg = cfg
+        self._wnd_sprite_settings._sprite_cfg = cfg
+        self._set_sheet(sheet)
+        self._image_path = path
+        self._loaded_path = path
+        self._sheet_hash = content_hash
+        self._set_title(path)
+        self.refresh_main_window()
+
+    def _update_frame_slider_states(self):
+        #frames other than the first cant be shown until the whole sheet has loaded
+        loading = self._sheet_loader is not None
+        self._ui_anim.set_state(NORMAL if self._sprite_cfg.anim_frames and not loading else DISABLED)
+        self._ui_rot.set_state(NORMAL if self._sprite_cfg.rot_frames - 1 and not loading else DISABLED)
+
+    def request_redraw(self, event: Event|None = None):
+        self._renderer.request(event)
 
     def display_sprite(self, event: Event|None = None):
-        if self._image is None:
+        if self._sheet is None:
             return
+        timing = _TRACE.timing
+        if timing:
+            start = perf_counter()
         
-        anim_frame = self._ui_anim.get()
-        rot_frame = self._ui_rot.get()
+        anim_frame = int(self._ui_anim.get())
+        rot_frame = int(self._ui_rot.get())
         #print(f'anim: {anim_frame}\trot: {rot_frame}')
 
-        ul = self._sprite_cfg.frame(rot_frame, anim_frame)
-        lr = ICoord(ul.x + self._sprite_cfg.w, ul.y + self._sprite_cfg.h)
-        crop_rect = (ul.x, ul.y, lr.x, lr.y)
-        cropped_image = self._image.crop(crop_rect)
-        
-        direction = round(rot_frame * (360 / self._sprite_cfg.rot_frames))
-
-        for pt in self._points:
-            drawable_frame = ImageDraw(cropped_image, mode="RGBA")
-            pt.render_to_image(drawable_frame, direction)
-
-        self._sprite_image = ImageTk.PhotoImage(cropped_image)
-        if self._image_display is None:
-            return
-        self._image_display.config(image=self._sprite_image)
+        facings = self._sprite_cfg.facing_table()
+        direction = facings.direction(rot_frame)
+
+        #the frame is only copied into Tk when a different one is shown, changing points only moves their canvas items
+        #the canvas never draws on the frame, so the cached image is used as is
+        key = (rot_frame, anim_frame)
+        if self._viewport is not None:
+            self._viewport.show_frame((self._sheet, facings.key) + key, lambda: self._frame_cache.get_or_load(key, lambda: self._load_frame(key)))
+            self._viewport.show_points(self._points, direction)
+        if self._sheet_loader is None:
+            self._prefetcher.update(rot_frame, anim_frame, self._sprite_cfg.rot_frames, self._sprite_cfg.anim_frames)
+        if timing:
+            _TRACE.record("display_sprite", start, rot=rot_frame, anim=anim_frame, points=len(self._points), dragging=self._drag is not None)
+        if self._drag is not None:
+            self._drag_latency.rendered()
+        else:
+            #the dragged point is checked once it is dropped
+            self._update_hull_warnings()
+
+    def _update_hull_warnings(self):
+        '''
+        Lists the points that leave the hull at any facing, only points edited since the last check are checked again
+        '''
+        lines: list[str] = []
+        #the hull cant be checked until every frame has loaded
+        if self._sheet is not None and self._sheet_loader is None:
+            if self._hull_validator is None or not self._hull_validator.matches(self._sheet, self._sprite_cfg):
+                self._hull_validator = HullValidator(self._sheet, self._sprite_cfg)
+            off_hull = self._hull_validator.check(self._points)
+            lines = [o.describe() for o in off_hull[:HULL_WARNING_LINES]]
+            if len(off_hull) > HULL_WARNING_LINES:
+                lines.append(f"...and {len(off_hull) - HULL_WARNING_LINES} more")
+        self.hull_warning_label.config(text='\n'.join(lines))
 
     def export(self):
-        export_str_docking = ""
-        export_str_devices = ""
-        export_str_thrusters = ""
-        for pt in self._points:
-            if pt.point_type == PT_DEVICE:
-                export_str_devices += '\n' +pt.to_xml()
-            elif pt.point_type == PT_DOCK:
-                export_str_docking += '\n' +pt.to_xml()
-            elif pt.point_type == PT_THRUSTER:
-                export_str_thrusters += '\n' +pt.to_xml()
-        export_str_thrusters = export_str_thrusters.replace('\n','\n\t')
-        export_str_devices = export_str_devices.replace('\n','\n\t')
-        export_str_docking = export_str_docking.replace('\n','\n\t')
-        export_str = ""
-        if export_str_docking:
-            export_str += f'<DockingPorts>{export_str_thrusters}\n</DockingPorts>\n'
-        if export_str_devices:
-            export_str += f'<DeviceSlots>{export_str_devices}\n</DeviceSlots>\n'
-        if export_str_thrusters:
-            export_str += f'<Effects>{export_str_thrusters}\n</EffectS>\n'
-        print(export_str)
+        if _TRACE.debug:
+            _TRACE.log(DEBUG, "export", xml=build_export_xml(self._points))
         path = self._xml_saver.save_path()
         if path:
-            print(f'exporting XML to: {path}')
+            if _TRACE.info:
+                _TRACE.log(INFO, "exporting XML", path=path)
             with open(path, 'w') as f:
-                f.write(export_str)
+                write_export_xml(self._points, f)
+
+    def save_project(self):
+        path = self._project_saver.save_path()
+        if not path:
+            return
+        if _TRACE.info:
+            _TRACE.log(INFO, "saving project", path=path)
+        project = Project(self._sprite_cfg, self._points, self._loaded_path)
+        try:
+            save_project(path, project)
+        except OSError as e:
+            _TRACE.log(ERROR, "failed to save project", path=path, error=e)
+            return
+        #edits from here on are journaled next to the project
+        if self._project_path is None:
+            self._autosave.discard()
+        self._switch_autosave(path)
+        try:
+            self._autosave.start(project)
+        except OSError as e:
+            _TRACE.log(ERROR, "failed to start autosave", path=self._autosave.path, error=e)
+
+    def open_project(self):
+        path = self._project_opener.open_path()
+        if not path:
+            return
+        try:
+            project = load_project_or_autosave(path)
+        except (OSError, ProjectError) as e:
+            _TRACE.log(ERROR, "failed to open project", path=path, error=e)
+            return
+        if not project.sprite_path or not os.path.exists(project.sprite_path):
+            _TRACE.log(ERROR, "sprite sheet of project not found", path=path, sprite_path=project.sprite_path)
+            return
+        if _TRACE.info:
+            _TRACE.log(INFO, "opening project", path=path, points=len(project.points))
+
+        self._image_path = project.sprite_path
+        self._start_sheet_load(project.sprite_path)
+        self._set_title(project.sprite_path)
+        self._sprite_cfg = project.sprite_cfg
+        self._wnd_sprite_settings._sprite_cfg = project.sprite_cfg
+        self.refresh_main_window()
+        self._set_points(project.points)
+        if self._sheet_loader is not None and not self._sheet_loader.done():
+            self._wnd_load_progress.open_dialogue(f"Loading {project.sprite_path}", self._cancel_sheet_load)
+
+        #a recovered autosave stays unsaved until it is saved as a project
+        self._switch_autosave(None if path.endswith(AUTOSAVE_SUFFIX) else path)
+        self._autosave.start(project)
+
+    def _switch_autosave(self, project_path: str|None):
+        '''
+        Closes the current journal and journals edits from here on for another project, or a new untitled one
+        The new journal is started by the next autosave if it is not started straight away
+        '''
+        self._autosave.close()
+        self._project_path = project_path
+        self._autosave = AutosaveJournal(autosave_path(project_path))
+
+    def import_xml(self):
+        '''
+        Adds the points of a <ShipClass> from existing XML to the current points
+        '''
+        if not self._sprite_cfg.real:
+            return
+        path = self._xml_opener.open_path()
+        if not path:
+            return
+        try:
+            #only list the ships at first, the points are only built for the ship that is chosen
+            ships = list(iter_ship_classes(path, self._sprite_cfg, build_points=False))
+            if not ships:
+                _TRACE.log(ERROR, "no ShipClass with any points found", path=path)
+                return
+            if len(ships) == 1:
+                chosen = ships[0]
+            else:
+                choice = self._wnd_ship_chooser.open_dialogue([f"{ship.label()} ({ship.elements} points)" for ship in ships])
+                if choice is None:
+                    return
+                chosen = ships[choice]
+            ship = next(iter_ship_classes(path, self._sprite_cfg, index=chosen.index), None)
+        except (OSError, SyntaxError) as e:
+            _TRACE.log(ERROR, "failed to import XML", path=path, error=e)
+            return
+        if ship is None:
+            _TRACE.log(ERROR, "no valid points found", path=path, ship=chosen.label())
+            return
+        if _TRACE.info:
+            _TRACE.log(INFO, "importing ship", path=path, ship=ship.label(), points=len(ship.points))
+
+        for pt in ship.points:
+            #generated labels would clash with the labels of points already placed
+            if pt.label.isdigit():
+                pt.set_label(str(self._next_point))
+                self._next_point += 1
+        self._set_points(self._points + ship.points)
+
+    def auto_layer_thrusters(self):
+        '''
+        Fills in every thruster's sendToBack/bringToFront from the current animation frame of the sprite
+        '''
+        if self._sheet is None or self._sheet_loader is not None:
+            return
+        anim_frame = int(self._ui_anim.get())
+        changed = auto_layer_thrusters(self._points, self._sheet, self._sprite_cfg, anim_frame)
+        if _TRACE.info:
+            _TRACE.log(INFO, "auto layered thrusters", changed=changed, anim=anim_frame)
+
+    def _set_points(self, points: list[Point]):
+        self.reset_point_controls()
+        self._points = list(points)
+        self.points_listbox.delete(0, END)
+        for pt in self._points:
+            self.points_listbox.insert(END, str(pt))
+        labels = [int(pt.label) for pt in self._points if pt.label.isdigit()]
+        self._next_point = max(labels) + 1 if labels else 0
+        self.request_redraw()
+
+    def _autosave_tick(self):
+        if self._sprite_cfg.real and self._sheet_loader is None:
+            try:
+                self._autosave.sync(self._points, self._sprite_cfg, self._loaded_path)
+            except OSError as e:
+                _TRACE.log(ERROR, "autosave failed", path=self._autosave.path, error=e)
+        self._root.after(AUTOSAVE_INTERVAL_MS, self._autosave_tick)
 
     def set_point_control_limits(self):
         self._ui_x.update_min_max(self._sprite_cfg.w * -.5, self._sprite_cfg.w * .5)
@@ -486,7 +880,7 @@ class SpriteViewer (LockableUI):
             self.points_listbox.insert(i, str(point))
 
         #self.set_current_point_controls()
-        self.display_sprite()
+        self.request_redraw()
 
     @LockableUI._no_lock
     def update_point_z(self, event: Event|None = None):
@@ -561,7 +955,7 @@ class SpriteViewer (LockableUI):
             self.points_listbox.insert(i, str(point))
 
         #self.set_current_point_controls()
-        self.display_sprite()
+        self.request_redraw()
 
     @LockableUI._no_lock
     def update_point_arcs(self, event: Event|None = None):
@@ -580,7 +974,7 @@ class SpriteViewer (LockableUI):
 
         if isinstance(point, PointThuster) or isinstance(point, PointDevice):
             #handle direction
-            point.direction = int(self._ui_dir.get())
+            point.set_direction(int(self._ui_dir.get()))
         if isinstance(point, PointDevice):
             #handle arcs
             use_range = False
@@ -601,13 +995,13 @@ class SpriteViewer (LockableUI):
                 use_range = new_start != -2 and new_end != -2
 
             if use_range:
-                point.arc_end = new_end
-                point.arc_start = new_start
+                point.set_arc_end(new_end)
+                point.set_arc_start(new_start)
             elif use_arc:
-                point.arc = new_arc
+                point.set_arc(new_arc)
 
         #self.set_current_point_controls()
-        self.display_sprite()
+        self.request_redraw()
 
     @LockableUI._no_lock
     def update_point_mirror(self, event: Event|None = None):
@@ -631,7 +1025,7 @@ class SpriteViewer (LockableUI):
         point.set_mirror_y(m_y)
         point.set_mirror_z(m_z)
 
-        self.display_sprite()
+        self.request_redraw()
 
     def _change_point_type(self):
         selected_index = self.points_listbox.curselection()
@@ -656,20 +1050,86 @@ class SpriteViewer (LockableUI):
         elif pt == PT_DOCK:
             new_point = PointDock(clone_point=old_point)
         else:
-            print(f"Err: unexpectedly got point type {pt} of type {type(pt)}")
+            _TRACE.log(ERROR, "unexpected point type", point_type=pt, type=type(pt))
             assert False
         
         self._points[i] = new_point
         self.points_listbox.delete(i)
         self.points_listbox.insert(i, str(new_point))
         self.set_current_point_controls()
-        self.display_sprite()
+        self.request_redraw()
+
+    def _shown_rot_frame(self) -> int:
+        return int(self._ui_rot.get())
+
+    def click_sprite(self, event: Event[Canvas]):
+        '''
+        Picks the point whose marker (or one of its mirrors' markers) is under the mouse, or places a new point if there is none
+        Either way the point can then be dragged around until the button is released
+        '''
+        if self._sheet is None:
+            return
+        direction = self._sprite_cfg.facing_table().direction(self._shown_rot_frame())
+        self._point_index.update(self._points, direction)
+        hit = self._point_index.find(event.x, event.y)
+        if hit is None:
+            count = len(self._points)
+            self.add_point(event)
+            if len(self._points) > count:
+                self._start_drag(self._points[-1], MIRROR_NULL, event)
+            return
+        pt, mirror = hit
+        i = self._points.index(pt)
+        if _TRACE.debug:
+            _TRACE.log(DEBUG, "picked point", label=pt.label, x=event.x, y=event.y, mirror=mirror)
+        self._selected_idx = i
+        self.points_listbox.selection_clear(0, END)
+        self.points_listbox.select_set(i)
+        self.points_listbox.see(i)
+        self.reset_point_controls()
+        self.set_current_point_controls()
+        self._start_drag(pt, mirror, event)
+
+    def _start_drag(self, pt: Point, mirror: MirrorOptions, event: Event[Canvas]):
+        self._drag = (pt, mirror)
+        self._drag_pos = (event.x, event.y)
+        self._drag_latency.start()
+
+    def drag_point(self, event: Event[Canvas]):
+        if self._drag is None:
+            return
+        #motion within the same pixel would solve to the same place
+        if (event.x, event.y) == self._drag_pos:
+            return
+        self._drag_pos = (event.x, event.y)
+        pt, mirror = self._drag
+        pt.move_marker_to(PILCoord(event.x, event.y), self._shown_rot_frame(), mirror)
+        self._drag_latency.moved()
+        self.request_redraw()
+
+    def end_drag(self, event: Event[Canvas]):
+        if self._drag is None:
+            return
+        pt, _ = self._drag
+        self._drag = None
+        self._drag_latency.finish(pt.label)
+        #check the dropped point against the hull
+        self.request_redraw()
+        if pt not in self._points:
+            return
+        i = self._points.index(pt)
+        self.points_listbox.delete(i)
+        self.points_listbox.insert(i, str(pt))
+        if i == self._selected_idx:
+            self.points_listbox.select_set(i)
+            self.set_current_point_controls()
 
     @LockableUI._no_lock
-    def add_point(self, event: Event[Label]):
+    def add_point(self, event: Event[Canvas]):
         x = event.x
         y = event.y
-        print('Placing coord at: ', x, y)
+        if _TRACE.debug:
+            _TRACE.log(DEBUG, "placing point", x=x, y=y)
         coord = PILCoord(x, y)
         point = PointGeneric(coord, str(self._next_point), self._sprite_cfg, self.get_cur_rot_frame())
         self._points.append(point)
@@ -677,7 +1137,7 @@ class SpriteViewer (LockableUI):
         self._selected_idx = len(self._points) - 1
         self._next_point += 1
         self.set_current_point_controls()
-        self.display_sprite()
+        self.request_redraw()
 
     @LockableUI._no_lock
     def delete_point(self):
@@ -712,7 +1172,7 @@ class SpriteViewer (LockableUI):
 
         if self._selected_idx >= 0:
             self.set_current_point_controls()
-        self.display_sprite()
+        self.request_redraw()
     
     def clone_point(self):
         #the index is actually a tuple of all selected items in the list
@@ -738,36 +1198,62 @@ class SpriteViewer (LockableUI):
         self.points_listbox.select_set(i+1)
 
         self.set_current_point_controls()
-        self.display_sprite()
+        self.request_redraw()
 
     def refresh_main_window(self):
-        #reset collected points
-        self._points = []
+        #cached frames were cut with the old sprite parameters
+        with self._image_lock:
+            self._prefetcher.reset()
+            self._frame_cache.clear()
+
+        #keep the points that were placed, moved onto the new sprite settings
+        reproject_points(self._points, self._sprite_cfg)
         self.points_listbox.delete(0, END)
-        self._next_point: int = 0
+        for pt in self._points:
+            self.points_listbox.insert(END, str(pt))
 
         #reset frame sliders
         self._ui_anim.set(0)
         num_anim_frames = self._sprite_cfg.anim_frames
         self._ui_anim.update_min_max(0, num_anim_frames)
-        self._ui_anim.set_state(NORMAL if num_anim_frames else DISABLED)
         self._ui_rot.set(0)
         num_rot_frames = self._sprite_cfg.rot_frames - 1
         self._ui_rot.update_min_max(0, num_rot_frames)
-        self._ui_rot.set_state(NORMAL if num_rot_frames else DISABLED)
+        self._update_frame_slider_states()
 
         #reset point editing
         self.reset_point_controls()
 
+        loader = self._sheet_loader
+        if loader is not None:
+            if loader.hashed():
+                self._sheet_hash = loader.content_hash
+            #if this sheet was opened with these parameters before, there is nothing left to decode
+            #and if it is still being hashed, _poll_sheet_loader maps the atlas once the hash comes in
+            if not self._use_cached_atlas(loader):
+                #show the first frame as soon as it is decoded, rather than waiting for the whole sheet
+                self._set_sheet(None)
+                self._start_first_frame_decode()
+                return
+        elif self._sheet is not None and self._sheet.is_atlas and not self._map_cached_atlas():
+            #only the atlas for the old parameters was mapped, so the sheet has to be decoded after all
+            self._set_sheet(None)
+            if self._loaded_path is not None:
+                self._start_sheet_load(self._loaded_path)
+                self._wnd_load_progress.open_dialogue(f"Loading {self._loaded_path}", self._cancel_sheet_load)
+                self._update_frame_slider_states()
+                self._start_first_frame_decode()
+            return
+        else:
+            self._store_atlas()
+
         #draw whatever sprite is now selected
+        self._renderer.cancel()
         self.display_sprite()
 
-        if self._sprite_image is None:
+        if self._viewport is None or not self._viewport.has_frame():
             #error
-            print('Err: sprite_image was none')
+            _TRACE.log(ERROR, "no frame was shown")
             self._root.quit()
             return
-        
-        if self._image_display:
-            self._image_display.config(image=self._sprite_image)
     
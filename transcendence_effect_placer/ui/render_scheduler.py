@@ -0,0 +1,84 @@
+from __future__ import annotations
+from tkinter import Tk, Event
+from time import perf_counter
+from typing import Callable
+
+from transcendence_effect_placer.common.diagnostics import get_channel
+
+DEFAULT_FRAME_INTERVAL_MS = 16
+
+_TRACE = get_channel("ui")
+
+class RenderScheduler:
+    '''
+    Coalesces redraw requests so that at most one render happens per Tk idle pass,
+    and no more often than once per frame interval
+
+    requested: number of times a redraw was asked for
+    rendered: number of renders actually done
+    coalesced: requests that were folded into a render that was already pending
+    dropped: frame intervals missed because a render took longer than the interval
+    '''
+    def __init__(self, root: Tk, render: Callable[[], None], frame_interval_ms: int = DEFAULT_FRAME_INTERVAL_MS):
+        self._root = root
+        self._render = render
+        self.frame_interval_ms = frame_interval_ms
+        self._pending: str|None = None
+        self._last_render: float = 0.0
+        self.requested: int = 0
+        self.rendered: int = 0
+        self.coalesced: int = 0
+        self.dropped: int = 0
+
+    def request(self, event: Event|None = None):
+        '''
+        Marks the view dirty; the render happens once Tk is idle
+        '''
+        self.requested += 1
+        if self._pending is not None:
+            self.coalesced += 1
+            return
+        wait_ms = self.frame_interval_ms - (perf_counter() - self._last_render) * 1000
+        if wait_ms > 1:
+            self._pending = self._root.after(int(wait_ms), self._after_interval)
+        else:
+            self._pending = self._root.after_idle(self._run)
+
+    def flush(self):
+        '''
+        Renders now if a render is pending
+        '''
+        if self._pending is None:
+            return
+        self._root.after_cancel(self._pending)
+        self._run()
+
+    def cancel(self):
+        if self._pending is None:
+            return
+        self._root.after_cancel(self._pending)
+        self._pending = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "requested": self.requested,
+            "rendered": self.rendered,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+    def _after_interval(self):
+        #the interval has passed, but still wait for pending events to be handled first
+        self._pending = self._root.after_idle(self._run)
+
+    def _run(self):
+        self._pending = None
+        start = perf_counter()
+        self._last_render = start
+        self._render()
+        self.rendered += 1
+        elapsed_ms = (perf_counter() - start) * 1000
+        if elapsed_ms > self.frame_interval_ms:
+            self.dropped += int(elapsed_ms // self.frame_interval_ms)
+        if _TRACE.timing:
+            _TRACE.record("render", start, **self.stats())
@@ -15,4 +15,18 @@ class XMLSaver:
         return new_path
 
     def get_path(self):
-        return self._path
\ No newline at end of file
+        return self._path
+
+class ProjectSaver:
+    def __init__(self, root: Tk):
+        self._root = root
+        self._path: str|None = None
+
+    def save_path(self):
+        new_path = filedialog.asksaveasfilename(filetypes=[("Project Files", ".json")], defaultextension=".json", confirmoverwrite=True)
+        if new_path:
+            self._path = new_path
+        return new_path
+
+    def get_path(self):
+        return self._path
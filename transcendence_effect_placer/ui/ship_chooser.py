@@ -0,0 +1,48 @@
+from __future__ import annotations
+import tkinter as tk
+from tkinter import LEFT, RIGHT, TOP, BOTTOM, X, Y, BOTH, END, Toplevel, Tk, Label, Listbox, Button
+
+class ShipChooserDialogue:
+    def __init__(self, root: Tk):
+        self._root = root
+        self._wnd: Toplevel|None = None
+        self._listbox: Listbox|None = None
+        self._choice: int|None = None
+
+    def is_open(self):
+        return not self._wnd is None
+
+    def open_dialogue(self, labels: list[str]) -> int|None:
+        '''
+        :return: index of the chosen ship, or None if cancelled
+        '''
+        self._choice = None
+
+        self._wnd = Toplevel()
+        self._wnd.title("Import Ship")
+
+        Label(self._wnd, text="Ship Class").pack(side=TOP, fill=X)
+        self._listbox = Listbox(self._wnd, width=60, height=min(20, max(5, len(labels))))
+        for label in labels:
+            self._listbox.insert(END, label)
+        self._listbox.selection_set(0)
+        self._listbox.pack(side=TOP, fill=BOTH, expand=True)
+        self._listbox.bind('<Double-Button-1>', lambda event: self.accept())
+
+        Button(self._wnd, text="Import", command=self.accept).pack(side=TOP)
+        Button(self._wnd, text="Cancel", command=self.cancel).pack(side=TOP)
+
+        self._root.wait_window(self._wnd)
+        return self._choice
+
+    def accept(self):
+        if self._listbox is not None:
+            selected = self._listbox.curselection()
+            self._choice = selected[0] if selected else None
+        self.cancel()
+
+    def cancel(self):
+        if self._wnd is None: return
+        self._wnd.destroy()
+        self._wnd = None
+        self._listbox = None
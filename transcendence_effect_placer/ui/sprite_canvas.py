@@ -0,0 +1,141 @@
+'''
+The sprite view: one frame image with the point markers drawn over it as canvas items
+
+The frame image is only uploaded to Tk when the frame shown changes, and is pasted into the same PhotoImage when it
+keeps its size, so editing or dragging a point only moves that point's canvas items
+'''
+
+from __future__ import annotations
+from tkinter import Canvas, Widget, ARC, NW
+from typing import Callable, Hashable, Sequence
+from PIL import ImageTk
+from PIL.Image import Image
+
+from transcendence_effect_placer.common.diagnostics import get_channel, DEBUG
+from transcendence_effect_placer.data.points import Point
+from transcendence_effect_placer.data.shapes import Shape, SHAPE_CIRCLE
+
+_TRACE = get_channel("ui")
+
+def _tk_color(color: tuple[int, ...]) -> str:
+    return f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
+
+def _arc_options(shape: Shape) -> dict[str, object]|None:
+    '''
+    Tk measures arcs counter clockwise from the right, where ImageDraw.arc (and Shape) goes clockwise
+    :return: the start and extent of an arc, or None if ImageDraw would draw nothing for it
+    '''
+    sweep = shape.end - shape.start
+    if sweep >= 360:
+        extent = 359.99
+    else:
+        extent = sweep % 360
+        if extent == 0:
+            return None
+    return {"start": -shape.end, "extent": extent}
+
+class SpriteCanvas:
+    '''
+    frame_uploads: times a frame image was copied into Tk
+    moved_items: canvas items that were updated in place for a point that changed
+    created_items: canvas items that had to be created (new points, or points that now draw different shapes)
+    '''
+    def __init__(self, parent: Widget):
+        self.canvas = Canvas(parent, highlightthickness=0, borderwidth=0, width=0, height=0)
+        self._photo: ImageTk.PhotoImage|None = None
+        self._image_item: int|None = None
+        self._frame_key: Hashable|None = None
+        #point -> revision and facing its items were drawn for, and the items with the shape each one draws
+        self._items: dict[Point, tuple[int, int, list[tuple[int, Shape]]]] = {}
+        self.frame_uploads: int = 0
+        self.moved_items: int = 0
+        self.created_items: int = 0
+
+    def has_frame(self) -> bool:
+        return self._photo is not None
+
+    def show_frame(self, key: Hashable, make_image: Callable[[], Image]):
+        '''
+        Shows a frame, which is only made (and copied into Tk) when key differs from the frame already shown
+        '''
+        if key == self._frame_key and self._photo is not None:
+            return
+        image = make_image()
+        self._frame_key = key
+        self.frame_uploads += 1
+        if self._photo is not None and (self._photo.width(), self._photo.height()) == image.size:
+            self._photo.paste(image)
+            return
+        self._photo = ImageTk.PhotoImage(image)
+        self.canvas.config(width=image.width, height=image.height)
+        if self._image_item is None:
+            self._image_item = self.canvas.create_image(0, 0, image=self._photo, anchor=NW)
+            self.canvas.tag_lower(self._image_item)
+        else:
+            self.canvas.itemconfig(self._image_item, image=self._photo)
+
+    def show_points(self, points: Sequence[Point], rotation_dir: int):
+        '''
+        Brings the markers up to date, only points that changed (or every point, if the facing changed) are touched
+        '''
+        live = set(points)
+        for pt in [pt for pt in self._items if pt not in live]:
+            self._delete(pt)
+        for pt in points:
+            entry = self._items.get(pt)
+            if entry is not None and entry[0] == pt.revision and entry[1] == rotation_dir:
+                continue
+            self._draw(pt, rotation_dir, entry)
+        if _TRACE.debug:
+            _TRACE.log(DEBUG, "canvas points", points=len(points), items=sum(len(e[2]) for e in self._items.values()), **self.stats())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "frame_uploads": self.frame_uploads,
+            "moved_items": self.moved_items,
+            "created_items": self.created_items,
+        }
+
+    def _delete(self, pt: Point):
+        entry = self._items.pop(pt, None)
+        if entry is None:
+            return
+        for item, _ in entry[2]:
+            self.canvas.delete(item)
+
+    def _draw(self, pt: Point, rotation_dir: int, entry: tuple[int, int, list[tuple[int, Shape]]]|None):
+        shapes = pt.overlay_shapes(rotation_dir)
+        old = entry[2] if entry is not None else []
+        if len(old) == len(shapes) and all(shape.kind == old_shape.kind for (_, old_shape), shape in zip(old, shapes)):
+            #same shapes as before, just somewhere else
+            items = []
+            for (item, old_shape), shape in zip(old, shapes):
+                if shape != old_shape:
+                    self._update_item(item, shape)
+                    self.moved_items += 1
+                items.append((item, shape))
+        else:
+            self._delete(pt)
+            items = [(self._create_item(shape), shape) for shape in shapes]
+            self.created_items += len(items)
+        self._items[pt] = (pt.revision, rotation_dir, items)
+
+    def _create_item(self, shape: Shape) -> int:
+        color = _tk_color(shape.color)
+        if shape.kind == SHAPE_CIRCLE:
+            return self.canvas.create_oval(*shape.bbox, fill=color, outline=color)
+        options = _arc_options(shape)
+        #arcs ImageDraw would not draw are kept as hidden items, so the point keeps the same items as it changes
+        return self.canvas.create_arc(*shape.bbox, style=ARC, outline=color, state="hidden" if options is None else "normal", **(options or {}))
+
+    def _update_item(self, item: int, shape: Shape):
+        self.canvas.coords(item, *shape.bbox)
+        color = _tk_color(shape.color)
+        if shape.kind == SHAPE_CIRCLE:
+            self.canvas.itemconfig(item, fill=color, outline=color)
+            return
+        options = _arc_options(shape)
+        if options is None:
+            self.canvas.itemconfig(item, state="hidden")
+        else:
+            self.canvas.itemconfig(item, outline=color, state="normal", **options)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import tkinter as tk
-from tkinter import LEFT, RIGHT, TOP, BOTTOM, X, Y, VERTICAL, HORIZONTAL, BOTH, END, Toplevel, Tk, Label, Entry, Button
+from tkinter import LEFT, RIGHT, TOP, BOTTOM, X, Y, VERTICAL, HORIZONTAL, BOTH, END, NORMAL, DISABLED, Toplevel, Tk, Label, Entry, Button
 
 from transcendence_effect_placer.data.data import SpriteConfig
     
@@ -9,12 +9,19 @@ class SpriteSettingsDialogue:
         self._root = root
         self._sprite_cfg = SpriteConfig()
         self._wnd: Toplevel|None = None
+        self._detected: SpriteConfig|None = None
+        #what each grid entry held when the dialogue opened, so a detected grid does not overwrite what the user typed
+        self._shown: dict[str, str] = {}
 
     def is_open(self):
         return not self._wnd is None
 
-    def open_dialogue(self, defaults: SpriteConfig|None = None):
+    def open_dialogue(self, defaults: SpriteConfig|None = None, detected: SpriteConfig|None = None):
+        '''
+        :param detected: frame grid found in the sheet, which can be filled in with a button
+        '''
         defaults = self._sprite_cfg if defaults is None else defaults
+        self._detected = detected
 
         self._wnd = Toplevel()
         self._wnd.title("Sprite Settings")
@@ -69,6 +76,12 @@ class SpriteSettingsDialogue:
         self.viewport_ratio_entry.grid(row=c, column=1)
         c += 1
 
+        self._shown = {name: entry.get() for name, entry in self._grid_entries().items()}
+
+        self.detect_button = Button(self._wnd, text="Use Detected Grid", command=self._use_detected, state=NORMAL if detected is not None else DISABLED)
+        self.detect_button.grid(row=c, column=0, columnspan=2)
+        c += 1
+
         self.accept_button = Button(self._wnd, text="Accept", command=self.accept)
         self.accept_button.grid(row=c, column=0, columnspan=2)
         c += 1
@@ -78,6 +91,37 @@ class SpriteSettingsDialogue:
 
         self._root.wait_window(self._wnd)
 
+    def _grid_entries(self) -> dict[str, Entry]:
+        return {
+            "x": self.sprite_pos_x_entry,
+            "y": self.sprite_pos_y_entry,
+            "w": self.sprite_width_entry,
+            "h": self.sprite_height_entry,
+            "anim_frames": self.animation_frames_entry,
+            "rot_frames": self.rotation_frames_entry,
+            "rot_cols": self.rotation_columns_entry,
+        }
+
+    def fill_detected(self, detected: SpriteConfig, overwrite: bool = False):
+        '''
+        Fills in a detected frame grid, once the sheet has been analyzed
+        :param overwrite: also replace values the user already changed
+        '''
+        if self._wnd is None:
+            return
+        self._detected = detected
+        self.detect_button.config(state=NORMAL)
+        for name, entry in self._grid_entries().items():
+            if overwrite or entry.get() == self._shown.get(name):
+                value = str(getattr(detected, name))
+                entry.delete(0, END)
+                entry.insert(END, value)
+                self._shown[name] = value
+
+    def _use_detected(self):
+        if self._detected is not None:
+            self.fill_detected(self._detected, overwrite=True)
+
     def accept(self):
         self._sprite_cfg.x = int(self.sprite_pos_x_entry.get())
         self._sprite_cfg.y = int(self.sprite_pos_y_entry.get())